@@ -0,0 +1,263 @@
+"""
+Solver benchmark.
+
+Builds a seeded corpus of solvable and unsolvable boards, solves every board with every engine and reports
+p50/p95 latency, nodes per second and peak memory per engine and board size. Results are written as JSON so
+runs on different commits can be compared:
+
+    python benchmark.py --output before.json
+    git checkout other-branch
+    python benchmark.py --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# The corpus is built without touching the database, but importing the services opens it.
+os.environ.setdefault("DATABASE_PATH", os.path.join(tempfile.mkdtemp(), "benchmark.db"))
+
+from models.solver import SolverEngine, SolveStatus  # noqa: E402
+from services.domino_service import build_board, find_max_pips, generate_dominos, solve_board  # noqa: E402
+from services.parallel_solver import shutdown_process_pool  # noqa: E402
+from services.solver_budget import SearchInterrupted, SolveBudget  # noqa: E402
+from utils.stats import percentile  # noqa: E402
+
+DEFAULT_SIZES = [(4, 4), (6, 6), (8, 8), (10, 10)]
+
+
+class CorpusBoard(NamedTuple):
+    """
+    - **name**: A stable identifier, `<rows>x<cols>-<solvable|unsolvable>-<n>`.
+    - **solvable**: Whether the board has a solution, established with the bitmask engine when the corpus is built.
+    """
+    name: str
+    rows: int
+    cols: int
+    board: List[List[int]]
+    solvable: bool
+
+
+class Measurement(NamedTuple):
+    engine: str
+    board: CorpusBoard
+    seconds: float
+    nodes: int
+    status: SolveStatus
+
+
+def build_corpus(seed: int, sizes: Sequence[Tuple[int, int]], boards_per_size: int) -> List[CorpusBoard]:
+    """
+    Builds `boards_per_size` solvable and `boards_per_size` unsolvable boards of every size.
+
+    Solvable boards come straight from `build_board`. Unsolvable ones are generated boards with two cells
+    swapped, keeping only swaps that break every tiling; the pip counts stay feasible, so the engines have to
+    search rather than reject them up front. Sizes too small to break may get fewer unsolvable boards. The same
+    seed always gives the same corpus.
+    """
+    rng_state = random.getstate()
+    random.seed(seed)
+    try:
+        corpus = []
+        for rows, cols in sizes:
+            for n in range(boards_per_size):
+                corpus.append(CorpusBoard(f"{rows}x{cols}-solvable-{n}", rows, cols, build_board(rows, cols).tolist(), True))
+            found = 0
+            # Tiny boards may have no tiling-breaking swap at all.
+            for _ in range(1000 * boards_per_size):
+                if found == boards_per_size:
+                    break
+                board = build_board(rows, cols).tolist()
+                (r1, c1), (r2, c2) = [(random.randrange(rows), random.randrange(cols)) for _ in range(2)]
+                if board[r1][c1] == board[r2][c2]:
+                    continue
+                board[r1][c1], board[r2][c2] = board[r2][c2], board[r1][c1]
+                if not solve(board, SolverEngine.bitmask)[0]:
+                    corpus.append(CorpusBoard(f"{rows}x{cols}-unsolvable-{found}", rows, cols, board, False))
+                    found += 1
+        return corpus
+    finally:
+        random.setstate(rng_state)
+
+
+def solve(board: List[List[int]], engine: SolverEngine, timeout: Optional[float] = None) -> Tuple[bool, SolveBudget]:
+    dominos = generate_dominos(find_max_pips(board))
+    placement = [[None for _ in range(len(board[0]))] for _ in range(len(board))]
+    budget = SolveBudget(timeout)
+    try:
+        return solve_board(board, dominos, engine, placement, [], budget), budget
+    except SearchInterrupted:
+        return False, budget
+
+
+def measure(board: CorpusBoard, engine: SolverEngine, timeout: Optional[float]) -> Measurement:
+    start = time.perf_counter()
+    solved, budget = solve(board.board, engine, timeout)
+    seconds = time.perf_counter() - start
+    if budget.status is not None:
+        status = budget.status
+    else:
+        status = SolveStatus.solved if solved else SolveStatus.no_solution
+    return Measurement(engine.value, board, seconds, budget.nodes, status)
+
+
+def peak_memory(board: CorpusBoard, engine: SolverEngine, timeout: Optional[float]) -> int:
+    """
+    Peak bytes allocated by one solve in this process (solver processes of the parallel engine not included).
+    Measured in a separate run, since tracing allocations slows the solvers down.
+    """
+    tracemalloc.start()
+    try:
+        solve(board.board, engine, timeout)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def summarize(measurements: List[Measurement], peaks: Dict[Tuple[str, int, int], int]) -> List[Dict[str, Any]]:
+    groups: Dict[Tuple[str, int, int], List[Measurement]] = {}
+    for measurement in measurements:
+        groups.setdefault((measurement.engine, measurement.board.rows, measurement.board.cols), []).append(measurement)
+    results = []
+    for (engine, rows, cols), group in groups.items():
+        seconds = [measurement.seconds for measurement in group]
+        nodes = sum(measurement.nodes for measurement in group)
+        statuses = [measurement.status for measurement in group]
+        wrong = sum(1 for measurement in group
+                    if measurement.status in (SolveStatus.solved, SolveStatus.no_solution)
+                    and (measurement.status == SolveStatus.solved) != measurement.board.solvable)
+        results.append({
+            "engine": engine,
+            "rows": rows,
+            "cols": cols,
+            "runs": len(group),
+            "solved": statuses.count(SolveStatus.solved),
+            "no_solution": statuses.count(SolveStatus.no_solution),
+            "timed_out": statuses.count(SolveStatus.timed_out),
+            "wrong_answers": wrong,
+            "p50_ms": round(percentile(seconds, 0.5) * 1000, 3),
+            "p95_ms": round(percentile(seconds, 0.95) * 1000, 3),
+            "mean_ms": round(sum(seconds) / len(seconds) * 1000, 3),
+            "nodes": nodes,
+            "nodes_per_sec": round(nodes / sum(seconds)) if sum(seconds) else None,
+            "peak_memory_kib": round(peaks.get((engine, rows, cols), 0) / 1024, 1),
+        })
+    return results
+
+
+def run_benchmark(corpus: List[CorpusBoard], engines: Sequence[SolverEngine], repeat: int = 3,
+                  timeout: Optional[float] = None, memory: bool = True) -> List[Dict[str, Any]]:
+    measurements = []
+    peaks: Dict[Tuple[str, int, int], int] = {}
+    for engine in engines:
+        # One untimed solve so the parallel engine's process pool is up before measuring.
+        solve(corpus[0].board, engine, timeout)
+        for board in corpus:
+            for _ in range(repeat):
+                measurements.append(measure(board, engine, timeout))
+            if memory:
+                key = (engine.value, board.rows, board.cols)
+                peaks[key] = max(peaks.get(key, 0), peak_memory(board, engine, timeout))
+    return summarize(measurements, peaks)
+
+
+def environment(seed: int, sizes: Sequence[Tuple[int, int]], boards_per_size: int, repeat: int,
+                timeout: Optional[float]) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": seed,
+        "sizes": [f"{rows}x{cols}" for rows, cols in sizes],
+        "boards_per_size": boards_per_size,
+        "repeat": repeat,
+        "timeout": timeout,
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]]) -> List[str]:
+    """
+    One line per engine and size present in both runs, with the change in p50 and p95 latency.
+    """
+    previous = {(row["engine"], row["rows"], row["cols"]): row for row in baseline}
+    lines = []
+    for row in results:
+        before = previous.get((row["engine"], row["rows"], row["cols"]))
+        if before is None:
+            continue
+        changes = []
+        for key in ("p50_ms", "p95_ms"):
+            if before[key]:
+                changes.append(f"{key} {before[key]:.3f} -> {row[key]:.3f} ({row[key] / before[key] - 1:+.1%})")
+        lines.append(f"{row['engine']:>12} {row['rows']}x{row['cols']}: " + ", ".join(changes))
+    return lines
+
+
+def format_table(results: List[Dict[str, Any]]) -> str:
+    header = f"{'engine':>12} {'size':>6} {'runs':>5} {'p50 ms':>10} {'p95 ms':>10} {'nodes/s':>10} {'peak KiB':>9}  notes"
+    lines = [header]
+    for row in results:
+        notes = []
+        if row["timed_out"]:
+            notes.append(f"{row['timed_out']} timed out")
+        if row["wrong_answers"]:
+            notes.append(f"{row['wrong_answers']} WRONG")
+        lines.append(f"{row['engine']:>12} {row['rows']}x{row['cols']:<4} {row['runs']:>5} {row['p50_ms']:>10.3f} "
+                     f"{row['p95_ms']:>10.3f} {row['nodes_per_sec'] or 0:>10} {row['peak_memory_kib']:>9}  "
+                     + ", ".join(notes))
+    return "\n".join(lines)
+
+
+def parse_size(value: str) -> Tuple[int, int]:
+    rows, _, cols = value.partition("x")
+    return int(rows), int(cols or rows)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=2024, help="seed of the board corpus")
+    parser.add_argument("--sizes", type=parse_size, nargs="+", default=DEFAULT_SIZES, metavar="ROWSxCOLS")
+    parser.add_argument("--boards", type=int, default=5, help="solvable and unsolvable boards per size")
+    parser.add_argument("--repeat", type=int, default=3, help="timed solves per board and engine")
+    parser.add_argument("--engines", type=SolverEngine, nargs="+",
+                        default=[engine for engine in SolverEngine if engine != SolverEngine.auto])
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds before a solve is cut off")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory runs")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="a JSON file from an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.seed, args.sizes, args.boards)
+    try:
+        results = run_benchmark(corpus, args.engines, args.repeat, args.timeout, not args.no_memory)
+    finally:
+        shutdown_process_pool()
+
+    report = {"environment": environment(args.seed, args.sizes, args.boards, args.repeat, args.timeout),
+              "results": results}
+    print(format_table(results))
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(["", f"Compared with {args.compare}:"] + compare(results, json.load(f)["results"])))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if any(row["wrong_answers"] for row in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
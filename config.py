@@ -0,0 +1,113 @@
+import os
+
+# Number of processes in the solver pool started with the app.
+SOLVER_WORKERS = int(os.environ.get("SOLVER_WORKERS", os.cpu_count() or 1))
+
+# Number of placements made in the parent before the search is split into independent subtrees.
+SOLVER_SPLIT_DEPTH = int(os.environ.get("SOLVER_SPLIT_DEPTH", 3))
+
+# Boards with at least this many cells are solved with the process-pool solver by default.
+PARALLEL_MIN_CELLS = int(os.environ.get("PARALLEL_MIN_CELLS", 64))
+
+# Maximum number of boards kept in the in-memory solution cache.
+SOLUTION_CACHE_SIZE = int(os.environ.get("SOLUTION_CACHE_SIZE", 1024))
+
+# Also keep solutions in the SOLUTION_CACHE table so they survive restarts and are shared between workers.
+SOLUTION_CACHE_PERSIST = os.environ.get("SOLUTION_CACHE_PERSIST", "0") == "1"
+
+# SQLite database file.
+DATABASE_PATH = os.environ.get("DATABASE_PATH", "test.db")
+
+# Connection pragmas, see https://www.sqlite.org/pragma.html.
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE = int(os.environ.get("SQLITE_CACHE_SIZE", -20000))
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 268435456))
+
+# Prepared statements kept per connection.
+SQLITE_CACHED_STATEMENTS = int(os.environ.get("SQLITE_CACHED_STATEMENTS", 128))
+
+# Threads and maximum queued calls for solves (CPU) and SQLite access (IO); more calls are rejected with 503.
+CPU_THREADS = int(os.environ.get("CPU_THREADS", SOLVER_WORKERS))
+CPU_QUEUE_SIZE = int(os.environ.get("CPU_QUEUE_SIZE", 4 * CPU_THREADS))
+IO_THREADS = int(os.environ.get("IO_THREADS", 8))
+IO_QUEUE_SIZE = int(os.environ.get("IO_QUEUE_SIZE", 256))
+
+# Boards inserted per executemany/transaction by bulk generation.
+BULK_INSERT_CHUNK_SIZE = int(os.environ.get("BULK_INSERT_CHUNK_SIZE", 500))
+
+# Where users, tokens and dev keys are kept: "sqlite" (shared by workers, survives restarts) or "memory".
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "sqlite")
+
+# Seconds a session lookup is served from the in-process cache in front of the sqlite backend.
+SESSION_CACHE_TTL = float(os.environ.get("SESSION_CACHE_TTL", 1.0))
+
+# Seconds a login token stays valid.
+TOKEN_TTL_SECONDS = float(os.environ.get("TOKEN_TTL_SECONDS", 24 * 60 * 60))
+
+# PBKDF2-SHA256 iterations for new password hashes; stored hashes with another count are rehashed on login.
+PBKDF2_ITERATIONS = int(os.environ.get("PBKDF2_ITERATIONS", 4096))
+
+# Threads and maximum queued calls for password hashing, kept apart from solver and database work.
+HASH_THREADS = int(os.environ.get("HASH_THREADS", 2))
+HASH_QUEUE_SIZE = int(os.environ.get("HASH_QUEUE_SIZE", 32))
+
+# Token-bucket limits for /auth/register and /auth/login, per username and per client IP.
+AUTH_USER_RATE = float(os.environ.get("AUTH_USER_RATE", 0.2))
+AUTH_USER_BURST = int(os.environ.get("AUTH_USER_BURST", 5))
+AUTH_IP_RATE = float(os.environ.get("AUTH_IP_RATE", 5.0))
+AUTH_IP_BURST = int(os.environ.get("AUTH_IP_BURST", 50))
+
+# Maximum number of boards built by one /generate_boards/ request.
+GENERATE_BOARDS_MAX_COUNT = int(os.environ.get("GENERATE_BOARDS_MAX_COUNT", 10000))
+
+# Largest page of GET /boards, and how many boards it reads per query while streaming a page.
+BOARDS_PAGE_MAX_LIMIT = int(os.environ.get("BOARDS_PAGE_MAX_LIMIT", 10000))
+BOARDS_FETCH_CHUNK_SIZE = int(os.environ.get("BOARDS_FETCH_CHUNK_SIZE", 500))
+
+# Maximum number of IDs accepted by one POST /boards/get request.
+BOARDS_GET_MAX_IDS = int(os.environ.get("BOARDS_GET_MAX_IDS", 1000))
+
+# Seconds shared caches may reuse a complete /solve/ result (solved or no solution) for the same board.
+SOLVE_CACHE_MAX_AGE_SECONDS = int(os.environ.get("SOLVE_CACHE_MAX_AGE_SECONDS", 3600))
+
+# Maximum number of boards accepted by one /solve/batch request.
+SOLVE_BATCH_MAX_BOARDS = int(os.environ.get("SOLVE_BATCH_MAX_BOARDS", 1000))
+
+# Boards of one /solve/batch request solved at once, and the most whole-board solves queued or running on the
+# solver process pool across all batches (more batches are rejected with 503). Keep the first below SOLVER_WORKERS
+# so batches leave room for the subtrees of parallel /solve/ requests.
+SOLVE_BATCH_CONCURRENCY = int(os.environ.get("SOLVE_BATCH_CONCURRENCY", max(1, SOLVER_WORKERS // 2)))
+SOLVER_QUEUE_SIZE = int(os.environ.get("SOLVER_QUEUE_SIZE", 2 * SOLVER_WORKERS))
+
+# Upper bounds on the wall-clock seconds and search nodes of one /solve/ request (0 disables the bound).
+# Requests may ask for less with the `timeout` and `max_nodes` query parameters.
+SOLVE_TIMEOUT_SECONDS = float(os.environ.get("SOLVE_TIMEOUT_SECONDS", 30.0))
+SOLVE_MAX_NODES = int(os.environ.get("SOLVE_MAX_NODES", 0))
+
+# Background workers solving jobs from the SOLVE_JOB queue, and how often an idle worker polls it.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 1))
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", 1.0))
+
+# A running job records its progress every JOB_HEARTBEAT_SECONDS; a job without a heartbeat for
+# JOB_LEASE_SECONDS (its worker died) is claimed again.
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", 1.0))
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", 30.0))
+
+# Upper bounds on the wall-clock seconds and search nodes of one job (0 disables the bound).
+JOB_TIMEOUT_SECONDS = float(os.environ.get("JOB_TIMEOUT_SECONDS", 3600.0))
+JOB_MAX_NODES = int(os.environ.get("JOB_MAX_NODES", 0))
+
+# Record request, solver, database and executor metrics and serve them at /metrics ("0" turns both off).
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+
+# Sampling interval of the profiler run on requests sent with a valid dev key in `X-Profile`, how long their
+# profiles are kept, and how many are kept at most (the oldest are dropped first).
+PROFILE_INTERVAL_SECONDS = float(os.environ.get("PROFILE_INTERVAL_SECONDS", 0.001))
+PROFILE_TTL_SECONDS = float(os.environ.get("PROFILE_TTL_SECONDS", 3600.0))
+PROFILE_MAX_ENTRIES = int(os.environ.get("PROFILE_MAX_ENTRIES", 1000))
+
+# Board sizes ("ROWSxCOLS", comma separated) solved once at startup to warm the solver and the bulk-generation
+# tiling sets before the worker reports ready, and how long to wait for the solver processes to start.
+WARMUP_BOARD_SIZES = [tuple(int(side) for side in size.split("x"))
+                      for size in os.environ.get("WARMUP_BOARD_SIZES", "4x4,6x6").split(",") if size]
+WARMUP_TIMEOUT_SECONDS = float(os.environ.get("WARMUP_TIMEOUT_SECONDS", 30.0))
@@ -0,0 +1,238 @@
+"""
+In-process HTTP load test.
+
+Drives the ASGI app from `main.py` directly (no server, no network) with a weighted mix of requests sent at a
+fixed target rate, and reports throughput, latency percentiles and a latency histogram per route:
+
+    python loadtest.py --rps 50 --duration 20 --mix generate_board=3 solve=2 get_board=4 login=1
+
+Requests are sent open-loop: each one is due at a fixed time whether or not earlier ones have finished, and its
+latency is measured from that due time, so time spent waiting behind a blocked event loop or a full
+`--concurrency` limit is counted. The load generator shares the event loop with the app, as a client would
+share the server's CPU in production; anything that blocks the loop shows up in every route's latency.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from utils.stats import percentile
+
+# Upper bounds (in ms) of the histogram buckets; the last bucket is open-ended.
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+ROUTES = ["generate_board", "solve", "get_board", "login"]
+
+DEFAULT_MIX = {"generate_board": 3, "solve": 2, "get_board": 4, "login": 1}
+
+
+class RouteStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+
+    def record(self, seconds: float, status: int) -> None:
+        self.latencies.append(seconds)
+        self.statuses[status] += 1
+
+
+class LoadTest:
+    """
+    The client side of a run: a logged-in user, a pool of boards to solve, and the IDs of stored boards.
+    """
+
+    def __init__(self, client, board_size: int, distinct_boards: int, seed: int):
+        from services.domino_service import build_board
+
+        self.client = client
+        self.username = f"loadtest-{seed}"
+        self.password = "loadtest-password"
+        self.headers: Dict[str, str] = {}
+        self.board_size = board_size
+        rng_state = random.getstate()
+        random.seed(seed)
+        self.boards = [build_board(board_size, board_size).tolist() for _ in range(distinct_boards)]
+        random.setstate(rng_state)
+        self.board_ids: List[int] = []
+        self.random = random.Random(seed)
+
+    async def setup(self) -> None:
+        credentials = {"username": self.username, "password": self.password}
+        await self.client.post("/auth/register", json=credentials)
+        response = await self.client.post("/auth/login", json=credentials)
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['token']}"}
+        for _ in range(10):
+            await self.generate_board()
+
+    async def generate_board(self):
+        response = await self.client.get("/generate_board/", params={"rows": self.board_size, "cols": self.board_size})
+        if response.status_code == 200:
+            self.board_ids.append(response.json()["board_id"])
+        return response
+
+    async def solve(self):
+        board = self.random.choice(self.boards)
+        return await self.client.post("/solve/", json={"board": board}, headers=self.headers)
+
+    async def get_board(self):
+        return await self.client.get(f"/get_board_by_id/{self.random.choice(self.board_ids)}")
+
+    async def login(self):
+        return await self.client.post("/auth/login", json={"username": self.username, "password": self.password})
+
+    def route(self, name: str) -> Callable[[], Awaitable[Any]]:
+        return getattr(self, name)
+
+
+def histogram(latencies: Sequence[float]) -> Dict[str, int]:
+    counts = {f"<={bound}ms": 0 for bound in HISTOGRAM_BUCKETS_MS}
+    counts[f">{HISTOGRAM_BUCKETS_MS[-1]}ms"] = 0
+    for seconds in latencies:
+        ms = seconds * 1000
+        for bound in HISTOGRAM_BUCKETS_MS:
+            if ms <= bound:
+                counts[f"<={bound}ms"] += 1
+                break
+        else:
+            counts[f">{HISTOGRAM_BUCKETS_MS[-1]}ms"] += 1
+    return counts
+
+
+def summarize(stats: Dict[str, RouteStats], elapsed: float) -> List[Dict[str, Any]]:
+    results = []
+    for name, route_stats in stats.items():
+        latencies = route_stats.latencies
+        if not latencies:
+            continue
+        ok = sum(count for status, count in route_stats.statuses.items() if 200 <= status < 300)
+        results.append({
+            "route": name,
+            "requests": len(latencies),
+            "ok": ok,
+            "statuses": {str(status): count for status, count in sorted(route_stats.statuses.items())},
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+            "p90_ms": round(percentile(latencies, 0.9) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+            "max_ms": round(max(latencies) * 1000, 3),
+            "histogram": histogram(latencies),
+        })
+    return results
+
+
+async def run_load(mix: Dict[str, int], rps: float, duration: float, concurrency: int = 64, board_size: int = 6,
+                   distinct_boards: int = 50, seed: int = 2024) -> Dict[str, Any]:
+    """
+    Runs the app's lifespan, waits until the app is ready, sends `rps * duration` requests drawn from the
+    weighted `mix` and waits for them all to finish.
+    """
+    import httpx
+    from main import app, lifespan
+
+    stats = {name: RouteStats() for name in mix}
+    async with lifespan(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest") as client:
+            # Measure the warmed-up server, not the warm-up.
+            while (await client.get("/ready")).json().get("detail") == "warming_up":
+                await asyncio.sleep(0.05)
+            load_test = LoadTest(client, board_size, distinct_boards, seed)
+            await load_test.setup()
+            chooser = random.Random(seed)
+            names, weights = list(mix), list(mix.values())
+            slots = asyncio.Semaphore(concurrency)
+
+            async def send(name: str, due: float) -> None:
+                async with slots:
+                    try:
+                        response = await load_test.route(name)()
+                        status = response.status_code
+                    except Exception:
+                        status = 599
+                stats[name].record(time.perf_counter() - due, status)
+
+            tasks = []
+            start = time.perf_counter()
+            for i in range(int(rps * duration)):
+                due = start + i / rps
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.ensure_future(send(chooser.choices(names, weights)[0], due)))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - start
+
+    return {
+        "settings": {"mix": mix, "rps": rps, "duration": duration, "concurrency": concurrency,
+                     "board_size": board_size, "distinct_boards": distinct_boards, "seed": seed},
+        "elapsed": round(elapsed, 3),
+        "achieved_rps": round(sum(len(route_stats.latencies) for route_stats in stats.values()) / elapsed, 2),
+        "results": summarize(stats, elapsed),
+    }
+
+
+def format_table(report: Dict[str, Any]) -> str:
+    lines = [f"{report['achieved_rps']} requests/s over {report['elapsed']}s",
+             f"{'route':>15} {'reqs':>6} {'ok':>6} {'rps':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+             "  statuses"]
+    for row in report["results"]:
+        statuses = " ".join(f"{status}:{count}" for status, count in row["statuses"].items())
+        lines.append(f"{row['route']:>15} {row['requests']:>6} {row['ok']:>6} {row['throughput_rps']:>8} "
+                     f"{row['p50_ms']:>9.2f} {row['p90_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['max_ms']:>9.2f}"
+                     f"  {statuses}")
+    return "\n".join(lines)
+
+
+def parse_mix(values: Sequence[str]) -> Dict[str, int]:
+    mix = {}
+    for value in values:
+        name, _, weight = value.partition("=")
+        if name not in ROUTES:
+            raise argparse.ArgumentTypeError(f"Unknown route {name!r}, expected one of {', '.join(ROUTES)}.")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=50.0, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to send requests for")
+    parser.add_argument("--mix", nargs="+", metavar="ROUTE=WEIGHT", help=f"routes: {', '.join(ROUTES)}")
+    parser.add_argument("--concurrency", type=int, default=64, help="maximum requests in flight")
+    parser.add_argument("--board-size", type=int, default=6, help="rows and columns of generated and solved boards")
+    parser.add_argument("--distinct-boards", type=int, default=50,
+                        help="boards /solve/ picks from; repeats are answered by the solution cache")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--database", help="SQLite file to use (default: a fresh temporary one)")
+    parser.add_argument("--keep-auth-limits", action="store_true",
+                        help="keep the configured /auth rate limits instead of lifting them for the run")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    # The configuration is read at import time, so it has to be in place before the app is imported.
+    if args.database:
+        os.environ["DATABASE_PATH"] = args.database
+    else:
+        os.environ.setdefault("DATABASE_PATH", os.path.join(tempfile.mkdtemp(), "loadtest.db"))
+    if not args.keep_auth_limits:
+        for name in ("AUTH_USER_RATE", "AUTH_USER_BURST", "AUTH_IP_RATE", "AUTH_IP_BURST"):
+            os.environ.setdefault(name, "1000000")
+
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    report = asyncio.run(run_load(mix, args.rps, args.duration, args.concurrency, args.board_size,
+                                  args.distinct_boards, args.seed))
+    print(format_table(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,44 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from routers.board_routes import router as board_router
 from routers.auth_routes import router as auth_router
-from services.database.database import create_table
+from routers.job_routes import router as job_router
+from routers.metrics_routes import router as metrics_router
+from routers.profile_routes import router as profile_router
+from routers.health_routes import router as health_router
+from services.executor import shutdown_executors
+from services.job_queue import job_workers
+from services import metrics
+from services.parallel_solver import shutdown_process_pool
+from services.startup import set_status, start_up
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background: the server takes connections straight away and /ready answers 503 until done.
+    set_status("warming_up")
+    startup_task = asyncio.ensure_future(start_up())
+    yield
+    set_status("shutting_down")
+    startup_task.cancel()
+    await asyncio.gather(startup_task, return_exceptions=True)
+    await job_workers.stop()
+    shutdown_executors()
+    shutdown_process_pool()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
+if metrics.enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(board_router)
 app.include_router(auth_router, prefix="/auth")
-
-# Initialize the database
-create_table()
+app.include_router(job_router, prefix="/jobs")
+app.include_router(metrics_router)
+app.include_router(profile_router, prefix="/profiles")
+app.include_router(health_router)
 
 if __name__ == "__main__":
     import uvicorn
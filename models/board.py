@@ -1,12 +1,161 @@
-from typing import List
+from array import array
+from itertools import chain
+from typing import Any, Iterator, List, Optional, Sequence, Tuple, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
+
+from utils.numpy_support import np
+
+# The largest pip value a board may hold. Solving or generating a board builds the whole domino set up to its
+# largest pip, about half a million dominos at this limit.
+BOARD_MAX_PIPS = 1023
+
+# The longest side of a generated board, whose dominos have pips up to `max(rows, cols) - 1`.
+BOARD_MAX_SIDE = BOARD_MAX_PIPS + 1
+
+# Array typecodes of board cells, narrowest first: one, two or four signed bytes per cell.
+CELL_TYPECODES = ('b', 'h', 'i')
 
 
 class Board(BaseModel):
     """
     A models representing a board for the domino puzzle.
 
-    - **board**: A 2D list of integers representing the board configuration.
+    - **board**: A 2D list of integers representing the board configuration. It must be rectangular, with an
+      even number of cells and pip values from 0 to `BOARD_MAX_PIPS`.
     """
     board: List[List[int]]
+
+    @field_validator("board")
+    @classmethod
+    def check_board(cls, board: List[List[int]]) -> List[List[int]]:
+        error = board_error(board)
+        if error is not None:
+            raise ValueError(error)
+        return board
+
+    def grid(self) -> "BoardGrid":
+        return BoardGrid.from_rows(self.board)
+
+
+class BoardGrid:
+    """
+    A board kept as one flat buffer of signed cells in row-major order, in the narrowest of `CELL_TYPECODES`
+    that holds its pips.
+
+    `grid[x]` is a view of row `x` into that buffer, so code written for `List[List[int]]` (`board[x][y]`,
+    `len(board[0])`, iterating over rows) reads a grid, and writes it when the buffer is writable, without
+    copying it. `cells` is a `bytes` or `bytearray` (one signed byte per cell), an `array` of one of
+    `CELL_TYPECODES` or a memoryview of one of those. Without `cells` the board starts as zeros wide enough
+    for the pips of a generated board of its size.
+    """
+    __slots__ = ("rows", "cols", "cells", "_rows")
+
+    def __init__(self, rows: int, cols: int, cells: Optional[Union[bytes, bytearray, array, memoryview]] = None):
+        if cells is None:
+            cells = array(cell_typecode(0, max(rows, cols) - 1), [0]) * (rows * cols)
+        self.rows = rows
+        self.cols = cols
+        self.cells = memoryview(cells)
+        if self.cells.format == 'B':
+            self.cells = self.cells.cast('b')
+        if len(self.cells) != rows * cols:
+            raise ValueError("Board must be rectangular.")
+        # The row views, made on first use: boards that are only encoded never need them.
+        self._rows: Optional[Tuple[memoryview, ...]] = None
+
+    @classmethod
+    def from_rows(cls, board: Union["BoardGrid", Sequence[Sequence[int]]]) -> "BoardGrid":
+        if isinstance(board, BoardGrid):
+            return board
+        rows, cols = len(board), len(board[0]) if board else 0
+        if any(len(row) != cols for row in board):
+            raise ValueError("Board must be rectangular.")
+        return cls(rows, cols, cell_array(board))
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, x: int) -> memoryview:
+        return (self._rows or self._row_views())[x]
+
+    def __iter__(self) -> Iterator[memoryview]:
+        return iter(self._rows or self._row_views())
+
+    def _row_views(self) -> Tuple[memoryview, ...]:
+        cells, cols = self.cells, self.cols
+        self._rows = tuple(cells[start:start + cols] for start in range(0, self.rows * cols, cols))
+        return self._rows
+
+    def tolist(self) -> List[List[int]]:
+        return [row.tolist() for row in self]
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, BoardGrid):
+            return (self.rows, self.cols) == (other.rows, other.cols) and self.cells == other.cells
+        if isinstance(other, list):
+            return self.tolist() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # Memoryviews do not pickle; the solver processes get a copy of the cells.
+        return BoardGrid, (self.rows, self.cols, array(self.cells.format, self.cells.tobytes()))
+
+    def __repr__(self) -> str:
+        return f"BoardGrid({self.rows}, {self.cols}, {self.tolist()!r})"
+
+
+def cell_typecode(low: int, high: int) -> str:
+    """
+    The narrowest of `CELL_TYPECODES` whose cells hold every value from `low` to `high`.
+    """
+    for typecode in CELL_TYPECODES:
+        limit = 1 << (8 * array(typecode).itemsize - 1)
+        if -limit <= low and high < limit:
+            return typecode
+    raise OverflowError(f"Pip values from {low} to {high} do not fit in a board cell.")
+
+
+def cell_array(board: Sequence[Sequence[int]]) -> array:
+    """
+    The cells of `board` in row-major order, in the narrowest cell type that holds them.
+    """
+    try:
+        return array('b', chain.from_iterable(board))
+    except OverflowError:
+        cells = list(chain.from_iterable(board))
+        return array(cell_typecode(min(cells), max(cells)), cells)
+
+
+def board_error(board: List[List[int]]) -> Optional[str]:
+    """
+    Why `board` is not a valid board, or `None` if it is. Checked with array operations when NumPy is installed.
+    """
+    if np is not None:
+        try:
+            cells = np.array(board, dtype=np.int64)
+        except (ValueError, OverflowError):
+            return "Board must be rectangular."
+        if cells.ndim != 2 or not cells.size:
+            return "Board must have at least one row and one column."
+        if cells.size % 2:
+            return "Board size must be even."
+        if cells.min() < 0 or cells.max() > BOARD_MAX_PIPS:
+            return f"Pip values must be between 0 and {BOARD_MAX_PIPS}."
+        return None
+    if not board or not board[0]:
+        return "Board must have at least one row and one column."
+    cols = len(board[0])
+    if any(len(row) != cols for row in board):
+        return "Board must be rectangular."
+    if len(board) * cols % 2:
+        return "Board size must be even."
+    if min(map(min, board)) < 0 or max(map(max, board)) > BOARD_MAX_PIPS:
+        return f"Pip values must be between 0 and {BOARD_MAX_PIPS}."
+    return None
+
+
+# Anything the board functions accept: a `BoardGrid` or rows of pip values.
+BoardRows = Union[BoardGrid, List[List[int]]]
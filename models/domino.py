@@ -1,5 +1,11 @@
-class Domino:
-    def __init__(self, side1: int, side2: int):
-        self.side1 = side1
-        self.side2 = side2
-        self.used = False
+from typing import NamedTuple
+
+
+class Domino(NamedTuple):
+    """
+    An immutable domino. Which dominos a search has placed is tracked by the solver, as a bitset over the
+    dominos' indices in the domino list.
+    """
+    side1: int
+    side2: int
+
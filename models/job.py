@@ -0,0 +1,41 @@
+from enum import Enum
+from typing import List, NamedTuple, Optional, Tuple
+
+from models.board import BoardGrid
+
+
+class JobStatus(str, Enum):
+    """
+    The lifecycle of a solve job.
+
+    - **queued**: Waiting for a worker (again, if its previous worker went away).
+    - **running**: Being solved; `nodes` is updated as the search goes.
+    - **finished**: Done; `result` holds the outcome of the solve.
+    - **failed**: The solver raised an error.
+    """
+    queued = "queued"
+    running = "running"
+    finished = "finished"
+    failed = "failed"
+
+
+class SolveJob(NamedTuple):
+    """
+    A row of the SOLVE_JOB table, with its board and its solution (or the best partial placement of an
+    interrupted solve) as cell `pairs`.
+    """
+    id: int
+    board_id: int
+    owner: str
+    engine: str
+    timeout: Optional[float]
+    max_nodes: Optional[int]
+    status: JobStatus
+    result: Optional[str]
+    nodes: int
+    error: Optional[str]
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    board: BoardGrid
+    pairs: Optional[List[Tuple[int, int]]]
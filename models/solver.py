@@ -0,0 +1,44 @@
+from enum import Enum
+
+
+class SolverEngine(str, Enum):
+    """
+    The search engines available to the `/solve/` endpoint.
+
+    - **auto**: `parallel` for boards of at least `PARALLEL_MIN_CELLS` cells, `bitmask` otherwise.
+    - **backtracking**: The recursive `solve_puzzle` search.
+    - **parallel**: The bitmask search split into subtrees solved on the process pool.
+    - **bitmask**: The stack-based exact-cover search over cell and domino bitmasks.
+    """
+    auto = "auto"
+    backtracking = "backtracking"
+    parallel = "parallel"
+    bitmask = "bitmask"
+
+
+class OutputFormat(str, Enum):
+    """
+    The response formats of the `/solve/` endpoints.
+
+    - **text**: The ASCII rendering of the board, the dominos and the solution.
+    - **json**: `{"solved": ..., "placement": [{"domino": ..., "cell": ..., "orientation": ...}, ...]}`.
+    """
+    text = "text"
+    json = "json"
+
+
+class SolveStatus(str, Enum):
+    """
+    The outcome of a solve.
+
+    - **solved**: A complete placement was found.
+    - **no_solution**: The whole search space was explored without finding one.
+    - **timed_out**: The wall-clock budget ran out first.
+    - **node_limit**: The search-node budget ran out first.
+    - **cancelled**: The client went away before the search finished.
+    """
+    solved = "solved"
+    no_solution = "no_solution"
+    timed_out = "timed_out"
+    node_limit = "node_limit"
+    cancelled = "cancelled"
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-from services.auth_service import (generate_nonce, pbkdf2_sha256, generate_token, authenticate, generate_dev_key,
-                                   users, active_tokens, dev_keys)
+import config
+from services.auth_service import (generate_nonce, hash_password, passwords_match, check_auth_rate_limit, issue_dev_key,
+                                   issue_token, save_user, users, LEGACY_PBKDF2_ITERATIONS)
+from services.executor import run_io
 
 router = APIRouter()
 
@@ -16,49 +18,55 @@ class DevKeyResponse(BaseModel):
 
 
 @router.post("/register")
-async def register_route(credentials: UserCredentials):
+async def register_route(credentials: UserCredentials, request: Request):
     username = credentials.username
     password = credentials.password
+    check_auth_rate_limit(request, username)
 
-    if username in users:
+    # The session store may be SQLite, so every read and write goes through the IO executor.
+    if await run_io(users.get, username) is not None:
         raise HTTPException(status_code=400, detail="User already exists.")
 
     salt = generate_nonce(16)
-    hashed_password = pbkdf2_sha256(password, salt, 4096, 32)
+    iterations = config.PBKDF2_ITERATIONS
+    hashed_password = await hash_password(password, salt, iterations)
 
-    users[username] = {"salt": salt, "hashed_password": hashed_password}
+    await run_io(save_user, username, salt, hashed_password, iterations)
     return {"message": f"User {username} registered successfully."}
 
 
 @router.post("/login")
-async def login_route(credentials: UserCredentials):
+async def login_route(credentials: UserCredentials, request: Request):
     username = credentials.username
     password = credentials.password
+    check_auth_rate_limit(request, username)
 
-    user = users.get(username)
+    user = await run_io(users.get, username)
     if not user:
         raise HTTPException(status_code=400, detail="Invalid username or password.")
 
     salt = user["salt"]
-    hashed_password = pbkdf2_sha256(password, salt, 4096, 32)
+    iterations = user.get("iterations", LEGACY_PBKDF2_ITERATIONS)
+    hashed_password = await hash_password(password, salt, iterations)
 
-    if hashed_password != user["hashed_password"]:
+    if not passwords_match(hashed_password, user["hashed_password"]):
         raise HTTPException(status_code=400, detail="Invalid username or password.")
 
-    token = generate_token()
-    active_tokens[token] = username
-    return {"token": token}
+    if iterations != config.PBKDF2_ITERATIONS:
+        # The password is known to be correct here, so upgrade the stored hash to the current count.
+        iterations = config.PBKDF2_ITERATIONS
+        hashed_password = await hash_password(password, salt, iterations)
+        await run_io(save_user, username, salt, hashed_password, iterations)
+
+    return {"token": await run_io(issue_token, username)}
 
 
 @router.post("/create_dev_key")
 async def create_dev_key_route(request: Request):
     token = request.headers.get("Authorization")
 
-    if not authenticate(token):
+    dev_key = await run_io(issue_dev_key, token) if token else None
+    if dev_key is None:
         raise HTTPException(status_code=401, detail="Unauthorized: Invalid or missing token.")
 
-    username = active_tokens[token]
-    dev_key = generate_dev_key()
-    dev_keys[dev_key] = username
-
     return DevKeyResponse(dev_key=dev_key)
@@ -1,82 +1,462 @@
-from fastapi import APIRouter, HTTPException, Depends
-from starlette.responses import PlainTextResponse
-from models.board import Board
-from services.database.database import get_board_by_id
-from services.domino_service import generate_board, generate_dominos, generate_all_boards, find_max_pips, solve_puzzle, \
-    solve_puzzle_parallel
-from utils.printer import print_board_with_solution, print_dominos
-from services.auth_service import get_current_user
+import asyncio
+import json
+from itertools import islice
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from fastapi import APIRouter, Body, HTTPException, Depends, Query, Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+import config
+from models.board import BOARD_MAX_SIDE, Board, BoardGrid
+from models.domino import Domino
+from models.solver import OutputFormat, SolverEngine, SolveStatus
+from services.board_generation import generate_boards
+from services.database.board_codec import decode_board, encode_board
+from services.database.database import get_board_with_solution, get_boards_by_ids, get_boards_page, \
+    get_encoded_board, save_board_solution, save_boards_to_db, StoredBoard
+from services.domino_service import generate_board, generate_dominos, generate_all_boards_stream, find_max_pips, \
+    solve_board, BoardEnumerator
+from services.batch_solver import solve_batch
+from services.executor import run_cpu, run_io, solver_executor
+from services.solution_cache import solution_cache, solve_board_cached, fill_placement
+from services.profiling import run_profiled, save_profile
+from services.solver_budget import SearchInterrupted, SearchTrace, SolveBudget, cap_limit
+from utils.http_cache import IMMUTABLE_CACHE_CONTROL, content_etag, etag_matches
+from utils.printer import print_board_with_solution, print_dominos, solution_to_json
+from services.auth_service import get_current_user, get_profiling_user
 
 router = APIRouter()
 
+# How often a running solve checks whether its client has disconnected.
+DISCONNECT_POLL_SECONDS = 0.1
+
 
 @router.get("/generate_board/", summary="Generate a Domino Board")
-async def generate_board_route(rows: int, cols: int):
+async def generate_board_route(rows: int = Query(..., ge=1, le=BOARD_MAX_SIDE),
+                               cols: int = Query(..., ge=1, le=BOARD_MAX_SIDE)):
     """
     Generates a domino board of a given size and stores it in the database.
 
-    - **rows**: The number of rows in the board.
-    - **cols**: The number of columns in the board.
+    - **rows**: The number of rows in the board, at most `BOARD_MAX_SIDE`.
+    - **cols**: The number of columns in the board, at most `BOARD_MAX_SIDE`.
 
     The board size must be even (rows * cols).
     """
     if rows * cols % 2 != 0:
         raise HTTPException(status_code=400, detail="Board size must be even.")
-    board, board_id = generate_board(rows, cols)
+    board, board_id = await run_io(generate_board, rows, cols)
     return {"board": board, "board_id": board_id}
 
 
+@router.get("/generate_boards/", summary="Generate Many Domino Boards",
+            responses={400: {"description": "Invalid board size"},
+                       413: {"description": "Too many boards requested"}})
+async def generate_boards_route(rows: int = Query(..., ge=1, le=BOARD_MAX_SIDE),
+                                cols: int = Query(..., ge=1, le=BOARD_MAX_SIDE), count: int = Query(..., ge=1),
+                                seed: Optional[int] = None):
+    """
+    Generates `count` domino boards of a given size at once and stores them in one transaction.
+
+    Unlike `/generate_board/`, the dominos are laid on a mix of horizontal and vertical tilings.
+
+    - **rows**: The number of rows in the board, at most `BOARD_MAX_SIDE`.
+    - **cols**: The number of columns in the board, at most `BOARD_MAX_SIDE`.
+    - **count**: The number of boards, at most `GENERATE_BOARDS_MAX_COUNT`.
+    - **seed**: Seed of the random generator; the same seed gives the same boards.
+
+    The board size must be even (rows * cols).
+    """
+    if rows * cols % 2 != 0:
+        raise HTTPException(status_code=400, detail="Board size must be even.")
+    if count > config.GENERATE_BOARDS_MAX_COUNT:
+        raise HTTPException(status_code=413,
+                            detail=f"At most {config.GENERATE_BOARDS_MAX_COUNT} boards per request.")
+    boards = await run_cpu(generate_boards, rows, cols, count, seed)
+    board_ids = await run_io(save_boards_in_one_transaction, cols, rows, boards)
+    return {"boards": [{"board": board.tolist(), "board_id": board_id} for board, board_id in zip(boards, board_ids)]}
+
+
+def save_boards_in_one_transaction(cols: int, rows: int, boards: List[BoardGrid]) -> List[int]:
+    return list(save_boards_to_db(cols, rows, boards, chunk_size=len(boards)))
+
+
 @router.post("/solve/", response_class=PlainTextResponse,
-             responses={200: {"description": "A solution for the provided domino board"},
-                        400: {"description": "Invalid board size"}})
-async def solve_route(board: Board, user: str = Depends(get_current_user)):
+             responses={200: {"description": "A solution for the provided domino board",
+                              "content": {"application/json": {}}},
+                        422: {"description": "Invalid board"},
+                        503: {"description": "Too many solves in progress"}})
+async def solve_route(board: Board, request: Request, engine: SolverEngine = SolverEngine.auto,
+                      format: Optional[OutputFormat] = None, timeout: Optional[float] = Query(None, gt=0),
+                      max_nodes: Optional[int] = Query(None, ge=1), user: str = Depends(get_current_user),
+                      profiler: Optional[str] = Depends(get_profiling_user)):
     """
     Solves the domino puzzle for the given board configuration.
 
+    Results are cached by canonical board, so boards that differ only by rotation, reflection or a relabelling
+    of pip values are solved once.
+
     - **board**: The board configuration to solve.
+    - **engine**: The search engine to use (`auto`, `backtracking`, `parallel` or `bitmask`).
+    - **format**: `text` for the ASCII rendering or `json` for the placement as a list of dominos. Defaults to
+      `json` when the `Accept` header asks for `application/json`, `text` otherwise.
+    - **timeout**: Seconds the search may run, at most `SOLVE_TIMEOUT_SECONDS`.
+    - **max_nodes**: Search nodes the search may visit, at most `SOLVE_MAX_NODES`.
+
+    When the budget runs out (or the client disconnects) the search stops and the response carries the
+    `timed_out`/`node_limit` status, the deepest partial placement found and the number of nodes explored.
+
+    Complete results carry a weak `ETag` derived from the board and the format, and may be cached. A request
+    whose `If-None-Match` names it gets a `304 Not Modified` without solving the board again. Interrupted
+    results are sent with `Cache-Control: no-store`.
+
+    Sending a dev key in the `X-Profile` header profiles the request: the board is solved without the cache
+    (with `bitmask` in place of `auto`), under a sampling profiler and with a trace of the search. The profile
+    is stored and its ID returned in the `X-Profile-Id` response header, see `GET /profiles/{profile_id}`.
+    """
+    output = resolve_output_format(request, format)
+    etag = None
+    if profiler is None:
+        etag = content_etag(output.value.encode(), encode_board(board.board), weak=True)
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=solve_cache_headers(etag))
+    budget = solve_budget(timeout, max_nodes)
+    (content, status, _), profile_id = await run_solve(request, budget, profiler, board.board, engine, None, output)
+    response = solution_response(content, profile_id)
+    if etag is not None and status in (SolveStatus.solved, SolveStatus.no_solution):
+        response.headers.update(solve_cache_headers(etag))
+    else:
+        response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def solve_cache_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": f"public, max-age={config.SOLVE_CACHE_MAX_AGE_SECONDS}", "Vary": "Accept"}
+
+
+@router.post("/solve/batch", responses={200: {"description": "One NDJSON result line per board"},
+                                        413: {"description": "Too many boards in the batch"},
+                                        503: {"description": "The solver process pool is saturated"}})
+async def solve_batch_route(boards: List[Board], timeout: Optional[float] = Query(None, gt=0),
+                            max_nodes: Optional[int] = Query(None, ge=1), user: str = Depends(get_current_user)):
     """
-    dominos = generate_dominos(find_max_pips(board.board))
-    placement = [[None for _ in range(len(board.board[0]))] for _ in range(len(board.board))]
-    solved = solve_puzzle_parallel(board.board, dominos, 0, 0, placement)
+    Solves many boards in one request on the solver process pool.
 
-    solution_str = "Domino Board:\n"
-    solution_str += print_board_with_solution(board.board, placement, False)
-    solution_str += "\nDominos:\n"
-    solution_str += print_dominos(dominos, find_max_pips(board.board))
+    Results are streamed back as NDJSON in the order they finish, one line per board:
+    `{"index": ..., "solved": ..., "status": ..., "placement": ...}`, where `index` is the board's position in
+    the request, `status` is one of `solved`, `no_solution`, `timed_out` or `node_limit`, and `placement` is the
+    solution, or the deepest partial placement of an interrupted solve, as the domino/cell/orientation list
+    `/solve/` returns with `format=json` (`null` when there is no solution). Boards that are the same up to
+    rotation, reflection or pip relabelling are solved once.
+
+    - **boards**: The board configurations to solve.
+    - **timeout** / **max_nodes**: The budget of every board, as for `/solve/`.
+    """
+    if len(boards) > config.SOLVE_BATCH_MAX_BOARDS:
+        raise HTTPException(status_code=413, detail=f"At most {config.SOLVE_BATCH_MAX_BOARDS} boards per batch.")
+    solver_executor.reject_if_full()
+    timeout, max_nodes = cap_limit(timeout, config.SOLVE_TIMEOUT_SECONDS), cap_limit(max_nodes, config.SOLVE_MAX_NODES)
+
+    async def lines() -> AsyncIterator[str]:
+        async for result in solve_batch([board.board for board in boards], timeout, max_nodes):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/solve_by_id/{board_id}", response_class=PlainTextResponse,
+             responses={200: {"description": "A solution for the stored domino board",
+                              "content": {"application/json": {}}},
+                        404: {"description": "Board not found"},
+                        503: {"description": "Too many solves in progress"}})
+async def solve_by_id_route(board_id: int, request: Request, engine: SolverEngine = SolverEngine.auto,
+                            format: Optional[OutputFormat] = None, timeout: Optional[float] = Query(None, gt=0),
+                            max_nodes: Optional[int] = Query(None, ge=1), user: str = Depends(get_current_user),
+                            profiler: Optional[str] = Depends(get_profiling_user)):
+    """
+    Solves a board stored in the database by its ID.
+
+    The first call solves the board and stores the solution (or that none exists) next to it; later calls
+    read it back with the board.
+
+    - **board_id**: The ID of the board to solve.
+    - **engine**: The search engine to use for the first solve.
+    - **format**: `text` or `json`, as for `/solve/`.
+    - **timeout** / **max_nodes**: The budget of the first solve, as for `/solve/`. An interrupted solve is not
+      stored.
+
+    A dev key in the `X-Profile` header profiles the request as for `/solve/`.
+    """
+    output = resolve_output_format(request, format)
+    budget = solve_budget(timeout, max_nodes)
+    stored = await run_io(get_board_with_solution, board_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Board not found.")
+    board, solution = stored
+    (content, status, pairs), profile_id = await run_solve(request, budget, profiler, board, engine, solution,
+                                                           output)
+    if solution is None and status in (SolveStatus.solved, SolveStatus.no_solution):
+        await run_io(save_board_solution, board_id, status == SolveStatus.solved, pairs)
+    return solution_response(content, profile_id)
+
+
+def solve_budget(timeout: Optional[float], max_nodes: Optional[int]) -> SolveBudget:
+    """
+    Builds the budget of one solve from the request's limits, capped by the configured ones.
+    """
+    return SolveBudget(cap_limit(timeout, config.SOLVE_TIMEOUT_SECONDS), cap_limit(max_nodes, config.SOLVE_MAX_NODES))
+
+
+async def run_cpu_until_disconnected(request: Request, budget: SolveBudget, fn: Callable[..., Any],
+                                     *args: Any) -> Any:
+    """
+    Runs `fn` on the CPU executor and cancels `budget` if the client disconnects before it returns, so the
+    search stops instead of running on for nobody.
+    """
+    task = asyncio.ensure_future(run_cpu(fn, *args))
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            budget.cancel()
+            return await task
+
+
+async def run_solve(request: Request, budget: SolveBudget, profiler: Optional[str], board: List[List[int]],
+                    engine: SolverEngine, solution: Optional[Tuple[bool, List[Tuple[int, int]]]],
+                    output: OutputFormat) -> Tuple[Tuple[Any, SolveStatus, List[Tuple[int, int]]], Optional[str]]:
+    """
+    Runs `solve_and_render` until done or the client disconnects. For a profiled request (`profiler` is the
+    owner of the dev key that asked for it), the solve skips the cache and runs under `run_profiled` with a
+    search trace, and the ID of the stored profile is returned next to the result.
+    """
+    if profiler is None:
+        result = await run_cpu_until_disconnected(request, budget, solve_and_render, board, engine, solution, output,
+                                                  budget)
+        return result, None
+    budget.trace = SearchTrace()
+    if engine == SolverEngine.auto:
+        # The parallel engine searches in the solver processes, out of reach of the profiler and the trace.
+        engine = SolverEngine.bitmask
+    result, profile = await run_cpu_until_disconnected(request, budget, run_profiled, solve_and_render, board,
+                                                       engine, solution, output, budget, False)
+    profile_id = await run_io(save_profile, profile, budget.trace, owner=profiler, route=request.url.path,
+                              engine=engine.value, status=result[1].value, nodes=budget.nodes)
+    return result, profile_id
 
-    if solved:
-        solution_str += "\nSolution:\n"
-        solution_str += print_board_with_solution(board.board, placement, True)
+
+def resolve_output_format(request: Request, output: Optional[OutputFormat]) -> OutputFormat:
+    """
+    An explicit `format` query parameter wins; otherwise JSON is picked when the client accepts it and not plain text.
+    """
+    if output is not None:
+        return output
+    accept = request.headers.get("accept", "")
+    if "application/json" in accept and "text/plain" not in accept:
+        return OutputFormat.json
+    return OutputFormat.text
+
+
+def solution_response(content: Union[str, Dict[str, Any]], profile_id: Optional[str] = None) -> Response:
+    headers = None if profile_id is None else {"X-Profile-Id": profile_id}
+    if isinstance(content, dict):
+        return JSONResponse(content=content, headers=headers)
+    return PlainTextResponse(content=content, headers=headers)
+
+
+def solve_and_render(board: List[List[int]], engine: SolverEngine,
+                     solution: Optional[Tuple[bool, List[Tuple[int, int]]]] = None,
+                     output: OutputFormat = OutputFormat.text, budget: Optional[SolveBudget] = None,
+                     cached: bool = True) -> Tuple[Union[str, Dict[str, Any]], SolveStatus, List[Tuple[int, int]]]:
+    """
+    Solves a board within `budget` (or fills in a stored `solution`) and renders it in the `output` format.
+    Runs on the CPU executor. With `cached` false, the solution cache is neither read nor filled.
+    """
+    nodes = 0 if budget is None else budget.nodes
+    if output == OutputFormat.json and solution is not None:
+        solved, pairs = solution
+        status = SolveStatus.solved if solved else SolveStatus.no_solution
+        return solution_json(board, status, pairs, nodes), status, pairs
+    dominos = generate_dominos(find_max_pips(board))
+    placement = [[None for _ in range(len(board[0]))] for _ in range(len(board))]
+    if solution is None:
+        pairs = []
+        try:
+            solve = solve_board_cached if cached else solve_board
+            solved = solve(board, dominos, engine, placement, pairs, budget)
+            status = SolveStatus.solved if solved else SolveStatus.no_solution
+        except SearchInterrupted as e:
+            status, pairs = e.status, e.pairs
+            placement = [[None for _ in range(len(board[0]))] for _ in range(len(board))]
+            fill_placement(board, pairs, placement)
+        nodes = 0 if budget is None else budget.nodes
+    else:
+        solved, pairs = solution
+        status = SolveStatus.solved if solved else SolveStatus.no_solution
+        fill_placement(board, pairs, placement)
+    if output == OutputFormat.json:
+        return solution_json(board, status, pairs, nodes), status, pairs
+    return render_solution(board, dominos, placement, status, nodes), status, pairs
+
+
+def solution_json(board: List[List[int]], status: SolveStatus, pairs: List[Tuple[int, int]],
+                  nodes: int) -> Dict[str, Any]:
+    """
+    `placement` is the solution, the deepest partial placement for an interrupted search, or `null`.
+    """
+    return {"status": status.value, "solved": status == SolveStatus.solved, "nodes": nodes,
+            "placement": None if status == SolveStatus.no_solution else solution_to_json(board, pairs)}
+
+
+def render_solution(board: List[List[int]], dominos: List[Domino], placement: List[List[Optional[int]]],
+                    status: SolveStatus, nodes: int = 0) -> str:
+    parts = ["Domino Board:\n", print_board_with_solution(board, placement, False),
+             "\nDominos:\n", print_dominos(dominos, find_max_pips(board))]
+
+    if status == SolveStatus.solved:
+        parts += ["\nSolution:\n", print_board_with_solution(board, placement, True)]
+    elif status == SolveStatus.no_solution:
+        parts.append("\nNo solution exists.\n")
     else:
-        solution_str += "\nNo solution exists.\n"
+        parts += [f"\nSearch stopped ({status.value}) after {nodes} nodes.\nBest partial placement:\n",
+                  print_board_with_solution(board, placement, True)]
+
+    return "".join(parts)
 
-    return PlainTextResponse(content=solution_str)
+
+@router.get("/cache_stats/", summary="Get Solution Cache Statistics")
+async def cache_stats_route():
+    """
+    Returns the hit and miss counters of the solution cache used by `/solve/`.
+    """
+    return solution_cache.stats()
 
 
 @router.get("/generate_all_boards/", summary="Generate All Unique Domino Boards")
-async def generate_all_boards_route(rows: int, cols: int):
+async def generate_all_boards_route(rows: int = Query(..., ge=1, le=BOARD_MAX_SIDE),
+                                    cols: int = Query(..., ge=1, le=BOARD_MAX_SIDE),
+                                    limit: Optional[int] = Query(None, ge=1), offset: int = Query(0, ge=0),
+                                    cursor: Optional[str] = None):
     """
     Generates all unique domino boards of a given size and stores them in the database.
 
-    - **rows**: The number of rows in the board.
-    - **cols**: The number of columns in the board.
+    The IDs are streamed back as NDJSON while generation continues. The last line holds a `next_cursor` to
+    pass back as `cursor` for the next page, or `null` once every board has been generated.
+
+    - **rows**: The number of rows in the board, at most `BOARD_MAX_SIDE`.
+    - **cols**: The number of columns in the board, at most `BOARD_MAX_SIDE`.
+    - **limit**: The maximum number of boards to generate.
+    - **offset**: The number of boards to skip.
+    - **cursor**: Resume right after the last board of an earlier request.
 
     The board size must be even (rows * cols).
     """
     if rows * cols % 2 != 0:
         raise HTTPException(status_code=400, detail="Board size must be even.")
-    board_ids = generate_all_boards(rows, cols)
-    return {"board_ids": board_ids}
+    try:
+        enumerator = BoardEnumerator(rows, cols, offset, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def lines() -> Iterator[str]:
+        yield from board_ids_ndjson(generate_all_boards_stream(enumerator))
+        yield json.dumps({"next_cursor": None if enumerator.exhausted else enumerator.cursor}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
-@router.get("/get_board_by_id/{board_id}", summary="Get Board by ID")
-async def get_board_by_id_route(board_id: int):
+def board_ids_ndjson(board_ids: Iterator[int]) -> Iterator[str]:
+    """
+    Formats board IDs as NDJSON, one `{"board_id": ...}` line each, flushed a chunk at a time.
+    """
+    while True:
+        lines = [f'{{"board_id": {board_id}}}\n' for board_id in islice(board_ids, config.BULK_INSERT_CHUNK_SIZE)]
+        if not lines:
+            break
+        yield "".join(lines)
+
+
+@router.get("/get_board_by_id/{board_id}", summary="Get Board by ID",
+            responses={304: {"description": "The client's copy is current"}, 404: {"description": "Board not found"}})
+async def get_board_by_id_route(board_id: int, request: Request):
     """
     Retrieves a board configuration from the database by its ID.
 
+    Stored boards never change, so the response carries a strong `ETag` derived from the board and
+    `Cache-Control: immutable`. A request whose `If-None-Match` names the current tag gets a `304 Not Modified`
+    without the board being decoded or serialized.
+
     - **board_id**: The ID of the board to retrieve.
     """
-    board = get_board_by_id(board_id)
-    if board is None:
+    encoded = await run_io(get_encoded_board, board_id)
+    if encoded is None:
         raise HTTPException(status_code=404, detail="Board not found.")
-    return {"board": board}
+    if isinstance(encoded, str):
+        encoded = encode_board(decode_board(encoded))
+    headers = {"ETag": content_etag(encoded), "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content={"board": decode_board(encoded)}, headers=headers)
+
+
+@router.get("/boards", summary="List Boards", responses={200: {"description": "One NDJSON line per board"}})
+async def list_boards_route(after_id: int = Query(0, ge=0),
+                            limit: int = Query(100, ge=1, le=config.BOARDS_PAGE_MAX_LIMIT),
+                            rows: Optional[int] = None, cols: Optional[int] = None):
+    """
+    Lists stored boards in ID order, a page at a time.
+
+    Boards are streamed back as NDJSON, one `{"board_id", "rows", "cols", "board"}` line each. The last line
+    holds a `next_after_id` to pass back as `after_id` for the next page, or `null` once there are no more
+    boards.
+
+    - **after_id**: Only boards with a larger ID (the `next_after_id` of the previous page).
+    - **limit**: The maximum number of boards in the page, at most `BOARDS_PAGE_MAX_LIMIT`.
+    - **rows** / **cols**: Only boards of this size.
+    """
+
+    async def lines() -> AsyncIterator[str]:
+        last_id, remaining = after_id, limit
+        while remaining:
+            chunk_size = min(remaining, config.BOARDS_FETCH_CHUNK_SIZE)
+            page = await run_io(get_boards_page, last_id, chunk_size, rows, cols)
+            if page:
+                yield stored_boards_ndjson(page)
+                last_id = page[-1][0]
+            if len(page) < chunk_size:
+                yield json.dumps({"next_after_id": None}) + "\n"
+                return
+            remaining -= len(page)
+        yield json.dumps({"next_after_id": last_id}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/boards/get", summary="Get Boards by ID",
+             responses={200: {"description": "One NDJSON line per board"},
+                        413: {"description": "Too many IDs in the request"}})
+async def get_boards_route(board_ids: List[int] = Body(...)):
+    """
+    Retrieves many boards by ID with one database query.
+
+    Boards are streamed back as NDJSON in ID order, one `{"board_id", "rows", "cols", "board"}` line each. The
+    last line lists the requested IDs that were not found: `{"missing": [...]}`.
+
+    - **board_ids**: A JSON array of up to `BOARDS_GET_MAX_IDS` board IDs.
+    """
+    if len(board_ids) > config.BOARDS_GET_MAX_IDS:
+        raise HTTPException(status_code=413, detail=f"At most {config.BOARDS_GET_MAX_IDS} IDs per request.")
+    stored = await run_io(get_boards_by_ids, board_ids)
+
+    def lines() -> Iterator[str]:
+        for start in range(0, len(stored), config.BOARDS_FETCH_CHUNK_SIZE):
+            yield stored_boards_ndjson(stored[start:start + config.BOARDS_FETCH_CHUNK_SIZE])
+        found = {board_id for board_id, _, _, _ in stored}
+        missing = [board_id for board_id in dict.fromkeys(board_ids) if board_id not in found]
+        yield json.dumps({"missing": missing}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def stored_boards_ndjson(stored: List[StoredBoard]) -> str:
+    return "".join(json.dumps({"board_id": board_id, "rows": rows, "cols": cols, "board": decode_board(board)}) + "\n"
+                   for board_id, rows, cols, board in stored)
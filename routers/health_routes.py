@@ -0,0 +1,20 @@
+from fastapi import APIRouter, HTTPException
+
+from services import startup
+
+router = APIRouter()
+
+
+@router.get("/ready", summary="Get Readiness",
+            responses={503: {"description": "Still warming up, warm-up failed, or shutting down"}})
+async def ready_route():
+    """
+    Reports whether this worker should be sent traffic. The server accepts connections while it warms up in
+    the background, so other routes already answer (more slowly) before this one does.
+
+    - **200**: The database schema is in place, the solver is warmed up and the job workers are running.
+    - **503**: The `detail` says why not: `warming_up`, `failed` or `shutting_down`.
+    """
+    if startup.status != "ready":
+        raise HTTPException(status_code=503, detail=startup.status, headers={"Retry-After": "1"})
+    return {"status": "ready"}
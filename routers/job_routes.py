@@ -0,0 +1,64 @@
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+import config
+from models.board import Board
+from models.job import JobStatus
+from models.solver import SolverEngine, SolveStatus
+from services.auth_service import get_current_user
+from services.database.database import get_solve_job
+from services.executor import run_io
+from services.job_queue import job_workers, submit_solve_job
+from services.solver_budget import cap_limit
+from utils.printer import solution_to_json
+
+router = APIRouter()
+
+
+@router.post("/solve", status_code=202, summary="Queue a Solve Job",
+             responses={202: {"description": "The job was queued"}})
+async def submit_solve_job_route(board: Board, engine: SolverEngine = SolverEngine.auto,
+                                 timeout: Optional[float] = Query(None, gt=0),
+                                 max_nodes: Optional[int] = Query(None, ge=1), user: str = Depends(get_current_user)):
+    """
+    Stores the board and queues it to be solved in the background, returning right away.
+
+    Poll `GET /jobs/{job_id}` for progress and the result. Queued jobs are kept in the database, so they
+    survive a restart of the app.
+
+    - **board**: The board configuration to solve.
+    - **engine**: The search engine to use.
+    - **timeout**: Seconds the search may run, at most `JOB_TIMEOUT_SECONDS`.
+    - **max_nodes**: Search nodes the search may visit, at most `JOB_MAX_NODES`.
+    """
+    job_id, board_id = await run_io(submit_solve_job, board.board, user, engine,
+                                    cap_limit(timeout, config.JOB_TIMEOUT_SECONDS),
+                                    cap_limit(max_nodes, config.JOB_MAX_NODES))
+    job_workers.notify()
+    return {"job_id": job_id, "board_id": board_id, "status": JobStatus.queued}
+
+
+@router.get("/{job_id}", summary="Get a Solve Job",
+            responses={404: {"description": "Job not found"}})
+async def get_solve_job_route(job_id: int, user: str = Depends(get_current_user)):
+    """
+    Reports the status of a solve job: `queued`, `running` (with the nodes explored so far and the elapsed
+    seconds), `finished` (with the solve `result` and the `placement`) or `failed` (with the `error`).
+
+    For a `timed_out` or `node_limit` result, `placement` is the deepest partial placement found.
+
+    - **job_id**: The ID returned by `POST /jobs/solve`.
+    """
+    job = await run_io(get_solve_job, job_id)
+    if job is None or job.owner != user:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    elapsed = None
+    if job.started_at is not None and job.status != JobStatus.queued:
+        elapsed = (job.finished_at or time.time()) - job.started_at
+    placement = None
+    if job.status == JobStatus.finished and job.result != SolveStatus.no_solution.value and job.pairs is not None:
+        placement = solution_to_json(job.board, job.pairs)
+    return {"job_id": job.id, "board_id": job.board_id, "status": job.status, "engine": job.engine,
+            "result": job.result, "nodes": job.nodes, "elapsed": elapsed, "placement": placement,
+            "error": job.error}
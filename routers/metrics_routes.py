@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException
+from starlette.responses import PlainTextResponse
+from services import metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, summary="Get Metrics",
+            responses={404: {"description": "Metrics are disabled"}})
+async def metrics_route():
+    """
+    Returns request latency by route, solver time, nodes and backtracks per solve, database call timings,
+    executor queue depth and solution cache counters in the Prometheus text exposition format.
+    """
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException
+from starlette.responses import PlainTextResponse
+from services.auth_service import get_dev_key_user
+from services.executor import run_io
+from services.profiling import get_profile
+
+router = APIRouter()
+
+
+@router.get("/{profile_id}", summary="Get a Profile", responses={403: {"description": "Invalid dev key"},
+                                                                 404: {"description": "Profile not found"}})
+async def get_profile_route(profile_id: str, user: str = Depends(get_dev_key_user)):
+    """
+    Returns a profile recorded for a request sent with a dev key in the `X-Profile` header. The same header is
+    needed here, with a dev key of the same user.
+
+    - **profile_id**: The ID from the `X-Profile-Id` response header.
+
+    The profile holds the request's route, engine, result `status` and `nodes`, the `elapsed` seconds and
+    number of stack `samples`, the sampled stacks in the folded flamegraph format (`folded`) and the search
+    `trace`: per depth, the nodes entered, their mean and maximum number of legal placements and the dead ends.
+    """
+    profile = await run_io(get_profile, profile_id)
+    if profile is None or profile["owner"] != user:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return profile
+
+
+@router.get("/{profile_id}/folded", response_class=PlainTextResponse, summary="Get a Profile's Stacks",
+            responses={403: {"description": "Invalid dev key"}, 404: {"description": "Profile not found"}})
+async def get_profile_folded_route(profile_id: str, user: str = Depends(get_dev_key_user)):
+    """
+    Returns just the sampled stacks of a profile, in the folded format read by `flamegraph.pl` and speedscope.
+
+    - **profile_id**: The ID from the `X-Profile-Id` response header.
+    """
+    profile = await run_io(get_profile, profile_id)
+    if profile is None or profile["owner"] != user:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return PlainTextResponse(profile["folded"])
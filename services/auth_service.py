@@ -1,29 +1,59 @@
 import hashlib
+import hmac
 import os
 import base64
-from typing import Dict
+from typing import Optional
 from pydantic import BaseModel
-from fastapi import Depends, HTTPException
+from fastapi import Depends, Header, HTTPException, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-users: Dict[str, "User"] = {}
-active_tokens: Dict[str, str] = {}
-dev_keys: Dict[str, str] = {}
+import config
+from services.executor import run_hash
+from services.rate_limit import TokenBucketLimiter
+from services.session_store import StoreMapping, create_session_store
+
+# Iteration count of hashes stored before the count was configurable.
+LEGACY_PBKDF2_ITERATIONS = 4096
+
+session_store = create_session_store()
+users = StoreMapping(session_store, "users")
+active_tokens = StoreMapping(session_store, "tokens", ttl=config.TOKEN_TTL_SECONDS)
+dev_keys = StoreMapping(session_store, "dev_keys")
+
+user_rate_limiter = TokenBucketLimiter(config.AUTH_USER_RATE, config.AUTH_USER_BURST)
+ip_rate_limiter = TokenBucketLimiter(config.AUTH_IP_RATE, config.AUTH_IP_BURST)
 
 
 class User(BaseModel):
     salt: str
     hashed_password: str
+    iterations: int = LEGACY_PBKDF2_ITERATIONS
 
 
 security = HTTPBearer()
 
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
-    if token not in active_tokens:
+    username = active_tokens.get(credentials.credentials)
+    if username is None:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
-    return active_tokens[token]
+    return username
+
+
+def get_profiling_user(x_profile: Optional[str] = Header(None)) -> Optional[str]:
+    """
+    The owner of the dev key sent in the `X-Profile` header, which turns on profiling for the request, or `None`
+    when the header is not sent.
+    """
+    if x_profile is None:
+        return None
+    return get_dev_key_user(x_profile)
+
+
+def get_dev_key_user(x_profile: str = Header()) -> str:
+    if not verify_dev_key(x_profile):
+        raise HTTPException(status_code=403, detail="Invalid dev key.")
+    return dev_keys[x_profile]
 
 
 def generate_nonce(length: int) -> str:
@@ -35,6 +65,22 @@ def pbkdf2_sha256(password: str, salt: str, iterations: int, key_len: int) -> st
     return base64.b64encode(key).decode('utf-8')
 
 
+async def hash_password(password: str, salt: str, iterations: int) -> str:
+    return await run_hash(pbkdf2_sha256, password, salt, iterations, 32)
+
+
+def passwords_match(hashed_password: str, expected: str) -> bool:
+    return hmac.compare_digest(hashed_password, expected)
+
+
+def check_auth_rate_limit(request: Request, username: str) -> None:
+    client_ip = request.client.host if request.client else "unknown"
+    wait = max(user_rate_limiter.try_acquire(username), ip_rate_limiter.try_acquire(client_ip))
+    if wait:
+        raise HTTPException(status_code=429, detail="Too many attempts, try again later.",
+                            headers={"Retry-After": str(int(wait) + 1)})
+
+
 def generate_token() -> str:
     return generate_nonce(32)
 
@@ -43,6 +89,28 @@ def generate_dev_key() -> str:
     return generate_nonce(32)
 
 
+def save_user(username: str, salt: str, hashed_password: str, iterations: int) -> None:
+    users[username] = {"salt": salt, "hashed_password": hashed_password, "iterations": iterations}
+
+
+def issue_token(username: str) -> str:
+    token = generate_token()
+    active_tokens[token] = username
+    return token
+
+
+def issue_dev_key(token: str) -> Optional[str]:
+    """
+    A new dev key for the user signed in with `token`, or `None` if the token is invalid.
+    """
+    username = active_tokens.get(token)
+    if username is None:
+        return None
+    dev_key = generate_dev_key()
+    dev_keys[dev_key] = username
+    return dev_key
+
+
 def authenticate(token: str) -> bool:
     return token in active_tokens
 
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import config
+from models.solver import SolverEngine, SolveStatus
+from services.domino_service import find_max_pips, generate_dominos, solve_board
+from services.executor import QUEUED_RETRY_SECONDS, run_cpu, solver_executor
+from services.parallel_solver import SlotBudget, acquire_slot, next_token, release_slot
+from services.solution_cache import (CachedSolution, CanonicalBoard, canonicalize, from_canonical_pairs,
+                                     solution_cache, to_canonical_pairs)
+from services.solver_budget import Pair, SearchInterrupted
+from utils.printer import solution_to_json
+
+# Boards of one batch that share a canonical form: (index in the batch, board, canonical form) each.
+Group = List[Tuple[int, List[List[int]], CanonicalBoard]]
+
+
+def group_boards(boards: List[List[List[int]]]) -> Tuple["OrderedDict[str, Group]", Dict[str, CachedSolution]]:
+    """
+    Groups a batch by canonical board and looks every group up in the solution cache.
+    """
+    groups: "OrderedDict[str, Group]" = OrderedDict()
+    for index, board in enumerate(boards):
+        canonical = canonicalize(board)
+        groups.setdefault(canonical.key, []).append((index, board, canonical))
+    cached = {}
+    for key in groups:
+        entry = solution_cache.get(key)
+        if entry is not None:
+            cached[key] = entry
+    return groups, cached
+
+
+def group_results(group: Group, status: SolveStatus, canonical_pairs: List[Pair]) -> List[Dict[str, Any]]:
+    """
+    One result per board of `group`, with `placement` in the shape `/solve/` returns as JSON: the solution, the
+    deepest partial placement of an interrupted solve, or `null` when there is no solution.
+    """
+    results = []
+    for index, board, canonical in group:
+        placement = None
+        if status != SolveStatus.no_solution:
+            placement = solution_to_json(board, from_canonical_pairs(canonical, canonical_pairs))
+        results.append({"index": index, "solved": status == SolveStatus.solved, "status": status.value,
+                        "placement": placement})
+    return results
+
+
+def solve_pool_board(board: List[List[int]], slot: int, token: int, timeout: Optional[float],
+                     max_nodes: Optional[int]) -> Tuple[SolveStatus, List[Pair]]:
+    """
+    Solves one board of a batch on a solver process with its own budget, stopping as `cancelled` once the
+    batch releases `slot`. Returns the outcome and the cell pairs of the solution, or of the deepest partial
+    placement when the solve was interrupted.
+    """
+    dominos = generate_dominos(find_max_pips(board))
+    placement = [[None for _ in range(len(board[0]))] for _ in range(len(board))]
+    pairs: List[Pair] = []
+    try:
+        solved = solve_board(board, dominos, SolverEngine.bitmask, placement, pairs,
+                             SlotBudget(slot, token, timeout, max_nodes))
+    except SearchInterrupted as e:
+        return e.status, e.pairs
+    return (SolveStatus.solved if solved else SolveStatus.no_solution), pairs
+
+
+async def solve_on_pool(board: List[List[int]], timeout: Optional[float],
+                        max_nodes: Optional[int]) -> Tuple[SolveStatus, List[Pair]]:
+    token = next_token()
+    slot = acquire_slot(token, deadline=time.time())
+    while slot is None:
+        await asyncio.sleep(QUEUED_RETRY_SECONDS)
+        slot = acquire_slot(token, deadline=time.time())
+    try:
+        return await solver_executor.run_queued(solve_pool_board, board, slot, token, timeout, max_nodes)
+    finally:
+        # Stops the solve if it is still running (the client went away).
+        release_slot(slot)
+
+
+async def solve_batch(boards: List[List[List[int]]], timeout: Optional[float] = None,
+                      max_nodes: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Solves a batch of boards on the solver process pool, yielding one result per board as soon as it is known.
+
+    Boards that are the same up to rotation, reflection or pip relabelling are solved once, and boards
+    already in the solution cache are answered first. At most `SOLVE_BATCH_CONCURRENCY` boards are solved at
+    once, each within `timeout` seconds and `max_nodes` search nodes; boards that run out are reported with
+    the status they stopped with and are not cached.
+    """
+    groups, cached = await run_cpu(group_boards, boards)
+    for key, entry in cached.items():
+        status = SolveStatus.solved if entry.solved else SolveStatus.no_solution
+        for result in group_results(groups[key], status, entry.pairs):
+            yield result
+
+    queue = [key for key in groups if key not in cached]
+    queue.reverse()
+    pending: Dict[asyncio.Future, str] = {}
+    try:
+        while queue or pending:
+            while queue and len(pending) < config.SOLVE_BATCH_CONCURRENCY:
+                key = queue.pop()
+                _, board, _ = groups[key][0]
+                pending[asyncio.ensure_future(solve_on_pool(board, timeout, max_nodes))] = key
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                status, pairs = future.result()
+                _, _, canonical = groups[key][0]
+                canonical_pairs = to_canonical_pairs(canonical, pairs)
+                if status in (SolveStatus.solved, SolveStatus.no_solution):
+                    solution_cache.put(key, CachedSolution(status == SolveStatus.solved, canonical_pairs))
+                for result in group_results(groups[key], status, canonical_pairs):
+                    yield result
+    finally:
+        for future in pending:
+            future.cancel()
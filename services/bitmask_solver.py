@@ -0,0 +1,264 @@
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from models.domino import Domino
+from services.solver_budget import STOP_CHECK_INTERVAL, SearchTrace, SolveBudget, next_check_interval
+
+# A move covers `cell` and `other` (row-major cell indices) with the domino at `domino` in the domino list.
+Move = Tuple[int, int, int]
+
+
+class SolverTables(NamedTuple):
+    """
+    Precomputed lookup tables for one board and one domino set.
+
+    - **rows** / **cols**: The board dimensions.
+    - **full_mask**: The cell bitmask of a completely covered board.
+    - **sides**: `(side1, side2)` of every domino, indexed by domino index.
+    - **candidates**: For every cell, the `(other_cell, domino_index)` placements that start on that cell.
+    - **adjacent**: For every cell, the `(other_cell, domino_index)` placements that cover that cell in any direction.
+    """
+    rows: int
+    cols: int
+    full_mask: int
+    sides: List[Tuple[int, int]]
+    candidates: List[List[Tuple[int, int]]]
+    adjacent: List[List[Tuple[int, int]]]
+
+
+class SearchStats:
+    """
+    Filled in by `search`: the number of moves made (`nodes`), the dead ends backed out of (`backtracks`),
+    the deepest partial cover reached (`best`), and whether `should_stop` ended the search early (`stopped`).
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.backtracks = 0
+        self.best: List[Move] = []
+        self.stopped = False
+
+
+def pair_key(a: int, b: int) -> Tuple[int, int]:
+    return (a, b) if a <= b else (b, a)
+
+
+def build_pair_index(dominos: List[Domino]) -> Dict[Tuple[int, int], List[int]]:
+    pair_index: Dict[Tuple[int, int], List[int]] = {}
+    for index, domino in enumerate(dominos):
+        pair_index.setdefault(pair_key(domino.side1, domino.side2), []).append(index)
+    return pair_index
+
+
+def compile_board(board: List[List[int]], dominos: List[Domino]) -> SolverTables:
+    rows, cols = len(board), len(board[0])
+    pair_index = build_pair_index(dominos)
+    candidates = []
+    adjacent: List[List[Tuple[int, int]]] = [[] for _ in range(rows * cols)]
+    for x in range(rows):
+        for y in range(cols):
+            cell = x * cols + y
+            options = []
+            if y + 1 < cols:
+                options.extend((domino, 0, cell + 1) for domino in pair_index.get(pair_key(board[x][y], board[x][y + 1]), ()))
+            if x + 1 < rows:
+                options.extend((domino, 1, cell + cols) for domino in pair_index.get(pair_key(board[x][y], board[x + 1][y]), ()))
+            # Same order as solve_puzzle: by domino, horizontal before vertical.
+            options.sort()
+            candidates.append([(other, domino) for domino, _, other in options])
+            for domino, _, other in options:
+                adjacent[cell].append((other, domino))
+                adjacent[other].append((cell, domino))
+    sides = [(domino.side1, domino.side2) for domino in dominos]
+    return SolverTables(rows, cols, (1 << (rows * cols)) - 1, sides, candidates, adjacent)
+
+
+def first_empty(filled: int) -> int:
+    return (~filled & (filled + 1)).bit_length() - 1
+
+
+def expand(tables: SolverTables, filled: int, used: int) -> List[Move]:
+    """
+    Returns the legal moves on the first empty cell of the given state.
+    """
+    cell = first_empty(filled)
+    return [(cell, other, domino) for other, domino in tables.candidates[cell]
+            if not (filled >> other) & 1 and not (used >> domino) & 1]
+
+
+def propagate(tables: SolverTables, filled: int, used: int, trail: List[Move]) -> Tuple[bool, int, int]:
+    """
+    Places every domino that is forced because a cell has a single legal placement left.
+
+    Forced moves are appended to `trail`. Returns `False` as the first element as soon as the state is
+    infeasible: an empty cell has no legal placement, or fewer unused dominoes can still be placed
+    somewhere than the empty cells need.
+    """
+    full_mask = tables.full_mask
+    adjacent = tables.adjacent
+    while True:
+        empty = full_mask ^ filled
+        needed = bin(empty).count("1") // 2
+        placeable = 0
+        forced = []
+        while empty:
+            low = empty & -empty
+            empty ^= low
+            cell = low.bit_length() - 1
+            count = 0
+            for other, domino in adjacent[cell]:
+                if not (filled >> other) & 1 and not (used >> domino) & 1:
+                    count += 1
+                    move = (cell, other, domino)
+                    placeable |= 1 << domino
+            if not count:
+                return False, filled, used
+            if count == 1:
+                forced.append(move)
+        if bin(placeable).count("1") < needed:
+            return False, filled, used
+        if not forced:
+            return True, filled, used
+        for cell, other, domino in forced:
+            if (filled >> cell) & 1 or (filled >> other) & 1 or (used >> domino) & 1:
+                continue
+            filled |= (1 << cell) | (1 << other)
+            used |= 1 << domino
+            trail.append((cell, other, domino) if cell < other else (other, cell, domino))
+
+
+def search(tables: SolverTables, filled: int = 0, used: int = 0,
+           should_stop: Optional[Callable[[], bool]] = None, forced_moves: bool = True,
+           stats: Optional[SearchStats] = None, trace: Optional[SearchTrace] = None) -> Optional[List[Move]]:
+    """
+    Depth-first exact-cover search with an explicit stack.
+
+    With `forced_moves`, every state is run through `propagate` before branching. `should_stop` is polled
+    at least every `STOP_CHECK_INTERVAL` moves, and more often while moves are slow (see `next_check_interval`),
+    right after `stats.nodes` has been brought up to date. With a `trace`,
+    the number of legal moves of every branching point is recorded by depth (this costs an extra pass over the
+    candidates of each one).
+    Returns the moves covering every cell not already set in `filled`, or `None` if no cover exists
+    or `should_stop` returned true.
+    """
+    full_mask = tables.full_mask
+    candidates = tables.candidates
+    trail: List[Move] = []
+    if forced_moves:
+        feasible, filled, used = propagate(tables, filled, used, trail)
+        if not feasible:
+            return None
+    if stats is not None:
+        stats.best = trail[:]
+    if filled == full_mask:
+        return trail
+    best_depth = len(trail)
+    backtracks = 0
+    # Start with a short interval: it doubles while checks are cheap, so slow boards are caught from the start.
+    interval = countdown = 1
+    last_check = time.monotonic()
+    if trace is not None:
+        trace.record(len(trail), len(expand(tables, filled, used)))
+    # Each frame is [cell, next option index, trail length when the frame was entered].
+    stack = [[first_empty(filled), 0, len(trail)]]
+    try:
+        while stack:
+            frame = stack[-1]
+            cell, index, mark = frame
+            while len(trail) > mark:
+                undo_cell, undo_other, undo_domino = trail.pop()
+                filled ^= (1 << undo_cell) | (1 << undo_other)
+                used ^= 1 << undo_domino
+            options = candidates[cell]
+            while index < len(options):
+                other, domino = options[index]
+                index += 1
+                if not (filled >> other) & 1 and not (used >> domino) & 1:
+                    break
+            else:
+                stack.pop()
+                backtracks += 1
+                continue
+            countdown -= 1
+            if not countdown:
+                if stats is not None:
+                    stats.nodes += interval
+                now = time.monotonic()
+                interval = countdown = next_check_interval(interval, now - last_check, STOP_CHECK_INTERVAL)
+                last_check = now
+                if should_stop is not None and should_stop():
+                    if stats is not None:
+                        stats.stopped = True
+                    return None
+            frame[1] = index
+            filled |= (1 << cell) | (1 << other)
+            used |= 1 << domino
+            trail.append((cell, other, domino))
+            if forced_moves:
+                feasible, filled, used = propagate(tables, filled, used, trail)
+                if not feasible:
+                    backtracks += 1
+                    continue
+            if filled == full_mask:
+                return trail
+            if stats is not None and len(trail) > best_depth:
+                best_depth = len(trail)
+                stats.best = trail[:]
+            if trace is not None:
+                trace.record(len(trail), len(expand(tables, filled, used)))
+            stack.append([first_empty(filled), 0, len(trail)])
+        return None
+    finally:
+        if stats is not None:
+            stats.nodes += interval - countdown
+            stats.backtracks += backtracks
+
+
+def apply_moves(tables: SolverTables, moves: List[Move], placement: List[List[Optional[int]]],
+                pairs: Optional[List[Tuple[int, int]]] = None) -> None:
+    cols = tables.cols
+    for cell, other, domino in moves:
+        side1, side2 = tables.sides[domino]
+        placement[cell // cols][cell % cols] = side1
+        placement[other // cols][other % cols] = side2
+    if pairs is not None:
+        pairs.extend((cell, other) for cell, other, _ in moves)
+
+
+def initial_filled(board: List[List[int]], x: int, y: int, placement: List[List[Optional[int]]]) -> int:
+    """
+    The cell bitmask of a search starting at `(x, y)`: every cell before it and every cell already placed.
+    """
+    rows, cols = len(board), len(board[0])
+    filled = (1 << min(x * cols + y, rows * cols)) - 1
+    for i, row in enumerate(placement):
+        for j, value in enumerate(row):
+            if value is not None:
+                filled |= 1 << (i * cols + j)
+    return filled
+
+
+def solve_puzzle_bitmask(board: List[List[int]], dominos: List[Domino], x: int = 0, y: int = 0,
+                         placement: Optional[List[List[Optional[int]]]] = None,
+                         pairs: Optional[List[Tuple[int, int]]] = None, budget: Optional[SolveBudget] = None,
+                         used: int = 0) -> bool:
+    if placement is None:
+        placement = [[None for _ in range(len(board[0]))] for _ in range(len(board))]
+    tables = compile_board(board, dominos)
+    filled = initial_filled(board, x, y, placement)
+    if budget is None:
+        moves = search(tables, filled, used)
+    else:
+        stats = SearchStats()
+        start_nodes = budget.nodes
+        moves = search(tables, filled, used, should_stop=lambda: budget.exceeded(start_nodes + stats.nodes),
+                       stats=stats, trace=budget.trace)
+        budget.nodes = start_nodes + stats.nodes
+        budget.backtracks += stats.backtracks
+        if stats.stopped:
+            budget.remember([(cell, other) for cell, other, _ in stats.best])
+            raise budget.interrupted()
+    if moves is None:
+        return False
+    apply_moves(tables, moves, placement, pairs)
+    return True
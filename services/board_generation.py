@@ -0,0 +1,106 @@
+import random
+from array import array
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from models.board import BoardGrid, cell_typecode
+from services.domino_service import generate_dominos
+from utils.numpy_support import np
+
+# Distinct tilings precomputed per board size for bulk generation.
+TILING_SET_SIZE = 64
+
+# The two cells (flat, row-major indices) covered by each domino of a tiling.
+Tiling = Tuple[Tuple[int, int], ...]
+
+
+def random_tiling(rows: int, cols: int, rng: random.Random) -> Tiling:
+    """
+    A random domino tiling of a `rows` x `cols` board with an even number of cells.
+
+    The board is cut into strips two rows (or two columns) wide, and every strip into single dominos across
+    it and 2x2 blocks of two dominos along it, so horizontal and vertical dominos are mixed.
+    """
+    if rows % 2 == 0 and (cols % 2 or rng.random() < 0.5):
+        # Strips of two rows: a vertical domino, or a 2x2 block of two horizontal ones.
+        slots = strip_tiling(rows, cols, rng)
+        return tuple((x1 * cols + y1, x2 * cols + y2) for (x1, y1), (x2, y2) in slots)
+    # Strips of two columns: the same tiling of the transposed board.
+    slots = strip_tiling(cols, rows, rng)
+    return tuple(sorted((y1 * cols + x1, y2 * cols + x2) for (x1, y1), (x2, y2) in slots))
+
+
+def strip_tiling(rows: int, cols: int, rng: random.Random) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    slots = []
+    for x in range(0, rows, 2):
+        y = 0
+        while y < cols:
+            if y + 1 < cols and rng.random() < 0.5:
+                slots += [((x, y), (x, y + 1)), ((x + 1, y), (x + 1, y + 1))]
+                y += 2
+            else:
+                slots.append(((x, y), (x + 1, y)))
+                y += 1
+    return slots
+
+
+@lru_cache(maxsize=64)
+def tiling_set(rows: int, cols: int, size: int = TILING_SET_SIZE) -> Tuple[Tiling, ...]:
+    """
+    Up to `size` distinct tilings of a board size, always the same ones (drawn with a fixed seed).
+    """
+    rng = random.Random(f"{rows}x{cols}")
+    tilings = {}
+    for _ in range(4 * size):
+        tiling = random_tiling(rows, cols, rng)
+        tilings.setdefault(tiling, None)
+        if len(tilings) == size:
+            break
+    return tuple(tilings)
+
+
+def generate_boards(rows: int, cols: int, count: int, seed: Optional[int] = None) -> List[BoardGrid]:
+    """
+    Builds `count` boards at once, each laid from distinct dominos of the set for the board size (like
+    `build_board`) in random orientations on a tiling drawn from `tiling_set`, so every board has a solution.
+
+    The same seed gives the same boards, but the NumPy path (used when NumPy is installed) and the plain
+    Python one draw differently.
+    """
+    if rows * cols % 2:
+        raise ValueError("Board size must be even.")
+    if np is not None:
+        return _generate_boards_numpy(rows, cols, count, seed)
+    rng = random.Random(seed)
+    tilings = tiling_set(rows, cols)
+    sides = [(domino.side1, domino.side2) for domino in generate_dominos(max(rows, cols) - 1)]
+    placed = rows * cols // 2
+    typecode = cell_typecode(0, max(rows, cols) - 1)
+    boards = []
+    for _ in range(count):
+        cells = array(typecode, [0]) * (rows * cols)
+        tiling = tilings[rng.randrange(len(tilings))]
+        for (first, second), index in zip(tiling, rng.sample(range(len(sides)), placed)):
+            side1, side2 = sides[index]
+            if rng.random() < 0.5:
+                side1, side2 = side2, side1
+            cells[first], cells[second] = side1, side2
+        boards.append(BoardGrid(rows, cols, cells))
+    return boards
+
+
+def _generate_boards_numpy(rows: int, cols: int, count: int, seed: Optional[int]) -> List[BoardGrid]:
+    rng = np.random.default_rng(seed)
+    tilings = np.array(tiling_set(rows, cols), dtype=np.intp)
+    typecode = cell_typecode(0, max(rows, cols) - 1)
+    sides = np.array(generate_dominos(max(rows, cols) - 1), dtype=typecode)
+    placed = rows * cols // 2
+    # A random choice of distinct dominos per board, each flipped or not.
+    chosen = np.argsort(rng.random((count, len(sides))), axis=1)[:, :placed]
+    pips = sides[chosen]
+    flipped = rng.random((count, placed)) < 0.5
+    pips = np.where(flipped[..., None], pips[..., ::-1], pips)
+    cells = tilings[rng.integers(len(tilings), size=count)]
+    boards = np.empty((count, rows * cols), dtype=typecode)
+    np.put_along_axis(boards, cells.reshape(count, -1), pips.reshape(count, -1), axis=1)
+    return [BoardGrid(rows, cols, board) for board in boards]
@@ -0,0 +1,93 @@
+import ast
+import struct
+import sys
+from array import array
+from typing import List, Tuple, Union
+
+from models.board import BoardGrid, BoardRows, cell_array, cell_typecode
+
+# Header: format, rows, cols.
+HEADER = struct.Struct("<BHH")
+FORMAT_BYTES = 1
+FORMAT_NIBBLES = 2
+FORMAT_SHORTS = 3
+FORMAT_INTS = 4
+
+# The format of each cell typecode; wider cells are stored little-endian.
+_CELL_FORMATS = {'b': FORMAT_BYTES, 'h': FORMAT_SHORTS, 'i': FORMAT_INTS}
+_CELL_TYPECODES = {fmt: typecode for typecode, fmt in _CELL_FORMATS.items()}
+_SWAP_BYTES = sys.byteorder != "little"
+
+_HIGH_NIBBLES = bytes(value >> 4 for value in range(256))
+_LOW_NIBBLES = bytes(value & 0x0F for value in range(256))
+
+
+def encode_board(board: BoardRows) -> bytes:
+    """
+    Encodes a board as a header followed by its cells in row-major order.
+
+    Boards with pip values from 0 to 15 are packed two cells per byte (high nibble first), any other
+    board uses one, two or four signed bytes per cell, whichever is the narrowest that holds its pips. A
+    `BoardGrid` is encoded straight from its cell buffer.
+    """
+    if isinstance(board, BoardGrid):
+        rows, cols, cells = board.rows, board.cols, board.cells
+    else:
+        rows, cols = len(board), len(board[0]) if board else 0
+        cells = memoryview(cell_array(board))
+        if len(cells) != rows * cols:
+            raise ValueError("Board must be rectangular.")
+    low, high = (min(cells), max(cells)) if len(cells) else (0, 0)
+    if len(cells) and low >= 0 and high <= 15:
+        packed = bytes(high << 4 | low for high, low in zip(cells[0::2], cells[1::2]))
+        if len(cells) % 2:
+            packed += bytes([cells[-1] << 4])
+        return HEADER.pack(FORMAT_NIBBLES, rows, cols) + packed
+    typecode = cell_typecode(low, high)
+    if typecode != cells.format or (_SWAP_BYTES and typecode != 'b'):
+        cells = array(typecode, cells)
+        if _SWAP_BYTES:
+            cells.byteswap()
+    return HEADER.pack(_CELL_FORMATS[typecode], rows, cols) + cells.tobytes()
+
+
+def decode_board_view(blob: bytes) -> Tuple[int, int, memoryview]:
+    """
+    Returns `(rows, cols, cells)` with the cells as a flat memoryview of signed cells.
+
+    Byte-, short- and int-format blobs are viewed in place without copying (on little-endian machines);
+    nibble-format blobs are unpacked once.
+    """
+    fmt, rows, cols = HEADER.unpack_from(blob)
+    body = memoryview(blob)[HEADER.size:]
+    if fmt in _CELL_TYPECODES:
+        typecode = _CELL_TYPECODES[fmt]
+        if _SWAP_BYTES and typecode != 'b':
+            cells = array(typecode, body.tobytes())
+            cells.byteswap()
+            return rows, cols, memoryview(cells)
+        return rows, cols, body.cast(typecode)
+    if fmt == FORMAT_NIBBLES:
+        cells = bytearray(len(body) * 2)
+        cells[0::2] = bytes(body).translate(_HIGH_NIBBLES)
+        cells[1::2] = bytes(body).translate(_LOW_NIBBLES)
+        return rows, cols, memoryview(cells)[:rows * cols].cast('b')
+    raise ValueError(f"Unknown board format {fmt}.")
+
+
+def decode_board_grid(blob: Union[bytes, str]) -> BoardGrid:
+    """
+    Decodes a board into a `BoardGrid` over the cells of `decode_board_view`, without building row lists.
+    """
+    if isinstance(blob, str):
+        return BoardGrid.from_rows(ast.literal_eval(blob))
+    rows, cols, cells = decode_board_view(blob)
+    return BoardGrid(rows, cols, cells)
+
+
+def decode_board(blob: Union[bytes, str]) -> List[List[int]]:
+    if isinstance(blob, str):
+        # Rows written before the binary format stored str(board).
+        return ast.literal_eval(blob)
+    rows, cols, cells = decode_board_view(blob)
+    return [cells[row * cols:(row + 1) * cols].tolist() for row in range(rows)]
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import threading
+from typing import List
+
+import config
+
+
+class ConnectionManager:
+    """
+    Hands out one long-lived SQLite connection per thread (and per process, so forked workers never
+    reuse their parent's connection).
+
+    Every connection runs in WAL journal mode with the `synchronous`, `cache_size` and `mmap_size`
+    pragmas from the configuration, and keeps a cache of prepared statements.
+    """
+
+    def __init__(self, path: str, synchronous: str = "NORMAL", cache_size: int = -20000, mmap_size: int = 0,
+                 cached_statements: int = 128):
+        self.path = path
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._connect()
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def open(self) -> sqlite3.Connection:
+        """
+        A new connection, configured like the shared ones but not tracked: the caller closes it.
+        """
+        return self._connect()
+
+    def close_all(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, cached_statements=self.cached_statements)
+        connection.execute("PRAGMA journal_mode=WAL;")
+        connection.execute(f"PRAGMA synchronous={self.synchronous};")
+        connection.execute(f"PRAGMA cache_size={int(self.cache_size)};")
+        connection.execute(f"PRAGMA mmap_size={int(self.mmap_size)};")
+        return connection
+
+    def _reset_after_fork(self) -> None:
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+
+connection_manager = ConnectionManager(config.DATABASE_PATH, config.SQLITE_SYNCHRONOUS, config.SQLITE_CACHE_SIZE,
+                                       config.SQLITE_MMAP_SIZE, config.SQLITE_CACHED_STATEMENTS)
@@ -1,55 +1,414 @@
+import json
 import sqlite3
-from typing import List
+import threading
+import time
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-DB_PATH = "test.db"
+from models.job import JobStatus, SolveJob
+from models.board import BoardGrid, BoardRows
+from services.database.board_codec import decode_board, decode_board_grid, encode_board
+from services.database.connection import connection_manager
+from services.metrics import timed
 
 
-def open_database():
-    connection = sqlite3.connect(DB_PATH)
-    return connection
+_schema_lock = threading.Lock()
+_schema_ready = False
 
 
+def open_database() -> sqlite3.Connection:
+    if not _schema_ready:
+        initialize_database()
+    return connection_manager.connection()
+
+
+def open_dedicated_database() -> sqlite3.Connection:
+    """
+    A connection of its own, for work that spans several calls and may be resumed on other threads (such as a
+    generator streamed by a response). The caller closes it.
+    """
+    if not _schema_ready:
+        initialize_database()
+    return connection_manager.open()
+
+
+def initialize_database() -> None:
+    """
+    Creates the tables and migrates old rows, once per process: at startup, or on first use of the database.
+    """
+    global _schema_ready
+    with _schema_lock:
+        if not _schema_ready:
+            create_table()
+            _schema_ready = True
+
+
+@timed
 def create_table():
-    connection = open_database()
+    connection = connection_manager.connection()
     cursor = connection.cursor()
     create_sql = """
     CREATE TABLE IF NOT EXISTS BOARD(
         ID INTEGER PRIMARY KEY AUTOINCREMENT,
         COLS INT NOT NULL,
         ROWS INT NOT NULL,
-        BOARD TEXT NOT NULL
+        BOARD BLOB NOT NULL
+    );
+    """
+    create_cache_sql = """
+    CREATE TABLE IF NOT EXISTS SOLUTION_CACHE(
+        KEY TEXT PRIMARY KEY,
+        SOLVED INT NOT NULL,
+        PAIRS TEXT NOT NULL
+    );
+    """
+    create_solution_sql = """
+    CREATE TABLE IF NOT EXISTS BOARD_SOLUTION(
+        BOARD_ID INTEGER PRIMARY KEY REFERENCES BOARD(ID),
+        SOLVED INT NOT NULL,
+        PAIRS TEXT NOT NULL
     );
     """
-    cursor.execute(create_sql)
-    connection.commit()
-    connection.close()
+    create_job_sql = """
+    CREATE TABLE IF NOT EXISTS SOLVE_JOB(
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        BOARD_ID INTEGER NOT NULL REFERENCES BOARD(ID),
+        OWNER TEXT NOT NULL,
+        ENGINE TEXT NOT NULL,
+        TIMEOUT REAL,
+        MAX_NODES INT,
+        STATUS TEXT NOT NULL,
+        RESULT TEXT,
+        NODES INT NOT NULL DEFAULT 0,
+        PAIRS TEXT,
+        ERROR TEXT,
+        CREATED_AT REAL NOT NULL,
+        STARTED_AT REAL,
+        HEARTBEAT_AT REAL,
+        FINISHED_AT REAL
+    );
+    """
+    create_profile_sql = """
+    CREATE TABLE IF NOT EXISTS PROFILE(
+        ID TEXT PRIMARY KEY,
+        CREATED_AT REAL NOT NULL,
+        PROFILE TEXT NOT NULL
+    );
+    """
+    with connection:
+        cursor.execute(create_sql)
+        cursor.execute(create_cache_sql)
+        cursor.execute(create_solution_sql)
+        cursor.execute(create_job_sql)
+        cursor.execute(create_profile_sql)
+        cursor.execute("CREATE INDEX IF NOT EXISTS PROFILE_CREATED_AT ON PROFILE(CREATED_AT);")
+        cursor.execute("CREATE INDEX IF NOT EXISTS SOLVE_JOB_STATUS ON SOLVE_JOB(STATUS, ID);")
+        # Entries are ordered by ROWID after the size, so size-filtered pages are read straight off the index.
+        cursor.execute("CREATE INDEX IF NOT EXISTS BOARD_SIZE ON BOARD(ROWS, COLS);")
+    if cursor.execute("PRAGMA user_version;").fetchone()[0] < BINARY_BOARDS_VERSION:
+        migrate_text_boards()
+
 
+# The `PRAGMA user_version` of a database whose boards have all been migrated to the binary format.
+BINARY_BOARDS_VERSION = 1
 
-def save_board_to_db(cols: int, rows: int, board: List[List[int]]) -> int:
+
+@timed
+def migrate_text_boards(batch_size: int = 500) -> int:
+    """
+    Re-encodes boards stored as `str(board)` TEXT by earlier versions into the binary format, then records
+    `BINARY_BOARDS_VERSION` so `create_table` skips the scan from then on.
+    """
+    connection = connection_manager.connection()
+    cursor = connection.cursor()
+    migrated = 0
+    while True:
+        cursor.execute("SELECT ID, BOARD FROM BOARD WHERE typeof(BOARD) = 'text' LIMIT ?;", (batch_size,))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        with connection:
+            cursor.executemany("UPDATE BOARD SET BOARD = ? WHERE ID = ?;",
+                               [(encode_board(decode_board(board_str)), board_id) for board_id, board_str in rows])
+        migrated += len(rows)
+    with connection:
+        cursor.execute(f"PRAGMA user_version = {BINARY_BOARDS_VERSION};")
+    return migrated
+
+
+@timed
+def save_board_to_db(cols: int, rows: int, board: BoardRows) -> int:
     connection = open_database()
     cursor = connection.cursor()
-    board_str = str(board)  # Convert the board to a string representation
     insert_sql = "INSERT INTO BOARD (COLS, ROWS, BOARD) VALUES (?, ?, ?);"
-    cursor.execute(insert_sql, (cols, rows, board_str))
-    connection.commit()
-    last_id = cursor.lastrowid
-    connection.close()
-    return last_id
+    with connection:
+        cursor.execute(insert_sql, (cols, rows, encode_board(board)))
+    return cursor.lastrowid
+
+
+# Boards per INSERT statement of `save_boards_to_db`, three bound values each, well under SQLite's limit.
+INSERT_ROWS_PER_STATEMENT = 300
+
+
+@timed
+def save_boards_to_db(cols: int, rows: int, boards: Iterable[BoardRows], chunk_size: int = 500) -> Iterator[int]:
+    """
+    Inserts boards in one transaction per chunk of `chunk_size` boards, yielding the new IDs after each chunk is
+    committed. Only one chunk is held in memory at a time.
+
+    The generator may be resumed on a different thread after every chunk (a streamed response iterates it on
+    the threadpool), so it writes through a connection of its own, closed when it finishes or is closed.
+    """
+    connection = open_dedicated_database()
+    try:
+        boards = iter(boards)
+        while True:
+            chunk = [(cols, rows, encode_board(board)) for board in islice(boards, chunk_size)]
+            if not chunk:
+                break
+            board_ids = []
+            with connection:
+                for start in range(0, len(chunk), INSERT_ROWS_PER_STATEMENT):
+                    part = chunk[start:start + INSERT_ROWS_PER_STATEMENT]
+                    insert_sql = ("INSERT INTO BOARD (COLS, ROWS, BOARD) VALUES " + ", ".join(["(?, ?, ?)"] * len(part))
+                                  + " RETURNING ID;")
+                    # RETURNING gives no order guarantee, but the rows of one statement get increasing IDs.
+                    board_ids += sorted(row[0] for row in
+                                        connection.execute(insert_sql, [value for board in part for value in board]))
+            yield from board_ids
+    finally:
+        connection.close()
 
 
+@timed
 def get_board_by_id(board_id: int) -> List[List[int]]:
     connection = open_database()
     cursor = connection.cursor()
     select_sql = "SELECT BOARD FROM BOARD WHERE ID = ?;"
     cursor.execute(select_sql, (board_id,))
     result = cursor.fetchone()
-    connection.close()
     if result:
-        board_str = result[0]
-        return eval(board_str)  # Convert the string representation back to a list of lists
+        return decode_board(result[0])
+    else:
+        return None
+
+
+# A stored board as read by the bulk queries: (ID, rows, cols, encoded board).
+StoredBoard = Tuple[int, int, int, Union[bytes, str]]
+
+
+@timed
+def get_boards_page(after_id: int, limit: int, rows: Optional[int] = None,
+                    cols: Optional[int] = None) -> List[StoredBoard]:
+    """
+    Returns up to `limit` boards with an ID above `after_id`, in ID order, optionally only those of the given
+    size. Boards are left encoded; `decode_board` turns them into rows.
+    """
+    conditions = ["ID > ?"]
+    params: List[int] = [after_id]
+    if rows is not None:
+        conditions.append("ROWS = ?")
+        params.append(rows)
+    if cols is not None:
+        conditions.append("COLS = ?")
+        params.append(cols)
+    select_sql = f"SELECT ID, ROWS, COLS, BOARD FROM BOARD WHERE {' AND '.join(conditions)} ORDER BY ID LIMIT ?;"
+    return open_database().execute(select_sql, (*params, limit)).fetchall()
+
+
+@timed
+def get_boards_by_ids(board_ids: List[int]) -> List[StoredBoard]:
+    """
+    Returns the boards with the given IDs that exist, in ID order, with one query whatever their number.
+    """
+    select_sql = """
+    SELECT ID, ROWS, COLS, BOARD FROM BOARD
+    WHERE ID IN (SELECT value FROM json_each(?))
+    ORDER BY ID;
+    """
+    return open_database().execute(select_sql, (json.dumps(board_ids),)).fetchall()
+
+
+@timed
+def get_encoded_board(board_id: int) -> Optional[Union[bytes, str]]:
+    """
+    Returns a board as stored, without decoding it, or `None` if there is no such board.
+    """
+    result = open_database().execute("SELECT BOARD FROM BOARD WHERE ID = ?;", (board_id,)).fetchone()
+    return result[0] if result else None
+
+
+@timed
+def get_board_with_solution(board_id: int) -> Optional[Tuple[BoardGrid, Optional[Tuple[bool, List[Tuple[int, int]]]]]]:
+    connection = open_database()
+    cursor = connection.cursor()
+    select_sql = """
+    SELECT BOARD.BOARD, BOARD_SOLUTION.SOLVED, BOARD_SOLUTION.PAIRS
+    FROM BOARD LEFT JOIN BOARD_SOLUTION ON BOARD_SOLUTION.BOARD_ID = BOARD.ID
+    WHERE BOARD.ID = ?;
+    """
+    cursor.execute(select_sql, (board_id,))
+    result = cursor.fetchone()
+    if result:
+        board_blob, solved, pairs = result
+        solution = None if solved is None else (bool(solved), [tuple(pair) for pair in json.loads(pairs)])
+        return decode_board_grid(board_blob), solution
+    else:
+        return None
+
+
+@timed
+def save_board_solution(board_id: int, solved: bool, pairs: List[Tuple[int, int]]) -> None:
+    connection = open_database()
+    cursor = connection.cursor()
+    insert_sql = "INSERT OR REPLACE INTO BOARD_SOLUTION (BOARD_ID, SOLVED, PAIRS) VALUES (?, ?, ?);"
+    with connection:
+        cursor.execute(insert_sql, (board_id, int(solved), json.dumps(pairs)))
+
+
+@timed
+def get_cached_solution(key: str) -> Optional[Tuple[bool, List[Tuple[int, int]]]]:
+    connection = open_database()
+    cursor = connection.cursor()
+    select_sql = "SELECT SOLVED, PAIRS FROM SOLUTION_CACHE WHERE KEY = ?;"
+    cursor.execute(select_sql, (key,))
+    result = cursor.fetchone()
+    if result:
+        return bool(result[0]), [tuple(pair) for pair in json.loads(result[1])]
     else:
         return None
 
 
-# Initialize the database
-create_table()
+@timed
+def save_cached_solution(key: str, solved: bool, pairs: List[Tuple[int, int]]) -> None:
+    connection = open_database()
+    cursor = connection.cursor()
+    insert_sql = "INSERT OR REPLACE INTO SOLUTION_CACHE (KEY, SOLVED, PAIRS) VALUES (?, ?, ?);"
+    with connection:
+        cursor.execute(insert_sql, (key, int(solved), json.dumps(pairs)))
+
+
+@timed
+def save_profile_record(profile_id: str, profile: Dict[str, Any], ttl: float, max_entries: int) -> None:
+    """
+    Stores a profile, dropping profiles older than `ttl` seconds and all but the newest `max_entries`.
+    """
+    connection = open_database()
+    cursor = connection.cursor()
+    now = time.time()
+    with connection:
+        cursor.execute("INSERT INTO PROFILE (ID, CREATED_AT, PROFILE) VALUES (?, ?, ?);",
+                       (profile_id, now, json.dumps(profile)))
+        cursor.execute("DELETE FROM PROFILE WHERE CREATED_AT <= ?;", (now - ttl,))
+        cursor.execute("DELETE FROM PROFILE WHERE ID IN (SELECT ID FROM PROFILE ORDER BY CREATED_AT DESC, ROWID DESC "
+                       "LIMIT -1 OFFSET ?);", (max_entries,))
+
+
+@timed
+def get_profile_record(profile_id: str, ttl: float) -> Optional[Dict[str, Any]]:
+    connection = open_database()
+    cursor = connection.cursor()
+    cursor.execute("SELECT PROFILE FROM PROFILE WHERE ID = ? AND CREATED_AT > ?;", (profile_id, time.time() - ttl))
+    result = cursor.fetchone()
+    return json.loads(result[0]) if result else None
+
+
+@timed
+def create_solve_job(board_id: int, owner: str, engine: str, timeout: Optional[float],
+                     max_nodes: Optional[int]) -> int:
+    connection = open_database()
+    cursor = connection.cursor()
+    insert_sql = """
+    INSERT INTO SOLVE_JOB (BOARD_ID, OWNER, ENGINE, TIMEOUT, MAX_NODES, STATUS, CREATED_AT)
+    VALUES (?, ?, ?, ?, ?, ?, ?);
+    """
+    with connection:
+        cursor.execute(insert_sql, (board_id, owner, engine, timeout, max_nodes, JobStatus.queued.value, time.time()))
+    return cursor.lastrowid
+
+
+@timed
+def claim_solve_job(lease_seconds: float) -> Optional[SolveJob]:
+    """
+    Marks the oldest queued job as running and returns it. Running jobs whose worker has not sent a heartbeat
+    for `lease_seconds` (because the app was stopped or crashed) are claimed again.
+    """
+    connection = open_database()
+    cursor = connection.cursor()
+    now = time.time()
+    claim_sql = """
+    UPDATE SOLVE_JOB SET STATUS = ?, STARTED_AT = ?, HEARTBEAT_AT = ?, NODES = 0
+    WHERE ID = (
+        SELECT ID FROM SOLVE_JOB
+        WHERE STATUS = ? OR (STATUS = ? AND HEARTBEAT_AT < ?)
+        ORDER BY ID LIMIT 1
+    )
+    RETURNING ID;
+    """
+    running, queued = JobStatus.running.value, JobStatus.queued.value
+    with connection:
+        rows = cursor.execute(claim_sql, (running, now, now, queued, running, now - lease_seconds)).fetchall()
+    return get_solve_job(rows[0][0]) if rows else None
+
+
+@timed
+def update_solve_job_progress(job_id: int, nodes: int) -> None:
+    connection = open_database()
+    cursor = connection.cursor()
+    update_sql = "UPDATE SOLVE_JOB SET NODES = ?, HEARTBEAT_AT = ? WHERE ID = ? AND STATUS = ?;"
+    with connection:
+        cursor.execute(update_sql, (nodes, time.time(), job_id, JobStatus.running.value))
+
+
+@timed
+def finish_solve_job(job_id: int, board_id: int, status: JobStatus, result: Optional[str], nodes: int,
+                     pairs: Optional[List[Tuple[int, int]]], solved: Optional[bool] = None,
+                     error: Optional[str] = None) -> None:
+    """
+    Records the outcome of a job. A complete answer (`solved` is not `None`) goes to BOARD_SOLUTION next to the
+    board, in the same transaction; the partial placement of an interrupted solve stays on the job.
+    """
+    connection = open_database()
+    cursor = connection.cursor()
+    update_sql = """
+    UPDATE SOLVE_JOB SET STATUS = ?, RESULT = ?, NODES = ?, PAIRS = ?, ERROR = ?, FINISHED_AT = ?
+    WHERE ID = ?;
+    """
+    job_pairs = None if pairs is None or solved is not None else json.dumps(pairs)
+    with connection:
+        cursor.execute(update_sql, (status.value, result, nodes, job_pairs, error, time.time(), job_id))
+        if solved is not None:
+            cursor.execute("INSERT OR REPLACE INTO BOARD_SOLUTION (BOARD_ID, SOLVED, PAIRS) VALUES (?, ?, ?);",
+                           (board_id, int(solved), json.dumps(pairs or [])))
+
+
+@timed
+def requeue_solve_job(job_id: int) -> None:
+    connection = open_database()
+    cursor = connection.cursor()
+    with connection:
+        cursor.execute("UPDATE SOLVE_JOB SET STATUS = ?, HEARTBEAT_AT = NULL WHERE ID = ? AND STATUS = ?;",
+                       (JobStatus.queued.value, job_id, JobStatus.running.value))
+
+
+@timed
+def get_solve_job(job_id: int) -> Optional[SolveJob]:
+    connection = open_database()
+    cursor = connection.cursor()
+    select_sql = """
+    SELECT SOLVE_JOB.ID, SOLVE_JOB.BOARD_ID, OWNER, ENGINE, TIMEOUT, MAX_NODES, STATUS, RESULT, NODES, ERROR,
+           CREATED_AT, STARTED_AT, FINISHED_AT, BOARD.BOARD, COALESCE(BOARD_SOLUTION.PAIRS, SOLVE_JOB.PAIRS)
+    FROM SOLVE_JOB
+    JOIN BOARD ON BOARD.ID = SOLVE_JOB.BOARD_ID
+    LEFT JOIN BOARD_SOLUTION ON BOARD_SOLUTION.BOARD_ID = SOLVE_JOB.BOARD_ID
+    WHERE SOLVE_JOB.ID = ?;
+    """
+    cursor.execute(select_sql, (job_id,))
+    result = cursor.fetchone()
+    if result:
+        *fields, board_blob, pairs = result
+        fields[6] = JobStatus(fields[6])
+        return SolveJob(*fields, decode_board_grid(board_blob),
+                        None if pairs is None else [tuple(pair) for pair in json.loads(pairs)])
+    else:
+        return None
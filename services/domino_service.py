@@ -1,10 +1,19 @@
-from itertools import permutations
+from array import array
+from collections import Counter
+from models.board import BoardGrid, BoardRows, cell_typecode
 from models.domino import Domino
-from typing import List, Optional, Tuple
+from models.solver import SolverEngine, SolveStatus
+from typing import Callable, Iterator, List, Optional, Tuple
 import random
-import concurrent.futures
+import time
 
-from services.database.database import save_board_to_db
+import config
+
+from services.bitmask_solver import solve_puzzle_bitmask
+from services.parallel_solver import solve_puzzle_parallel
+from services.solver_budget import SearchInterrupted, SolveBudget
+from services import metrics
+from services.database.database import save_board_to_db, save_boards_to_db
 
 
 def generate_dominos(max_pips: int) -> List[Domino]:
@@ -15,7 +24,7 @@ def shuffle_dominos(dominos: List[Domino]):
     random.shuffle(dominos)
 
 
-def place_dominos_on_board(board: List[List[int]], dominos: List[Domino], domino_index: int) -> None:
+def place_dominos_on_board(board: BoardRows, dominos: List[Domino], domino_index: int) -> None:
     rows = len(board)
     cols = len(board[0])
     for i in range(rows):
@@ -28,40 +37,139 @@ def place_dominos_on_board(board: List[List[int]], dominos: List[Domino], domino
             domino_index += 1
 
 
-def generate_board(rows: int, cols: int) -> Tuple[List[List[int]], int]:
+def build_board(rows: int, cols: int) -> BoardGrid:
     max_pips = max(rows, cols) - 1
     dominos = generate_dominos(max_pips)
     shuffle_dominos(dominos)
-    board = [[-1 for _ in range(cols)] for _ in range(rows)]
+    board = BoardGrid(rows, cols)
     domino_index = 0
     place_dominos_on_board(board, dominos, domino_index)
+    return board
+
+
+def generate_board(rows: int, cols: int) -> Tuple[List[List[int]], int]:
+    """
+    Builds and stores a board. Returns it as rows, ready to be sent back as JSON, with its ID.
+    """
+    board = build_board(rows, cols)
     board_id = save_board_to_db(cols, rows, board)
-    return board, board_id
+    return board.tolist(), board_id
 
 
-def generate_all_boards(rows: int, cols: int) -> List[int]:
-    max_pips = max(rows, cols) - 1
-    dominos = generate_dominos(max_pips)
-    unique_boards = set()
-    board_ids = []
+def board_slots(rows: int, cols: int) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """
+    Returns the cell pairs dominos are laid on: horizontally in row order like `place_dominos_on_board`,
+    or vertically when the number of columns is odd.
+    """
+    if cols % 2 == 0:
+        return [((i, j), (i, j + 1)) for i in range(rows) for j in range(0, cols, 2)]
+    return [((i, j), (i + 1, j)) for i in range(0, rows, 2) for j in range(cols)]
+
+
+class BoardEnumerator:
+    """
+    Enumerates every board made of `rows * cols / 2` distinct dominos from the set for the board size, each
+    laid in either orientation, without repeats.
 
-    for domino_permutation in permutations(dominos):
+    Boards come out in a fixed order. `offset` skips boards, `limit` caps how many are produced, and `cursor`
+    (the `cursor` attribute after an earlier run) resumes right after the last board of that run.
+    """
+
+    def __init__(self, rows: int, cols: int, offset: int = 0, limit: Optional[int] = None,
+                 cursor: Optional[str] = None):
+        if rows < 1 or cols < 1:
+            raise ValueError("Board must have at least one row and one column.")
+        if rows * cols % 2:
+            raise ValueError("Board size must be even.")
+        self.rows = rows
+        self.cols = cols
+        self.offset = offset
+        self.limit = limit
+        self.slots = board_slots(rows, cols)
+        dominos = generate_dominos(max(rows, cols) - 1)
+        # (domino index, first side, second side) for both orientations of every domino.
+        self.oriented = []
+        for index, domino in enumerate(dominos):
+            self.oriented.append((index, domino.side1, domino.side2))
+            if domino.side1 != domino.side2:
+                self.oriented.append((index, domino.side2, domino.side1))
+        self.choices = self._parse_cursor(cursor) if cursor else None
+        self.cursor = cursor
+        self.exhausted = False
+
+    def _parse_cursor(self, cursor: str) -> List[int]:
         try:
-            board = [[-1 for _ in range(cols)] for _ in range(rows)]
-            domino_index = 0
-            place_dominos_on_board(board, list(domino_permutation), domino_index)
-            board_str = str(board)
-            if board_str not in unique_boards:
-                unique_boards.add(board_str)
-                board_id = save_board_to_db(cols, rows, board)
-                board_ids.append(board_id)
-        except IndexError:
-            continue  # Skip this permutation if it raises an IndexError
+            choices = [int(part) for part in cursor.split(".")]
+        except ValueError:
+            raise ValueError("Malformed cursor.")
+        dominos = [self.oriented[choice][0] for choice in choices if 0 <= choice < len(self.oriented)]
+        if len(choices) != len(self.slots) or len(dominos) != len(choices) or len(set(dominos)) != len(dominos):
+            raise ValueError("Cursor does not match the board size.")
+        return choices
+
+    def __iter__(self) -> Iterator[BoardGrid]:
+        oriented, rows, cols = self.oriented, self.rows, self.cols
+        # Both cells of every slot as indices into the flat cell array.
+        slots = [(x1 * cols + y1, x2 * cols + y2) for (x1, y1), (x2, y2) in self.slots]
+        last = len(slots) - 1
+        if last < 0:
+            self.exhausted = True
+            return
+        cells = array(cell_typecode(0, max(rows, cols) - 1), [0]) * (rows * cols)
+        if self.choices is None:
+            choices, used, depth = [-1] * len(slots), 0, 0
+        else:
+            choices, used, depth = list(self.choices), 0, last
+            for slot, choice in enumerate(choices):
+                domino, side1, side2 = oriented[choice]
+                used |= 1 << domino
+                first, second = slots[slot]
+                cells[first], cells[second] = side1, side2
+        skip, remaining = self.offset, self.limit
+        while depth >= 0:
+            choice = choices[depth]
+            if choice >= 0:
+                used ^= 1 << oriented[choice][0]
+            choice += 1
+            while choice < len(oriented) and (used >> oriented[choice][0]) & 1:
+                choice += 1
+            if choice == len(oriented):
+                choices[depth] = -1
+                depth -= 1
+                continue
+            choices[depth] = choice
+            domino, side1, side2 = oriented[choice]
+            used |= 1 << domino
+            first, second = slots[depth]
+            cells[first], cells[second] = side1, side2
+            if depth < last:
+                depth += 1
+                continue
+            if skip:
+                skip -= 1
+                continue
+            if remaining is not None:
+                if not remaining:
+                    return
+                remaining -= 1
+            self.cursor = ".".join(map(str, choices))
+            yield BoardGrid(rows, cols, cells[:])
+        self.exhausted = True
 
-    return board_ids
 
+def generate_all_boards_stream(enumerator: BoardEnumerator,
+                               chunk_size: int = config.BULK_INSERT_CHUNK_SIZE) -> Iterator[int]:
+    return save_boards_to_db(enumerator.cols, enumerator.rows, enumerator, chunk_size)
 
-def find_max_pips(board: List[List[int]]) -> int:
+
+def generate_all_boards(rows: int, cols: int, limit: Optional[int] = None, offset: int = 0,
+                        cursor: Optional[str] = None) -> List[int]:
+    return list(generate_all_boards_stream(BoardEnumerator(rows, cols, offset, limit, cursor)))
+
+
+def find_max_pips(board: BoardRows) -> int:
+    if isinstance(board, BoardGrid):
+        return max(board.cells)
     return max(max(row) for row in board if row)
 
 
@@ -78,8 +186,22 @@ def can_place(board: List[List[int]], placement: List[List[Optional[int]]], domi
         return (board[x][y], board[x + 1][y]) in [(domino.side1, domino.side2), (domino.side2, domino.side1)]
 
 
+def pip_counts_feasible(board: List[List[int]], dominos: List[Domino]) -> bool:
+    cell_counts = Counter(value for row in board for value in row)
+    half_counts = Counter(side for domino in dominos for side in (domino.side1, domino.side2))
+    cells = sum(cell_counts.values())
+    if cells % 2 or cells > 2 * len(dominos):
+        return False
+    return all(count <= half_counts[value] for value, count in cell_counts.items())
+
+
 def solve_puzzle(board: List[List[int]], dominos: List[Domino], x: int = 0, y: int = 0,
-                 placement: Optional[List[List[Optional[int]]]] = None) -> bool:
+                 placement: Optional[List[List[Optional[int]]]] = None,
+                 pairs: Optional[List[Tuple[int, int]]] = None, budget: Optional[SolveBudget] = None,
+                 used: int = 0) -> bool:
+    """
+    Recursive backtracking search. `used` is the bitset of the indices in `dominos` already placed.
+    """
     if placement is None:
         placement = [[None for _ in range(len(board[0]))] for _ in range(len(board))]
     if y >= len(board[0]):
@@ -87,64 +209,105 @@ def solve_puzzle(board: List[List[int]], dominos: List[Domino], x: int = 0, y: i
     if x >= len(board):
         return True
     if placement[x][y] is not None:
-        return solve_puzzle(board, dominos, x, y + 1, placement)
-    for domino in dominos:
-        if not domino.used:
+        return solve_puzzle(board, dominos, x, y + 1, placement, pairs, budget, used)
+    cols = len(board[0])
+    # The depth of a node is the number of dominos placed, so tracing needs `pairs`.
+    if budget is not None and budget.trace is not None and pairs is not None:
+        budget.trace.record(len(pairs), count_placements(board, dominos, placement, x, y, used))
+    for index, domino in enumerate(dominos):
+        if not (used >> index) & 1:
             if can_place(board, placement, domino, x, y, True):
-                domino.used = True
                 placement[x][y], placement[x][y + 1] = domino.side1, domino.side2
-                if solve_puzzle(board, dominos, x, y + 2, placement):
+                if pairs is not None:
+                    pairs.append((x * cols + y, x * cols + y + 1))
+                if budget is not None:
+                    budget.visit(pairs)
+                if solve_puzzle(board, dominos, x, y + 2, placement, pairs, budget, used | 1 << index):
                     return True
+                if pairs is not None:
+                    pairs.pop()
+                if budget is not None:
+                    budget.backtracks += 1
                 placement[x][y], placement[x][y + 1] = None, None
-                domino.used = False
             if can_place(board, placement, domino, x, y, False):
-                domino.used = True
                 placement[x][y], placement[x + 1][y] = domino.side1, domino.side2
-                if solve_puzzle(board, dominos, x, y + 1, placement):
+                if pairs is not None:
+                    pairs.append((x * cols + y, (x + 1) * cols + y))
+                if budget is not None:
+                    budget.visit(pairs)
+                if solve_puzzle(board, dominos, x, y + 1, placement, pairs, budget, used | 1 << index):
                     return True
+                if pairs is not None:
+                    pairs.pop()
+                if budget is not None:
+                    budget.backtracks += 1
                 placement[x][y], placement[x + 1][y] = None, None
-                domino.used = False
     return False
 
 
-def solve_puzzle_parallel(board: List[List[int]], dominos: List[Domino], x: int = 0, y: int = 0, placement: Optional[List[List[Optional[int]]]] = None) -> bool:
-    if placement is None:
-        placement = [[None for _ in range(len(board[0]))] for _ in range(len(board))]
+def count_placements(board: List[List[int]], dominos: List[Domino], placement: List[List[Optional[int]]],
+                     x: int, y: int, used: int = 0) -> int:
+    """
+    The number of ways `solve_puzzle` can cover the empty cell at `(x, y)`.
+    """
+    return sum(can_place(board, placement, domino, x, y, True) + can_place(board, placement, domino, x, y, False)
+               for index, domino in enumerate(dominos) if not (used >> index) & 1)
 
-    if y >= len(board[0]):
-        x, y = x + 1, 0
-    if x >= len(board):
-        return True
-    if placement[x][y] is not None:
-        return solve_puzzle_parallel(board, dominos, x, y + 1, placement)
 
-    def try_place(domino, x, y, horizontal):
-        local_placement = [row[:] for row in placement]
-        if horizontal:
-            local_placement[x][y], local_placement[x][y + 1] = domino.side1, domino.side2
-            result = solve_puzzle_parallel(board, dominos, x, y + 2, local_placement)
-        else:
-            local_placement[x][y], local_placement[x + 1][y] = domino.side1, domino.side2
-            result = solve_puzzle_parallel(board, dominos, x, y + 1, local_placement)
-        return result, local_placement
-
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        futures = []
-        for domino in dominos:
-            if not domino.used:
-                if can_place(board, placement, domino, x, y, True):
-                    domino.used = True
-                    futures.append(executor.submit(try_place, domino, x, y, True))
-                    domino.used = False
-                if can_place(board, placement, domino, x, y, False):
-                    domino.used = True
-                    futures.append(executor.submit(try_place, domino, x, y, False))
-                    domino.used = False
-
-        for future in concurrent.futures.as_completed(futures):
-            result, local_placement = future.result()
-            if result:
-                placement[:] = local_placement
-                return True
-
-    return False
\ No newline at end of file
+def resolve_engine(engine: SolverEngine, board: List[List[int]]) -> SolverEngine:
+    if engine != SolverEngine.auto:
+        return engine
+    if len(board) * len(board[0]) >= config.PARALLEL_MIN_CELLS:
+        return SolverEngine.parallel
+    return SolverEngine.bitmask
+
+
+def get_solver(engine: SolverEngine) -> Callable[..., bool]:
+    solvers = {
+        SolverEngine.backtracking: solve_puzzle,
+        SolverEngine.parallel: solve_puzzle_parallel,
+        SolverEngine.bitmask: solve_puzzle_bitmask,
+    }
+    return solvers[engine]
+
+
+def solve_board(board: List[List[int]], dominos: List[Domino], engine: SolverEngine,
+                placement: List[List[Optional[int]]], pairs: Optional[List[Tuple[int, int]]] = None,
+                budget: Optional[SolveBudget] = None) -> bool:
+    """
+    Solves a board with the given engine. Raises `SearchInterrupted` if `budget` runs out first.
+    """
+    if not pip_counts_feasible(board, dominos):
+        return False
+    engine = resolve_engine(engine, board)
+    solver = get_solver(engine)
+    if not metrics.enabled:
+        return solver(board, dominos, 0, 0, placement, pairs=pairs, budget=budget)
+    # A budget without limits, just to count nodes and backtracks.
+    budget = budget or SolveBudget()
+    start_nodes, start_backtracks = budget.nodes, budget.backtracks
+    status = "error"
+    start = time.perf_counter()
+    try:
+        solved = solver(board, dominos, 0, 0, placement, pairs=pairs, budget=budget)
+        status = SolveStatus.solved.value if solved else SolveStatus.no_solution.value
+        return solved
+    except SearchInterrupted as e:
+        status = e.status.value
+        raise
+    finally:
+        metrics.observe_solve(engine.value, status, time.perf_counter() - start, budget.nodes - start_nodes,
+                              budget.backtracks - start_backtracks)
+
+
+def solve_board_pairs(board: List[List[int]], engine: SolverEngine = SolverEngine.bitmask
+                      ) -> Tuple[bool, List[Tuple[int, int]]]:
+    """
+    Solves a board with its full domino set and returns the cell pairs of the solution. Picklable, so it can
+    run on the solver process pool.
+    """
+    dominos = generate_dominos(find_max_pips(board))
+    placement = [[None for _ in range(len(board[0]))] for _ in range(len(board))]
+    pairs: List[Tuple[int, int]] = []
+    solved = solve_board(board, dominos, engine, placement, pairs)
+    return solved, pairs
@@ -0,0 +1,118 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException
+
+import config
+from services import metrics
+from services.parallel_solver import get_process_pool
+
+# How often `run_queued` looks for room on a saturated executor.
+QUEUED_RETRY_SECONDS = 0.05
+
+
+class BoundedExecutor:
+    """
+    Runs blocking calls off the event loop on an executor.
+
+    At most `max_pending` calls may be queued or running at once; further calls are rejected with a
+    503 response straight away instead of piling up behind slow work.
+
+    The executor is built by `factory` on first use, and built again after `shutdown`, so the app can be
+    started and stopped more than once in a process. With `owned=False` the executor belongs to someone else:
+    `factory` is called for every call and `shutdown` leaves it alone.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Executor], max_pending: int, owned: bool = True):
+        self.name = name
+        self.factory = factory
+        self.max_pending = max_pending
+        self.owned = owned
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        if not self.owned:
+            return self.factory()
+        with self._lock:
+            if self._executor is None:
+                self._executor = self.factory()
+            return self._executor
+
+    def reject_if_full(self) -> None:
+        if self.pending >= self.max_pending:
+            metrics.executor_rejections.inc(self.name)
+            raise HTTPException(status_code=503, detail="Server is busy, try again later.",
+                                headers={"Retry-After": "1"})
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        self.reject_if_full()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.pending -= 1
+
+    async def run_queued(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Like `run`, but waits for room instead of being rejected, for work already past the point where a 503
+        could be sent.
+        """
+        while self.pending >= self.max_pending:
+            await asyncio.sleep(QUEUED_RETRY_SECONDS)
+        return await self.run(fn, *args, **kwargs)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Solves and board generation. Large boards are handed on to the process pool by the parallel engine,
+# so these threads mostly wait.
+cpu_executor = BoundedExecutor("cpu", lambda: ThreadPoolExecutor(config.CPU_THREADS, thread_name_prefix="cpu"),
+                               config.CPU_QUEUE_SIZE)
+
+# SQLite reads and writes.
+io_executor = BoundedExecutor("io", lambda: ThreadPoolExecutor(config.IO_THREADS, thread_name_prefix="io"),
+                              config.IO_QUEUE_SIZE)
+
+# PBKDF2 password hashing. hashlib releases the GIL while hashing, so these threads run in parallel.
+hash_executor = BoundedExecutor("hash", lambda: ThreadPoolExecutor(config.HASH_THREADS, thread_name_prefix="hash"),
+                                config.HASH_QUEUE_SIZE)
+
+# Whole-board solves (batches) handed straight to the solver process pool, which is owned by the parallel solver.
+solver_executor = BoundedExecutor("solver", get_process_pool, config.SOLVER_QUEUE_SIZE, owned=False)
+
+
+metrics.CollectedMetric("executor_pending", "Calls queued or running on an executor.", ("executor",),
+                        lambda: [((executor.name,), executor.pending)
+                                 for executor in (cpu_executor, io_executor, hash_executor, solver_executor)])
+metrics.CollectedMetric("executor_capacity", "Most calls an executor accepts at once.", ("executor",),
+                        lambda: [((executor.name,), executor.max_pending)
+                                 for executor in (cpu_executor, io_executor, hash_executor, solver_executor)])
+
+
+async def run_cpu(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    return await cpu_executor.run(fn, *args, **kwargs)
+
+
+async def run_io(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    return await io_executor.run(fn, *args, **kwargs)
+
+
+async def run_hash(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    return await hash_executor.run(fn, *args, **kwargs)
+
+
+def shutdown_executors() -> None:
+    cpu_executor.shutdown()
+    io_executor.shutdown()
+    hash_executor.shutdown()
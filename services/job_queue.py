@@ -0,0 +1,162 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import config
+from models.job import JobStatus, SolveJob
+from models.solver import SolverEngine, SolveStatus
+from services.database.database import (claim_solve_job, create_solve_job, finish_solve_job, requeue_solve_job,
+                                        save_board_to_db, update_solve_job_progress)
+from services.domino_service import find_max_pips, generate_dominos
+from services.solution_cache import solve_board_cached
+from services.solver_budget import SearchInterrupted, SolveBudget
+
+logger = logging.getLogger(__name__)
+
+
+def submit_solve_job(board: List[List[int]], owner: str, engine: SolverEngine, timeout: Optional[float],
+                     max_nodes: Optional[int]) -> Tuple[int, int]:
+    """
+    Stores the board and queues a job to solve it. Returns `(job_id, board_id)`.
+    """
+    board_id = save_board_to_db(len(board[0]), len(board), board)
+    return create_solve_job(board_id, owner, engine.value, timeout, max_nodes), board_id
+
+
+def solve_job(board: List[List[int]], engine: SolverEngine, budget: SolveBudget
+              ) -> Tuple[SolveStatus, List[Tuple[int, int]]]:
+    dominos = generate_dominos(find_max_pips(board))
+    placement = [[None for _ in range(len(board[0]))] for _ in range(len(board))]
+    pairs: List[Tuple[int, int]] = []
+    try:
+        solved = solve_board_cached(board, dominos, engine, placement, pairs, budget)
+    except SearchInterrupted as e:
+        return e.status, e.pairs
+    return (SolveStatus.solved if solved else SolveStatus.no_solution), pairs
+
+
+class JobWorkerPool:
+    """
+    Runs queued solve jobs in the background.
+
+    Each of the `workers` tasks claims the oldest queued job from the SOLVE_JOB table, solves it on its own
+    thread and writes the node count and a heartbeat back every `heartbeat_interval` seconds. Because the
+    queue lives in the database, jobs survive a restart: jobs interrupted by a shutdown are put back in the
+    queue, and jobs of a worker that died without a shutdown are claimed again once their heartbeat is older
+    than `lease_seconds`.
+    """
+
+    def __init__(self, workers: int, poll_interval: float = 1.0, heartbeat_interval: float = 1.0,
+                 lease_seconds: float = 30.0):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.lease_seconds = lease_seconds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # The workers' database calls run here rather than on the request-facing `io_executor`, so a busy server
+        # never rejects a heartbeat or a result.
+        self._db_executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._budgets: Dict[int, SolveBudget] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="job")
+        self._db_executor = ThreadPoolExecutor(self.workers, thread_name_prefix="job-db")
+        self._tasks = {asyncio.ensure_future(self._work()) for _ in range(self.workers)}
+
+    async def stop(self) -> None:
+        """
+        Cancels the running solves, puts their jobs back in the queue and waits for the workers to exit.
+        """
+        self._stopping = True
+        for budget in self._budgets.values():
+            budget.cancel()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._db_executor is not None:
+            self._db_executor.shutdown(wait=False)
+            self._db_executor = None
+
+    def notify(self) -> None:
+        """
+        Wakes an idle worker so a job submitted by this process starts without waiting for the next poll.
+        """
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self) -> None:
+        while not self._stopping:
+            try:
+                job_id = await self.run_next_job()
+            except Exception:
+                logger.exception("Solve job worker failed")
+                job_id = None
+            if job_id is None and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def run_next_job(self) -> Optional[int]:
+        """
+        Claims and runs one job. Returns its ID, or `None` if the queue was empty.
+        """
+        job = await self._run_db(claim_solve_job, self.lease_seconds)
+        if job is None:
+            return None
+        await self.run_job(job)
+        return job.id
+
+    async def run_job(self, job: SolveJob) -> None:
+        budget = SolveBudget(job.timeout, job.max_nodes)
+        self._budgets[job.id] = budget
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            solve = loop.run_in_executor(executor, solve_job, job.board, SolverEngine(job.engine), budget)
+            while True:
+                done, _ = await asyncio.wait({solve}, timeout=self.heartbeat_interval)
+                if done:
+                    break
+                try:
+                    await self._run_db(update_solve_job_progress, job.id, budget.nodes)
+                except Exception:
+                    # Keep beating: the solve is still running, and the next heartbeat may get through.
+                    logger.warning("Heartbeat of solve job %d failed", job.id, exc_info=True)
+            try:
+                status, pairs = solve.result()
+            except Exception as e:
+                await self._run_db(finish_solve_job, job.id, job.board_id, JobStatus.failed, None, budget.nodes, None,
+                                   error=str(e))
+                return
+            if status == SolveStatus.cancelled and self._stopping:
+                await self._run_db(requeue_solve_job, job.id)
+                return
+            solved = {SolveStatus.solved: True, SolveStatus.no_solution: False}.get(status)
+            await self._run_db(finish_solve_job, job.id, job.board_id, JobStatus.finished, status.value, budget.nodes,
+                               pairs, solved)
+        finally:
+            del self._budgets[job.id]
+
+    async def _run_db(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._db_executor, functools.partial(fn, *args, **kwargs))
+
+
+job_workers = JobWorkerPool(config.JOB_WORKERS, config.JOB_POLL_SECONDS, config.JOB_HEARTBEAT_SECONDS,
+                            config.JOB_LEASE_SECONDS)
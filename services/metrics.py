@@ -0,0 +1,209 @@
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import config
+
+# Whether the instrumentation hooks record anything. When off, `timed` returns functions unchanged, the
+# request middleware is not installed and `observe_solve` is never reached, so the hot paths pay nothing.
+enabled = config.METRICS_ENABLED
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+NODE_BUCKETS = (0, 10, 100, 1000, 10000, 100000, 1000000, 10000000)
+
+Labels = Tuple[str, ...]
+
+registry: List["Metric"] = []
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric:
+    """
+    A metric family in the Prometheus text exposition format, with one series per combination of label values.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self.samples()
+
+    def samples(self) -> Iterator[str]:
+        return iter(())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Per label values: [count per bucket (+Inf last), sum].
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = [(labels, list(counts), total[0]) for labels, (counts, total) in self._values.items()]
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{float(bound)!r}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class CollectedMetric(Metric):
+    """
+    A gauge (or a counter kept elsewhere) read at scrape time from `collect`, which returns
+    `(label values, value)` pairs; nothing is recorded in between.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 collect: Callable[[], List[Tuple[Labels, float]]], kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+        self.kind = kind
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self.collect():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+request_seconds = Histogram("http_request_duration_seconds", "Time to serve a request, by route template.",
+                            ("method", "route", "status"))
+solve_seconds = Histogram("solver_duration_seconds", "Time spent in one solve.", ("engine", "status"))
+solve_nodes = Histogram("solver_nodes", "Search nodes explored by one solve.", ("engine",), NODE_BUCKETS)
+solve_backtracks = Histogram("solver_backtracks", "Dead ends backed out of by one solve.", ("engine",),
+                             NODE_BUCKETS)
+sqlite_seconds = Histogram("sqlite_query_duration_seconds", "Time spent in one database.py call.", ("function",))
+executor_rejections = Counter("executor_rejected_total", "Calls rejected with 503 because an executor was full.",
+                              ("executor",))
+
+
+def render() -> str:
+    return "\n".join(line for metric in registry for line in metric.render()) + "\n"
+
+
+def timed(function: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Records the duration of every call of a database function in `sqlite_query_duration_seconds`. For a
+    generator function, the time spent producing its items is recorded once it is exhausted or closed.
+    Returns the function itself when metrics are disabled.
+    """
+    if not enabled:
+        return function
+    name = function.__name__
+
+    if inspect.isgeneratorfunction(function):
+        @functools.wraps(function)
+        def generator_wrapper(*args: Any, **kwargs: Any) -> Iterator[Any]:
+            spent = 0.0
+            iterator = function(*args, **kwargs)
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        spent += time.perf_counter() - start
+                    yield item
+            finally:
+                iterator.close()
+                sqlite_seconds.observe(spent, name)
+        return generator_wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            sqlite_seconds.observe(time.perf_counter() - start, name)
+    return wrapper
+
+
+def observe_solve(engine: str, status: str, seconds: float, nodes: int, backtracks: int) -> None:
+    solve_seconds.observe(seconds, engine, status)
+    solve_nodes.observe(nodes, engine)
+    solve_backtracks.observe(backtracks, engine)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording `http_request_duration_seconds`. Requests are labelled with the matched route's
+    path template (`/get_board_by_id/{board_id}`), never the raw path, to keep the number of series bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status: List[Optional[int]] = [None]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            request_seconds.observe(time.perf_counter() - start, scope["method"],
+                                    getattr(route, "path", "unmatched"), str(status[0] or 500))
@@ -0,0 +1,331 @@
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+import config
+from models.domino import Domino
+from services.bitmask_solver import Move, SearchStats, SolverTables, apply_moves, compile_board, expand, \
+    initial_filled, search
+from services.solver_budget import Pair, SolveBudget
+
+# Every running parallel solve holds one of CANCEL_SLOTS slots, taken from a free list, and a unique token.
+# `slot_owners[slot]` is the token of the solve holding the slot, negated once the solve cancels its subtrees.
+# The subtrees add the nodes they visit to `node_counts[slot]` and stop as soon as the owner is not their token.
+CANCEL_SLOTS = 1024
+
+# Subtrees also publish the deepest partial placement of their solve, as flat cell indices, in `best_cells`
+# (BEST_CELLS per slot; deeper placements are cut short) with its number of pairs in `best_depths[slot]`, so
+# the parent has it even when a subtree does not hand back its result in time.
+BEST_CELLS = 1024
+
+# How often the parent re-checks the budget of a running solve, and how long it waits for cancelled
+# subtrees to hand back their partial placements.
+BUDGET_POLL_SECONDS = 0.05
+CANCEL_GRACE_SECONDS = 1.0
+
+State = Tuple[int, int, List[Move]]
+
+# What a subtree returns: (solution moves or None, deepest partial moves, whether it was stopped early,
+# dead ends backed out of).
+SubtreeResult = Tuple[Optional[List[Move]], List[Move], bool, int]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_slot_owners = None
+_node_counts = None
+_node_counts_lock = None
+_best_depths = None
+_best_cells = None
+_tokens = itertools.count(1)
+_free_slots = list(range(CANCEL_SLOTS))
+_slot_released = threading.Condition()
+
+# Worker-process globals, set by _init_worker.
+_worker_slot_owners = None
+_worker_node_counts = None
+_worker_node_counts_lock = None
+_worker_best_depths = None
+_worker_best_cells = None
+_worker_tables: Optional[Tuple[tuple, SolverTables]] = None
+
+
+def _init_worker(slot_owners, node_counts, node_counts_lock, best_depths, best_cells) -> None:
+    global _worker_slot_owners, _worker_node_counts, _worker_node_counts_lock, _worker_best_depths, \
+        _worker_best_cells
+    _worker_slot_owners = slot_owners
+    _worker_node_counts = node_counts
+    _worker_node_counts_lock = node_counts_lock
+    _worker_best_depths = best_depths
+    _worker_best_cells = best_cells
+
+
+def start_process_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    global _pool, _slot_owners, _node_counts, _node_counts_lock, _best_depths, _best_cells
+    with _pool_lock:
+        if _pool is None:
+            _slot_owners = multiprocessing.RawArray('q', CANCEL_SLOTS)
+            _node_counts = multiprocessing.RawArray('q', CANCEL_SLOTS)
+            _node_counts_lock = multiprocessing.Lock()
+            _best_depths = multiprocessing.RawArray('q', CANCEL_SLOTS)
+            _best_cells = multiprocessing.RawArray('i', CANCEL_SLOTS * BEST_CELLS)
+            _pool = ProcessPoolExecutor(max_workers=workers or config.SOLVER_WORKERS, initializer=_init_worker,
+                                        initargs=(_slot_owners, _node_counts, _node_counts_lock, _best_depths,
+                                                  _best_cells))
+        return _pool
+
+
+def shutdown_process_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    return _pool if _pool is not None else start_process_pool()
+
+
+def acquire_slot(token: int, deadline: Optional[float] = None) -> Optional[int]:
+    """
+    Takes a free slot for the solve with `token`, waiting for one while every slot is held. Returns None if
+    `deadline` (a `time.time()` value) passes first.
+    """
+    get_process_pool()
+    with _slot_released:
+        while not _free_slots:
+            timeout = None if deadline is None else deadline - time.time()
+            if timeout is not None and timeout <= 0:
+                return None
+            _slot_released.wait(timeout)
+        slot = _free_slots.pop()
+    with _node_counts_lock:
+        _slot_owners[slot] = token
+        _node_counts[slot] = 0
+        _best_depths[slot] = 0
+    return slot
+
+
+def next_token() -> int:
+    return next(_tokens)
+
+
+class SlotBudget(SolveBudget):
+    """
+    The budget of a solve run whole on a pool worker. Besides its own limits, it counts as cancelled once the
+    parent releases the solve's slot.
+    """
+
+    def __init__(self, slot: int, token: int, timeout: Optional[float] = None, max_nodes: Optional[int] = None):
+        super().__init__(timeout, max_nodes)
+        self.slot = slot
+        self.token = token
+
+    def exceeded(self, nodes: Optional[int] = None) -> bool:
+        if self.status is None and _worker_slot_owners[self.slot] != self.token:
+            self.cancel()
+        return super().exceeded(nodes)
+
+
+def published_best(slot: int) -> List[Pair]:
+    """
+    The deepest partial placement the subtrees of the solve holding `slot` have published.
+    """
+    with _node_counts_lock:
+        start = slot * BEST_CELLS
+        cells = _best_cells[start:start + 2 * _best_depths[slot]]
+    return list(zip(cells[::2], cells[1::2]))
+
+
+def release_slot(slot: int) -> None:
+    """
+    Hands a slot back, first stopping any subtree of its solve that is still running.
+    """
+    _slot_owners[slot] = 0
+    with _slot_released:
+        _free_slots.append(slot)
+        _slot_released.notify()
+
+
+def warm_process_pool(workers: Optional[int] = None, timeout: Optional[float] = None) -> int:
+    """
+    Starts the process pool and has it run one small solve per worker, so the worker processes are forked
+    and have been through the search before the first real solve is handed to them.
+
+    Returns the number of distinct worker processes that answered.
+    """
+    workers = workers or config.SOLVER_WORKERS
+    pool = start_process_pool(workers)
+    futures = [pool.submit(_warm_worker) for _ in range(workers)]
+    return len({future.result(timeout=timeout) for future in futures})
+
+
+def _warm_worker() -> int:
+    board = [[0, 0], [0, 1], [1, 1]]
+    dominos = [Domino(0, 0), Domino(0, 1), Domino(1, 1)]
+    search(compile_board(board, dominos), 0, 0)
+    return os.getpid()
+
+
+def split_search(tables: SolverTables, filled: int, used: int,
+                 depth: int) -> Tuple[Optional[List[Move]], List[State]]:
+    """
+    Expands the search breadth-first for `depth` placements.
+
+    Returns a complete solution if one was reached while expanding, otherwise the frontier of
+    independent `(filled, used, moves)` subtrees, in the order the serial search would visit them.
+    """
+    frontier: List[State] = [(filled, used, [])]
+    for _ in range(depth):
+        next_frontier = []
+        for filled, used, moves in frontier:
+            for move in expand(tables, filled, used):
+                cell, other, domino = move
+                child = (filled | (1 << cell) | (1 << other), used | (1 << domino), moves + [move])
+                if child[0] == tables.full_mask:
+                    return child[2], []
+                next_frontier.append(child)
+        frontier = next_frontier
+        if len(frontier) <= 1:
+            break
+    return None, frontier
+
+
+def _solve_subtree(board: List[List[int]], sides: List[Tuple[int, int]], filled: int, used: int,
+                   prefix: List[Pair], slot: int, token: int, deadline: Optional[float] = None,
+                   max_nodes: Optional[int] = None) -> SubtreeResult:
+    global _worker_tables
+    key = (tuple(map(tuple, board)), tuple(sides))
+    if _worker_tables is None or _worker_tables[0] != key:
+        _worker_tables = (key, compile_board(board, [Domino(side1, side2) for side1, side2 in sides]))
+    stats = SearchStats()
+    counted = 0
+    published = 0
+
+    def count_nodes() -> int:
+        # Nodes of a subtree whose solve no longer holds the slot are not counted.
+        nonlocal counted
+        with _worker_node_counts_lock:
+            if abs(_worker_slot_owners[slot]) == token:
+                _worker_node_counts[slot] += stats.nodes - counted
+            counted = stats.nodes
+            return _worker_node_counts[slot]
+
+    def publish_best() -> None:
+        nonlocal published
+        if len(stats.best) <= published:
+            return
+        published = len(stats.best)
+        cells = [cell for pair in prefix for cell in pair]
+        cells += [cell for move in stats.best for cell in move[:2]]
+        cells = cells[:BEST_CELLS - BEST_CELLS % 2]
+        with _worker_node_counts_lock:
+            if abs(_worker_slot_owners[slot]) == token and len(cells) // 2 > _worker_best_depths[slot]:
+                start = slot * BEST_CELLS
+                _worker_best_cells[start:start + len(cells)] = cells
+                _worker_best_depths[slot] = len(cells) // 2
+
+    def should_stop() -> bool:
+        nodes = count_nodes()
+        publish_best()
+        return (_worker_slot_owners[slot] != token or (deadline is not None and time.time() >= deadline)
+                or (max_nodes is not None and nodes >= max_nodes))
+
+    try:
+        moves = search(_worker_tables[1], filled, used, should_stop=should_stop, stats=stats)
+    finally:
+        count_nodes()
+        publish_best()
+    return moves, stats.best, stats.stopped, stats.backtracks
+
+
+def solve_puzzle_parallel(board: List[List[int]], dominos: List[Domino], x: int = 0, y: int = 0,
+                          placement: Optional[List[List[Optional[int]]]] = None,
+                          split_depth: Optional[int] = None, pairs: Optional[List[Tuple[int, int]]] = None,
+                          budget: Optional[SolveBudget] = None, used: int = 0) -> bool:
+    if placement is None:
+        placement = [[None for _ in range(len(board[0]))] for _ in range(len(board))]
+    tables = compile_board(board, dominos)
+    filled = initial_filled(board, x, y, placement)
+    if filled == tables.full_mask:
+        return True
+
+    moves, frontier = split_search(tables, filled, used,
+                                   config.SOLVER_SPLIT_DEPTH if split_depth is None else split_depth)
+    if moves is None and frontier:
+        pool = get_process_pool()
+        token = next_token()
+        deadline, max_nodes = (None, None) if budget is None else (budget.deadline, budget.max_nodes)
+        slot = acquire_slot(token, deadline)
+        if slot is None:
+            budget.exceeded()
+            raise budget.interrupted()
+        try:
+            if budget is not None:
+                _node_counts[slot] = budget.nodes
+            futures = {pool.submit(_solve_subtree, board, tables.sides, state_filled, state_used,
+                                   [(cell, other) for cell, other, _ in prefix], slot, token, deadline,
+                                   max_nodes): prefix
+                       for state_filled, state_used, prefix in frontier}
+            moves = _first_solution(futures, slot, budget)
+        finally:
+            release_slot(slot)
+    if moves is None:
+        return False
+    apply_moves(tables, moves, placement, pairs)
+    return True
+
+
+def _first_solution(futures: Dict[Future, List[Move]], slot: int,
+                    budget: Optional[SolveBudget] = None) -> Optional[List[Move]]:
+    """
+    Waits for the first subtree that finds a solution and cancels the others.
+
+    With a `budget`, the subtrees are cancelled as soon as it is exceeded (or any subtree stopped on its
+    own deadline or node limit); the deepest partial placement they reached is kept on the budget and
+    `SearchInterrupted` is raised.
+    """
+    pending = set(futures)
+    stopped = False
+    try:
+        while pending and not stopped:
+            done, pending = wait(pending, timeout=None if budget is None else BUDGET_POLL_SECONDS,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                result, best, subtree_stopped, backtracks = future.result()
+                if budget is not None:
+                    budget.backtracks += backtracks
+                if result is not None:
+                    return futures[future] + result
+                if budget is not None:
+                    budget.remember([(cell, other) for cell, other, _ in futures[future] + best])
+                stopped = stopped or subtree_stopped
+            if budget is not None and budget.exceeded(_node_counts[slot]):
+                stopped = True
+        if not stopped:
+            return None
+    finally:
+        if pending:
+            _slot_owners[slot] = -_slot_owners[slot]
+            # Only subtrees that had already started are waited for below; `wait` never sees a cancelled one as done.
+            pending = {future for future in pending if not future.cancel()}
+        if budget is not None:
+            budget.nodes = _node_counts[slot]
+    # Collect the partial placements of the subtrees that were still running.
+    done, _ = wait(pending, timeout=CANCEL_GRACE_SECONDS)
+    for future in done:
+        if not future.cancelled():
+            result, best, _, backtracks = future.result()
+            budget.backtracks += backtracks
+            if result is not None:
+                return futures[future] + result
+            budget.remember([(cell, other) for cell, other, _ in futures[future] + best])
+    # Subtrees still running after the grace period have published how deep they got.
+    budget.remember(published_best(slot))
+    budget.nodes = _node_counts[slot]
+    budget.exceeded()
+    raise budget.interrupted()
@@ -0,0 +1,91 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import config
+from services.database.database import get_profile_record, save_profile_record
+from services.solver_budget import SearchTrace
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stack of one thread every `interval` seconds from a background thread.
+
+    Stacks are kept in the folded format read by flamegraph.pl, speedscope and similar tools: one line per
+    distinct stack, frames root first separated by `;`, followed by the number of samples. Frames at or below
+    `root` (the profiler's caller) are left out. A CPU-bound thread only gives up the GIL every
+    `sys.getswitchinterval()` seconds, which bounds the effective sampling rate.
+    """
+
+    def __init__(self, thread_id: int, root, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or os.path.basename(code.co_filename)
+    return f"{module}.{code.co_qualname}:{code.co_firstlineno}".replace(";", ":").replace(" ", "_")
+
+
+def run_profiled(fn: Callable[..., Any], *args: Any) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Calls `fn` under a `SamplingProfiler` on the calling thread. Returns its result and the profile.
+    """
+    profiler = SamplingProfiler(threading.get_ident(), sys._getframe(), config.PROFILE_INTERVAL_SECONDS)
+    start = time.perf_counter()
+    profiler.start()
+    try:
+        result = fn(*args)
+    finally:
+        profiler.stop()
+    profile = {"elapsed": round(time.perf_counter() - start, 6), "interval": profiler.interval,
+               "samples": profiler.samples, "folded": profiler.folded()}
+    return result, profile
+
+
+def save_profile(profile: Dict[str, Any], trace: Optional[SearchTrace], **details: Any) -> str:
+    """
+    Stores a profile from `run_profiled` with the search trace and `details` of the request in the PROFILE table,
+    apart from the auth state in the session store. Returns its ID.
+    """
+    profile_id = os.urandom(8).hex()
+    save_profile_record(profile_id, {**details, **profile, "trace": trace.summary() if trace is not None else None},
+                        config.PROFILE_TTL_SECONDS, config.PROFILE_MAX_ENTRIES)
+    return profile_id
+
+
+def get_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    """
+    A stored profile by the ID from the `X-Profile-Id` response header, or `None` once it has expired.
+    """
+    return get_profile_record(profile_id, config.PROFILE_TTL_SECONDS)
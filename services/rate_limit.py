@@ -0,0 +1,37 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+
+class TokenBucketLimiter:
+    """
+    Per-key token buckets: each key may spend `burst` requests at once, refilled at `rate` per second.
+
+    Only the `max_keys` most recently seen keys are tracked; a forgotten key starts again with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key: str) -> float:
+        """
+        Takes a token for `key`. Returns 0 if one was available, otherwise the seconds until the next one.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
@@ -0,0 +1,248 @@
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, MutableMapping, Optional, Tuple
+
+import config
+from services.database.database import open_database
+
+
+class SessionStore(ABC):
+    """
+    Key/value storage for auth state, split into namespaces (`users`, `tokens`, `dev_keys`).
+
+    Entries may carry a time-to-live; expired entries are never returned and are swept periodically.
+    """
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def keys(self, namespace: str) -> Iterator[str]:
+        ...
+
+    @abstractmethod
+    def sweep_expired(self) -> int:
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local store; state is lost on restart and not shared between workers.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Tuple[Any, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        entry = self._entries.get((namespace, key))
+        if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+            return None
+        return entry[0]
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[(namespace, key)] = (value, None if ttl is None else time.time() + ttl)
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            return self._entries.pop((namespace, key), None) is not None
+
+    def keys(self, namespace: str) -> Iterator[str]:
+        now = time.time()
+        with self._lock:
+            keys = [key for (entry_namespace, key), (_, expires_at) in self._entries.items()
+                    if entry_namespace == namespace and (expires_at is None or expires_at > now)]
+        return iter(keys)
+
+    def sweep_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._entries.items()
+                       if expires_at is not None and expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Store in the SESSION_STORE table, shared by every worker using the same database and kept across restarts.
+
+    Lookups go through the (NAMESPACE, KEY) primary key; expired rows are deleted at most once every
+    `sweep_interval` seconds, on write.
+    """
+
+    def __init__(self, sweep_interval: float = 60.0):
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._table_ready = False
+        self._table_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # The table is created on first use rather than when the store is built at import.
+        if not self._table_ready:
+            with self._table_lock:
+                if not self._table_ready:
+                    self.create_table()
+                    self._table_ready = True
+        return open_database()
+
+    def create_table(self) -> None:
+        create_sql = """
+        CREATE TABLE IF NOT EXISTS SESSION_STORE(
+            NAMESPACE TEXT NOT NULL,
+            KEY TEXT NOT NULL,
+            VALUE TEXT NOT NULL,
+            EXPIRES_AT REAL,
+            PRIMARY KEY (NAMESPACE, KEY)
+        ) WITHOUT ROWID;
+        """
+        connection = open_database()
+        with connection:
+            connection.execute(create_sql)
+            connection.execute("CREATE INDEX IF NOT EXISTS SESSION_STORE_EXPIRES_AT ON SESSION_STORE(EXPIRES_AT);")
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        select_sql = """
+        SELECT VALUE FROM SESSION_STORE
+        WHERE NAMESPACE = ? AND KEY = ? AND (EXPIRES_AT IS NULL OR EXPIRES_AT > ?);
+        """
+        result = self._connection().execute(select_sql, (namespace, key, time.time())).fetchone()
+        return json.loads(result[0]) if result else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        insert_sql = "INSERT OR REPLACE INTO SESSION_STORE (NAMESPACE, KEY, VALUE, EXPIRES_AT) VALUES (?, ?, ?, ?);"
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute(insert_sql, (namespace, key, json.dumps(value), None if ttl is None else now + ttl))
+        if now - self._last_sweep >= self.sweep_interval:
+            self.sweep_expired()
+
+    def delete(self, namespace: str, key: str) -> bool:
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute("DELETE FROM SESSION_STORE WHERE NAMESPACE = ? AND KEY = ?;", (namespace, key))
+        return cursor.rowcount > 0
+
+    def keys(self, namespace: str) -> Iterator[str]:
+        select_sql = "SELECT KEY FROM SESSION_STORE WHERE NAMESPACE = ? AND (EXPIRES_AT IS NULL OR EXPIRES_AT > ?);"
+        rows = self._connection().execute(select_sql, (namespace, time.time())).fetchall()
+        return iter([row[0] for row in rows])
+
+    def sweep_expired(self) -> int:
+        self._last_sweep = time.time()
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute("DELETE FROM SESSION_STORE WHERE EXPIRES_AT <= ?;", (self._last_sweep,))
+        return cursor.rowcount
+
+
+class CachedSessionStore(SessionStore):
+    """
+    A small in-process read-through cache in front of another store.
+
+    Hits are served for at most `ttl` seconds, so a token revoked by another worker stops working within
+    that time. Misses are not cached, so new tokens are usable everywhere immediately.
+    """
+
+    def __init__(self, backend: SessionStore, ttl: float = 1.0, max_entries: int = 10000):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None and entry[1] > now:
+                return entry[0]
+        value = self.backend.get(namespace, key)
+        if value is not None:
+            self._remember(namespace, key, value, now)
+        return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.backend.set(namespace, key, value, ttl)
+        self._remember(namespace, key, value, time.monotonic())
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            self._entries.pop((namespace, key), None)
+        return self.backend.delete(namespace, key)
+
+    def keys(self, namespace: str) -> Iterator[str]:
+        return self.backend.keys(namespace)
+
+    def sweep_expired(self) -> int:
+        with self._lock:
+            self._entries.clear()
+        return self.backend.sweep_expired()
+
+    def _remember(self, namespace: str, key: str, value: Any, now: float) -> None:
+        with self._lock:
+            self._entries[(namespace, key)] = (value, now + self.ttl)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class StoreMapping(MutableMapping):
+    """
+    A dict-like view of one namespace of a session store, so existing code can keep using
+    `users[...]`, `token in active_tokens` and so on.
+    """
+
+    def __init__(self, store: SessionStore, namespace: str, ttl: Optional[float] = None):
+        self.store = store
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.store.get(self.namespace, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.store.set(self.namespace, key, value, self.ttl)
+
+    def __delitem__(self, key: str) -> None:
+        if not self.store.delete(self.namespace, key):
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return self.store.keys(self.namespace)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.store.keys(self.namespace))
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.store.get(self.namespace, key) is not None
+
+    def copy(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+
+def create_session_store(backend: str = config.SESSION_BACKEND) -> SessionStore:
+    if backend == "memory":
+        return InMemorySessionStore()
+    if backend == "sqlite":
+        return CachedSessionStore(SQLiteSessionStore(), config.SESSION_CACHE_TTL)
+    raise ValueError(f"Unknown session backend {backend!r}.")
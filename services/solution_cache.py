@@ -0,0 +1,178 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import config
+from models.domino import Domino
+from models.solver import SolverEngine
+from services.database.database import get_cached_solution, save_cached_solution
+from services import metrics
+from services.domino_service import solve_board
+from services.solver_budget import SolveBudget
+
+Pair = Tuple[int, int]
+
+
+class CanonicalBoard(NamedTuple):
+    """
+    The canonical form of a board under rotation, reflection and pip relabelling.
+
+    - **key**: A hash shared by every board with the same canonical form.
+    - **order**: For every canonical cell (row-major), the original cell it was taken from.
+    """
+    key: str
+    order: List[int]
+
+
+class CachedSolution(NamedTuple):
+    solved: bool
+    pairs: List[Pair]
+
+
+def _symmetries(rows: int, cols: int) -> List[Tuple[int, int, List[int]]]:
+    """
+    Returns `(rows, cols, order)` for each of the eight rotations and reflections of a board.
+    """
+    symmetries = []
+    for transpose in (False, True):
+        new_rows, new_cols = (cols, rows) if transpose else (rows, cols)
+        for flip_rows in (False, True):
+            for flip_cols in (False, True):
+                order = []
+                for i in range(new_rows):
+                    for j in range(new_cols):
+                        r = new_rows - 1 - i if flip_rows else i
+                        c = new_cols - 1 - j if flip_cols else j
+                        if transpose:
+                            r, c = c, r
+                        order.append(r * cols + c)
+                symmetries.append((new_rows, new_cols, order))
+    return symmetries
+
+
+def _relabel(values: List[int]) -> Tuple[int, ...]:
+    labels: Dict[int, int] = {}
+    return tuple(labels.setdefault(value, len(labels)) for value in values)
+
+
+def canonicalize(board: List[List[int]]) -> CanonicalBoard:
+    flat = [value for row in board for value in row]
+    best = None
+    for new_rows, new_cols, order in _symmetries(len(board), len(board[0])):
+        candidate = (new_rows, new_cols, _relabel([flat[cell] for cell in order]))
+        if best is None or candidate < best[0]:
+            best = (candidate, order)
+    (rows, cols, values), order = best
+    digest = hashlib.sha256(f"{rows}x{cols}:{','.join(map(str, values))}".encode()).hexdigest()
+    return CanonicalBoard(digest, order)
+
+
+def to_canonical_pairs(canonical: CanonicalBoard, pairs: List[Pair]) -> List[Pair]:
+    position = {cell: index for index, cell in enumerate(canonical.order)}
+    return sorted(tuple(sorted((position[a], position[b]))) for a, b in pairs)
+
+
+def from_canonical_pairs(canonical: CanonicalBoard, pairs: List[Pair]) -> List[Pair]:
+    order = canonical.order
+    return [tuple(sorted((order[a], order[b]))) for a, b in pairs]
+
+
+def fill_placement(board: List[List[int]], pairs: List[Pair], placement: List[List[Optional[int]]]) -> None:
+    """
+    Writes the placement grid the solvers produce for `generate_dominos` sets: the smaller side on the
+    top/left cell of each domino.
+    """
+    cols = len(board[0])
+    for a, b in pairs:
+        value_a, value_b = board[a // cols][a % cols], board[b // cols][b % cols]
+        placement[a // cols][a % cols] = min(value_a, value_b)
+        placement[b // cols][b % cols] = max(value_a, value_b)
+
+
+class SolutionCache:
+    """
+    An LRU cache of solver results keyed by canonical board hash, with an optional SQLite tier.
+
+    Both solutions and "no solution" results are cached.
+    """
+
+    def __init__(self, max_entries: int, persistent: bool = False):
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedSolution]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedSolution]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        if self.persistent:
+            stored = get_cached_solution(key)
+            if stored is not None:
+                entry = CachedSolution(*stored)
+                with self._lock:
+                    self.persistent_hits += 1
+                self._remember(key, entry)
+                return entry
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, entry: CachedSolution) -> None:
+        self._remember(key, entry)
+        if self.persistent:
+            save_cached_solution(key, entry.solved, entry.pairs)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.persistent_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "persistent_hits": self.persistent_hits, "misses": self.misses,
+                    "size": len(self._entries), "max_entries": self.max_entries}
+
+    def _remember(self, key: str, entry: CachedSolution) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+solution_cache = SolutionCache(config.SOLUTION_CACHE_SIZE, config.SOLUTION_CACHE_PERSIST)
+
+metrics.CollectedMetric("solution_cache_lookups_total", "Solution cache lookups by outcome.", ("result",),
+                        lambda: [((result,), solution_cache.stats()[result])
+                                 for result in ("hits", "persistent_hits", "misses")], kind="counter")
+metrics.CollectedMetric("solution_cache_entries", "Solutions held in the in-memory cache.", (),
+                        lambda: [((), solution_cache.stats()["size"])])
+
+
+def solve_board_cached(board: List[List[int]], dominos: List[Domino], engine: SolverEngine,
+                       placement: List[List[Optional[int]]], pairs: Optional[List[Pair]] = None,
+                       budget: Optional[SolveBudget] = None) -> bool:
+    """
+    `solve_board` through the solution cache. A search interrupted by its `budget` is not cached.
+    """
+    canonical = canonicalize(board)
+    entry = solution_cache.get(canonical.key)
+    if entry is None:
+        found: List[Pair] = []
+        solved = solve_board(board, dominos, engine, placement, found, budget)
+        solution_cache.put(canonical.key, CachedSolution(solved, to_canonical_pairs(canonical, found)))
+    else:
+        solved = entry.solved
+        found = from_canonical_pairs(canonical, entry.pairs)
+        fill_placement(board, found, placement)
+    if pairs is not None:
+        pairs.extend(found)
+    return solved
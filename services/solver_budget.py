@@ -0,0 +1,154 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, TypeVar
+
+from models.solver import SolveStatus
+
+# Most search nodes visited between two budget checks. While a block of nodes takes longer than
+# STOP_CHECK_SECONDS the interval shrinks (down to a check per node), so deadlines are kept on boards whose nodes
+# are slow; it grows back once blocks are fast again.
+STOP_CHECK_INTERVAL = 1024
+STOP_CHECK_SECONDS = 0.002
+
+Pair = Tuple[int, int]
+Limit = TypeVar("Limit", int, float)
+
+
+def next_check_interval(interval: int, elapsed: float, limit: Optional[int] = None) -> int:
+    """
+    The number of nodes to visit before the next budget check, given that the last `interval` nodes took
+    `elapsed` seconds.
+    """
+    limit = limit or STOP_CHECK_INTERVAL
+    if elapsed > STOP_CHECK_SECONDS:
+        return max(1, min(limit, int(interval * STOP_CHECK_SECONDS / elapsed)))
+    if elapsed < STOP_CHECK_SECONDS / 4:
+        return min(limit, interval * 2)
+    return min(limit, interval)
+
+
+class SearchInterrupted(Exception):
+    """
+    Raised by a solver that stopped before finishing because its budget ran out or the solve was cancelled.
+
+    - **status**: Why the search stopped (`timed_out`, `node_limit` or `cancelled`).
+    - **nodes**: The number of search nodes visited.
+    - **pairs**: The cell pairs of the deepest partial placement reached.
+    """
+
+    def __init__(self, status: SolveStatus, nodes: int, pairs: List[Pair]):
+        super().__init__(f"Search stopped ({status.value}) after {nodes} nodes.")
+        self.status = status
+        self.nodes = nodes
+        self.pairs = pairs
+
+
+class SearchTrace:
+    """
+    The shape of a search: for every depth (number of placements decided so far), how many nodes were entered
+    and how many legal placements they had to choose from.
+    """
+
+    def __init__(self):
+        self.nodes: List[int] = []
+        self.options: List[int] = []
+        self.max_options: List[int] = []
+        self.dead_ends: List[int] = []
+
+    def record(self, depth: int, options: int) -> None:
+        while len(self.nodes) <= depth:
+            self.nodes.append(0)
+            self.options.append(0)
+            self.max_options.append(0)
+            self.dead_ends.append(0)
+        self.nodes[depth] += 1
+        self.options[depth] += options
+        if options > self.max_options[depth]:
+            self.max_options[depth] = options
+        if not options:
+            self.dead_ends[depth] += 1
+
+    def summary(self) -> List[Dict[str, Any]]:
+        return [{"depth": depth, "nodes": nodes, "mean_branching": round(self.options[depth] / nodes, 3),
+                 "max_branching": self.max_options[depth], "dead_ends": self.dead_ends[depth]}
+                for depth, nodes in enumerate(self.nodes) if nodes]
+
+
+class SolveBudget:
+    """
+    Wall-clock and search-node limits for one solve, plus a cancellation flag.
+
+    The deadline is an absolute `time.time()` value so it can be handed to the solver processes as is.
+    Solvers keep `nodes` up to date (directly or through `exceeded`), add the dead ends they back out of to
+    `backtracks` when they finish, offer partial placements through `remember`, and poll `exceeded` at least
+    every `STOP_CHECK_INTERVAL` nodes (see `next_check_interval`). `nodes` may be read from other threads to
+    report progress. Solvers that support it also record the shape of their search in `trace` when one is set.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, max_nodes: Optional[int] = None,
+                 trace: Optional[SearchTrace] = None):
+        self.deadline = None if timeout is None else time.time() + timeout
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.backtracks = 0
+        self.best: List[Pair] = []
+        self.status: Optional[SolveStatus] = None
+        self.trace = trace
+        self._cancelled = threading.Event()
+        self._check_interval = self._countdown = 1
+        self._last_check = time.monotonic()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def exceeded(self, nodes: Optional[int] = None) -> bool:
+        """
+        Checks the limits, first bringing `nodes` up to date if the solver passes its running count, and records
+        why the search has to stop. Once exceeded, stays exceeded.
+        """
+        if nodes is not None:
+            self.nodes = nodes
+        if self.status is None:
+            if self._cancelled.is_set():
+                self.status = SolveStatus.cancelled
+            elif self.deadline is not None and time.time() >= self.deadline:
+                self.status = SolveStatus.timed_out
+            elif self.max_nodes is not None and self.nodes >= self.max_nodes:
+                self.status = SolveStatus.node_limit
+        return self.status is not None
+
+    def remember(self, pairs: List[Pair]) -> None:
+        if len(pairs) > len(self.best):
+            self.best = list(pairs)
+
+    def visit(self, pairs: Optional[List[Pair]]) -> None:
+        """
+        Counts one node of a recursive search, remembering `pairs` if it is the deepest placement so far, and
+        raises `SearchInterrupted` once the budget is exceeded.
+        """
+        self.nodes += 1
+        if pairs is not None and len(pairs) > len(self.best):
+            self.best = list(pairs)
+        self._countdown -= 1
+        if not self._countdown:
+            now = time.monotonic()
+            self._check_interval = next_check_interval(self._check_interval, now - self._last_check)
+            self._countdown, self._last_check = self._check_interval, now
+            if self.exceeded():
+                raise self.interrupted()
+
+    def interrupted(self) -> SearchInterrupted:
+        return SearchInterrupted(self.status or SolveStatus.timed_out, self.nodes, self.best)
+
+
+def cap_limit(requested: Optional[Limit], cap: Limit) -> Optional[Limit]:
+    """
+    The requested limit, lowered to `cap` (also when none was requested) unless `cap` is 0, which means no bound.
+    """
+    if cap > 0:
+        return min(requested or cap, cap)
+    return requested
@@ -0,0 +1,51 @@
+import asyncio
+import logging
+import time
+
+import config
+from models.solver import SolverEngine
+from services.board_generation import generate_boards
+from services.database.database import initialize_database
+from services.domino_service import solve_board_pairs
+from services.job_queue import job_workers
+from services.parallel_solver import warm_process_pool
+
+logger = logging.getLogger(__name__)
+
+# What `/ready` reports: "warming_up" while `start_up` runs, then "ready" ("failed" if warm-up raised), and
+# "shutting_down" once the app starts stopping.
+status = "warming_up"
+
+
+def warm_up() -> None:
+    """
+    Does the first-request work up front: creates the database schema, builds the tiling sets of the
+    `WARMUP_BOARD_SIZES`, solves one board of each size and starts the solver processes.
+    """
+    start = time.perf_counter()
+    initialize_database()
+    for rows, cols in config.WARMUP_BOARD_SIZES:
+        for board in generate_boards(rows, cols, 1, seed=0):
+            solve_board_pairs(board.tolist(), SolverEngine.bitmask)
+    workers = warm_process_pool(timeout=config.WARMUP_TIMEOUT_SECONDS)
+    logger.info("Warmed up %d solver processes in %.3fs", workers, time.perf_counter() - start)
+
+
+async def start_up() -> None:
+    """
+    Runs `warm_up` on a thread, so the server already answers (and `/ready` reports `warming_up`) meanwhile,
+    then starts the job workers and reports ready.
+    """
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, warm_up)
+    except Exception:
+        logger.exception("Warm-up failed")
+        set_status("failed")
+        return
+    job_workers.start()
+    set_status("ready")
+
+
+def set_status(value: str) -> None:
+    global status
+    status = value
@@ -1,17 +1,54 @@
+import asyncio
+import json
+import os
+import pickle
+import random
+import subprocess
+import sys
+import tempfile
+import threading
 import time
+from contextlib import nullcontext
+
+# Keep the suite's users, tokens and boards out of the working directory's database.
+os.environ.setdefault("DATABASE_PATH", os.path.join(tempfile.mkdtemp(), "test.db"))
 
 import pytest
 from fastapi import HTTPException
 from httpx import AsyncClient
-from main import app
+from main import app, lifespan
+import benchmark
+import loadtest
+from utils.stats import percentile
 from models.domino import Domino
 from fastapi.security import HTTPAuthorizationCredentials
 
-from services.auth_service import get_current_user
-from services.database.database import get_board_by_id
+from services.auth_service import get_current_user, generate_nonce, pbkdf2_sha256, session_store, users
+from services.rate_limit import TokenBucketLimiter
+from services import metrics
+from services.executor import BoundedExecutor, io_executor, solver_executor
+from services.session_store import CachedSessionStore, InMemorySessionStore, SQLiteSessionStore, StoreMapping
+from concurrent.futures import ThreadPoolExecutor
+from services.bitmask_solver import solve_puzzle_bitmask, compile_board, propagate, search
+from services.solver_budget import SearchInterrupted, SearchTrace, SolveBudget, next_check_interval
+from services.profiling import get_profile, run_profiled, save_profile
+from services.database.database import get_board_by_id, migrate_text_boards, open_database, save_boards_to_db, \
+    claim_solve_job, create_solve_job, finish_solve_job, get_board_with_solution, get_solve_job, requeue_solve_job, \
+    save_board_to_db, create_table, BINARY_BOARDS_VERSION
+from services.job_queue import JobWorkerPool
+from services.parallel_solver import acquire_slot, release_slot, start_process_pool
+from models.job import JobStatus
+from services.database.connection import ConnectionManager
+from services.database.board_codec import encode_board, decode_board, decode_board_grid, decode_board_view, \
+    FORMAT_INTS, FORMAT_SHORTS
+from models.board import Board, BoardGrid, board_error
+from services import board_generation
+from services.board_generation import generate_boards
+from services.solution_cache import SolutionCache, CachedSolution, canonicalize, solve_board_cached, solution_cache
+from models.solver import SolverEngine, SolveStatus
 from services.domino_service import generate_dominos, shuffle_dominos, generate_board, solve_puzzle, find_max_pips, \
-    generate_all_boards, solve_puzzle_parallel
-from utils.printer import print_board_with_solution, print_dominos
+    generate_all_boards, solve_puzzle_parallel, pip_counts_feasible, build_board, BoardEnumerator
+from utils.printer import print_board_with_solution, print_dominos, solution_to_json
 from unittest.mock import patch, MagicMock
 
 
@@ -26,6 +63,16 @@ async def test_generate_board_route_even():
     assert all(len(row) == 4 for row in data['board'])
 
 
+@pytest.mark.asyncio
+async def test_generate_board_route_stores_pips_above_a_byte():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/generate_board/", params={"rows": 130, "cols": 2})
+        board_id = response.json()["board_id"]
+        stored = await ac.get(f"/get_board_by_id/{board_id}")
+    assert response.status_code == 200
+    assert stored.json()["board"] == response.json()["board"]
+
+
 @pytest.mark.asyncio
 async def test_generate_board_route_odd():
     async with AsyncClient(app=app, base_url="http://test") as ac:
@@ -34,6 +81,64 @@ async def test_generate_board_route_odd():
     assert response.json() == {"detail": "Board size must be even."}
 
 
+@pytest.mark.asyncio
+async def test_generate_boards_route_stores_every_board():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/generate_boards/", params={"rows": 4, "cols": 6, "count": 5, "seed": 7})
+        again = await ac.get("/generate_boards/", params={"rows": 4, "cols": 6, "count": 5, "seed": 7})
+        odd = await ac.get("/generate_boards/", params={"rows": 3, "cols": 3, "count": 5})
+        too_many = await ac.get("/generate_boards/", params={"rows": 2, "cols": 2, "count": 10 ** 6})
+        wide = await ac.get("/generate_boards/", params={"rows": 130, "cols": 2, "count": 2})
+        too_long = await ac.get("/generate_boards/", params={"rows": 1026, "cols": 2, "count": 1})
+        empty = await ac.get("/generate_boards/", params={"rows": 0, "cols": 2, "count": 1})
+
+    assert response.status_code == 200
+    boards = response.json()["boards"]
+    assert len(boards) == 5
+    assert [board["board"] for board in boards] == [board["board"] for board in again.json()["boards"]]
+    for board in boards:
+        assert get_board_by_id(board["board_id"]) == board["board"]
+    assert odd.status_code == 400
+    assert too_many.status_code == 413
+    assert wide.status_code == 200
+    for board in wide.json()["boards"]:
+        assert get_board_by_id(board["board_id"]) == board["board"]
+    assert too_long.status_code == empty.status_code == 422
+
+
+@pytest.mark.parametrize("numpy", [False, True])
+def test_generate_boards_seeded_solvable_and_mixed(numpy):
+    if numpy:
+        pytest.importorskip("numpy")
+    with nullcontext() if numpy else patch("services.board_generation.np", None):
+        boards = generate_boards(6, 6, 20, seed=3)
+        assert boards == generate_boards(6, 6, 20, seed=3)
+    assert boards != generate_boards(6, 6, 20, seed=4)
+
+    for board in boards:
+        dominos = generate_dominos(find_max_pips(board))
+        assert pip_counts_feasible(board, dominos)
+        assert solve_puzzle_bitmask(board, dominos)
+    tilings = board_generation.tiling_set(6, 6)
+    assert len(set(tilings)) == len(tilings) > 1
+    assert all(sorted(cell for pair in tiling for cell in pair) == list(range(36)) for tiling in tilings)
+
+
+@pytest.mark.parametrize("numpy", [False, True])
+def test_board_payload_validation(numpy):
+    if numpy:
+        pytest.importorskip("numpy")
+    with nullcontext() if numpy else patch("models.board.np", None):
+        assert board_error([[0, 1], [2, 3]]) is None
+        assert board_error([[0, 1], [2]]) == "Board must be rectangular."
+        assert board_error([[0, 1, 2]]) == "Board size must be even."
+        assert board_error([[0, 200]]) is None
+        assert board_error([[0, 2000]]) == "Pip values must be between 0 and 1023."
+        assert board_error([]) == "Board must have at least one row and one column."
+        with pytest.raises(ValueError):
+            Board(board=[[0, -1]])
+
+
 @pytest.mark.asyncio
 async def test_register_and_login():
     async with AsyncClient(app=app, base_url="http://test") as ac:
@@ -68,6 +173,72 @@ async def test_register_and_login():
         return token
 
 
+@pytest.mark.asyncio
+async def test_login_rehashes_legacy_password_hash():
+    salt = generate_nonce(16)
+    legacy_record = {"salt": salt, "hashed_password": pbkdf2_sha256("legacypass", salt, 4096, 32)}
+
+    with patch.dict("services.auth_service.users", {"legacy_user": legacy_record}, clear=True), \
+            patch("config.PBKDF2_ITERATIONS", 1000):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            response = await ac.post("/auth/login", json={"username": "legacy_user", "password": "legacypass"})
+            assert response.status_code == 200
+            record = users["legacy_user"]
+            assert record["iterations"] == 1000
+            assert record["hashed_password"] == pbkdf2_sha256("legacypass", salt, 1000, 32)
+
+            response = await ac.post("/auth/login", json={"username": "legacy_user", "password": "legacypass"})
+            assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_auth_routes_use_store_off_event_loop():
+    store_threads = set()
+
+    class RecordingStore(InMemorySessionStore):
+        def get(self, namespace, key):
+            store_threads.add(threading.get_ident())
+            return super().get(namespace, key)
+
+        def set(self, namespace, key, value, ttl=None):
+            store_threads.add(threading.get_ident())
+            super().set(namespace, key, value, ttl)
+
+    store = RecordingStore()
+    with patch("routers.auth_routes.users", StoreMapping(store, "users")), \
+            patch("services.auth_service.users", StoreMapping(store, "users")), \
+            patch("services.auth_service.active_tokens", StoreMapping(store, "tokens")), \
+            patch("services.auth_service.dev_keys", StoreMapping(store, "dev_keys")), \
+            patch("config.PBKDF2_ITERATIONS", 1000):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            registered = await ac.post("/auth/register", json={"username": "offloop", "password": "secret"})
+            login = await ac.post("/auth/login", json={"username": "offloop", "password": "secret"})
+            dev_key = await ac.post("/auth/create_dev_key", headers={"Authorization": login.json()["token"]})
+
+    assert registered.status_code == login.status_code == dev_key.status_code == 200
+    assert store_threads and threading.get_ident() not in store_threads
+
+
+@pytest.mark.asyncio
+async def test_login_rate_limited_per_username():
+    with patch("services.auth_service.user_rate_limiter", TokenBucketLimiter(rate=0.01, burst=2)):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            statuses = [(await ac.post("/auth/login", json={"username": "nobody", "password": "x"})).status_code
+                        for _ in range(3)]
+            other = await ac.post("/auth/login", json={"username": "somebody", "password": "x"})
+
+    assert statuses == [400, 400, 429]
+    assert other.status_code == 400
+
+
+def test_token_bucket_refills():
+    limiter = TokenBucketLimiter(rate=1000, burst=1)
+    assert limiter.try_acquire("key") == 0
+    assert limiter.try_acquire("key") > 0
+    time.sleep(0.01)
+    assert limiter.try_acquire("key") == 0
+
+
 def test_generate_dominos():
     dominos = generate_dominos(6)
     assert len(dominos) == 28  # For a double-six set
@@ -127,6 +298,616 @@ def test_solve_puzzle_with_solution_parallel():
     assert solved
 
 
+def test_solve_puzzle_bitmask_matches_backtracking():
+    board, _ = generate_board(6, 6)
+    dominos = generate_dominos(find_max_pips(board))
+    expected = [[None for _ in range(6)] for _ in range(6)]
+    placement = [[None for _ in range(6)] for _ in range(6)]
+
+    assert solve_puzzle(board, dominos, 0, 0, expected)
+    assert solve_puzzle_bitmask(board, generate_dominos(find_max_pips(board)), 0, 0, placement)
+    assert placement == expected
+
+
+def test_solve_puzzle_bitmask_no_solution():
+    board = [[0, 1], [2, 3]]
+    dominos = generate_dominos(1)
+    placement = [[None, None], [None, None]]
+
+    assert not solve_puzzle_bitmask(board, dominos, 0, 0, placement)
+    assert placement == [[None, None], [None, None]]
+
+
+@pytest.mark.asyncio
+async def test_solve_route_bitmask_engine():
+    token = "valid_token"
+    board_data = {"board": [[0, 0], [1, 1]]}
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with patch.dict("services.auth_service.active_tokens", {token: "test_user"}, clear=True):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            response = await ac.post("/solve/", params={"engine": "bitmask"}, json=board_data, headers=headers)
+
+    assert response.status_code == 200
+    assert "Solution:" in response.text
+
+
+@pytest.mark.asyncio
+async def test_solve_route_json_format():
+    token = "valid_token"
+    board_data = {"board": [[0, 0], [1, 1]]}
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with patch.dict("services.auth_service.active_tokens", {token: "test_user"}, clear=True):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            by_param = await ac.post("/solve/", params={"format": "json"}, json=board_data, headers=headers)
+            by_accept = await ac.post("/solve/", json=board_data,
+                                      headers={**headers, "Accept": "application/json"})
+            forced_text = await ac.post("/solve/", params={"format": "text"}, json=board_data,
+                                        headers={**headers, "Accept": "application/json"})
+
+    assert by_param.status_code == 200
+    assert by_param.headers["content-type"] == "application/json"
+    assert by_param.json()["status"] == "solved"
+    assert by_param.json()["solved"] is True
+    assert by_param.json()["placement"] == [
+        {"domino": [0, 0], "cell": [0, 0], "orientation": "horizontal"},
+        {"domino": [1, 1], "cell": [1, 0], "orientation": "horizontal"},
+    ]
+    assert by_accept.json() == by_param.json()
+    assert "Solution:" in forced_text.text
+
+
+# Solvable, but needs a few branching moves even with forced-move propagation.
+BRANCHING_BOARD = [[2, 2, 1, 2], [0, 1, 1, 0], [2, 0, 0, 1]]
+
+
+def test_solve_puzzle_bitmask_stops_when_budget_runs_out():
+    dominos = generate_dominos(find_max_pips(BRANCHING_BOARD))
+
+    with patch("services.bitmask_solver.STOP_CHECK_INTERVAL", 1):
+        with pytest.raises(SearchInterrupted) as node_limit:
+            solve_puzzle_bitmask(BRANCHING_BOARD, dominos, budget=SolveBudget(max_nodes=5))
+        with pytest.raises(SearchInterrupted) as timed_out:
+            solve_puzzle_bitmask(BRANCHING_BOARD, dominos, budget=SolveBudget(timeout=0))
+        cancelled_budget = SolveBudget()
+        cancelled_budget.cancel()
+        with pytest.raises(SearchInterrupted) as cancelled:
+            solve_puzzle_bitmask(BRANCHING_BOARD, dominos, budget=cancelled_budget)
+
+    assert node_limit.value.status == SolveStatus.node_limit
+    assert node_limit.value.nodes == 5
+    assert node_limit.value.pairs
+    assert timed_out.value.status == SolveStatus.timed_out
+    assert cancelled.value.status == SolveStatus.cancelled
+    assert solve_puzzle_bitmask(BRANCHING_BOARD, dominos, budget=SolveBudget(max_nodes=1000))
+
+
+def test_next_check_interval_follows_block_time():
+    # Blocks slower than STOP_CHECK_SECONDS shrink the interval, fast ones let it grow back.
+    assert next_check_interval(1024, 0.2) == 10
+    assert next_check_interval(1024, 10.0) == 1
+    assert next_check_interval(8, 0.0) == 16
+    assert next_check_interval(1024, 0.0) == 1024
+
+
+def test_solve_puzzle_parallel_keeps_deadline_and_partial_placement():
+    random.seed(1)
+    board = build_board(16, 16).tolist()
+    budget = SolveBudget(timeout=0.5)
+    start = time.time()
+
+    with pytest.raises(SearchInterrupted) as exc_info:
+        solve_puzzle_parallel(board, generate_dominos(find_max_pips(board)), budget=budget)
+
+    assert time.time() - start < 1.0
+    assert exc_info.value.status == SolveStatus.timed_out
+    assert exc_info.value.pairs
+
+
+def test_solve_puzzle_stops_when_budget_runs_out():
+    dominos = generate_dominos(find_max_pips(BRANCHING_BOARD))
+    pairs = []
+
+    with patch("services.solver_budget.STOP_CHECK_INTERVAL", 1):
+        with pytest.raises(SearchInterrupted) as exc_info:
+            solve_puzzle(BRANCHING_BOARD, dominos, pairs=pairs, budget=SolveBudget(max_nodes=3))
+
+    assert exc_info.value.status == SolveStatus.node_limit
+    assert exc_info.value.nodes == 3
+    assert len(exc_info.value.pairs) >= 1
+
+
+@pytest.mark.asyncio
+async def test_solve_route_reports_partial_placement_on_node_limit():
+    token = "valid_token"
+    headers = {"Authorization": f"Bearer {token}"}
+    board_data = {"board": BRANCHING_BOARD}
+    solution_cache.clear()
+
+    with patch.dict("services.auth_service.active_tokens", {token: "test_user"}, clear=True):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            with patch("services.bitmask_solver.STOP_CHECK_INTERVAL", 1):
+                limited = await ac.post("/solve/", params={"engine": "bitmask", "max_nodes": 5, "format": "json"},
+                                        json=board_data, headers=headers)
+                limited_text = await ac.post("/solve/", params={"engine": "bitmask", "max_nodes": 5},
+                                             json=board_data, headers=headers)
+            unlimited = await ac.post("/solve/", params={"engine": "bitmask", "format": "json"},
+                                      json=board_data, headers=headers)
+
+    assert limited.status_code == 200
+    assert limited.json()["status"] == "node_limit"
+    assert limited.json()["solved"] is False
+    assert limited.json()["nodes"] == 5
+    assert limited.json()["placement"]
+    assert "Search stopped (node_limit) after 5 nodes." in limited_text.text
+    # The interrupted search was not cached as unsolvable.
+    assert unlimited.json()["status"] == "solved"
+
+
+def test_search_trace_records_branching_per_depth():
+    dominos = generate_dominos(find_max_pips(BRANCHING_BOARD))
+    bitmask_budget = SolveBudget(trace=SearchTrace())
+    recursive_budget = SolveBudget(trace=SearchTrace())
+
+    assert solve_puzzle_bitmask(BRANCHING_BOARD, dominos, budget=bitmask_budget)
+    assert solve_puzzle(BRANCHING_BOARD, generate_dominos(find_max_pips(BRANCHING_BOARD)), pairs=[],
+                        budget=recursive_budget)
+
+    for trace in (bitmask_budget.trace, recursive_budget.trace):
+        summary = trace.summary()
+        assert summary[0]["depth"] == 0
+        assert summary[0]["nodes"] == 1
+        assert summary[0]["max_branching"] >= 1
+        assert all(row["mean_branching"] <= row["max_branching"] for row in summary)
+
+
+@pytest.mark.asyncio
+async def test_solve_route_profiles_request_with_dev_key():
+    token = "valid_token"
+    headers = {"Authorization": f"Bearer {token}"}
+    board_data = {"board": BRANCHING_BOARD}
+
+    with patch.dict("services.auth_service.active_tokens", {token: "test_user"}, clear=True), \
+            patch.dict("services.auth_service.dev_keys", {"dev-key": "test_user", "other-key": "other_user"},
+                       clear=True):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            plain = await ac.post("/solve/", json=board_data, headers=headers)
+            invalid = await ac.post("/solve/", json=board_data, headers={**headers, "X-Profile": "wrong"})
+            profiled = await ac.post("/solve/", params={"format": "json"}, json=board_data,
+                                     headers={**headers, "X-Profile": "dev-key"})
+            profile_id = profiled.headers["X-Profile-Id"]
+            profile = await ac.get(f"/profiles/{profile_id}", headers={"X-Profile": "dev-key"})
+            folded = await ac.get(f"/profiles/{profile_id}/folded", headers={"X-Profile": "dev-key"})
+            other_user = await ac.get(f"/profiles/{profile_id}", headers={"X-Profile": "other-key"})
+            no_key = await ac.get(f"/profiles/{profile_id}")
+
+    assert "X-Profile-Id" not in plain.headers
+    assert invalid.status_code == 403
+    assert profiled.json()["status"] == "solved"
+    assert profile.status_code == 200
+    body = profile.json()
+    assert body["engine"] == "bitmask"
+    assert body["status"] == "solved"
+    assert body["route"] == "/solve/"
+    assert body["trace"][0]["depth"] == 0
+    assert folded.text == body["folded"]
+    assert other_user.status_code == 404
+    assert no_key.status_code == 422
+
+
+def test_profiles_are_kept_apart_from_session_store():
+    with patch("config.PROFILE_MAX_ENTRIES", 2):
+        profile_ids = [save_profile({"folded": ""}, None, owner="test_user") for _ in range(3)]
+
+    # Only the newest PROFILE_MAX_ENTRIES are kept.
+    assert get_profile(profile_ids[0]) is None
+    assert get_profile(profile_ids[2]) == {"owner": "test_user", "folded": "", "trace": None}
+    assert not list(session_store.keys("profiles"))
+
+
+def test_run_profiled_collects_folded_stacks():
+    def busy(seconds):
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            pass
+        return "done"
+
+    result, profile = run_profiled(busy, 0.2)
+
+    assert result == "done"
+    assert profile["samples"] > 0
+    stack, count = profile["folded"].splitlines()[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert "busy" in stack.split(";")[0]
+
+
+def test_search_forced_moves_finds_same_solution():
+    board, _ = generate_board(8, 8)
+    tables = compile_board(board, generate_dominos(find_max_pips(board)))
+
+    assert sorted(search(tables, forced_moves=True)) == sorted(search(tables, forced_moves=False))
+
+
+def test_propagate_rejects_dead_cell():
+    board = [[0, 1], [1, 1]]
+    tables = compile_board(board, generate_dominos(1))
+    trail = []
+
+    # Covering the bottom row with [1|1] leaves [0|1] as the only option for the top row.
+    feasible, filled, used = propagate(tables, 0b1100, 0b100, trail)
+    assert feasible and filled == 0b1111 and trail == [(0, 1, 1)]
+    # With [0|1] used elsewhere the top-left cell has no placement left.
+    feasible, _, _ = propagate(tables, 0b1100, 0b110, [])
+    assert not feasible
+
+
+def test_pip_counts_feasible():
+    assert pip_counts_feasible([[0, 0], [1, 1]], generate_dominos(1))
+    assert not pip_counts_feasible([[0, 1], [2, 3]], generate_dominos(1))
+    assert not pip_counts_feasible([[1, 1, 1, 1], [1, 0, 0, 1]], generate_dominos(1))
+
+
+def test_solve_puzzle_parallel_split_depths():
+    board, _ = generate_board(6, 6)
+    for split_depth in (0, 1, 4):
+        placement = [[None for _ in range(6)] for _ in range(6)]
+        assert solve_puzzle_parallel(board, generate_dominos(find_max_pips(board)), placement=placement,
+                                     split_depth=split_depth)
+        assert all(cell is not None for row in placement for cell in row)
+
+
+def test_parallel_solver_slots_are_never_shared():
+    start_process_pool()
+    with patch("services.parallel_solver._free_slots", [0, 1]):
+        first, second = acquire_slot(1), acquire_slot(2)
+        assert {first, second} == {0, 1}
+        # Every slot is held: wait until the deadline instead of sharing one.
+        assert acquire_slot(3, deadline=time.time() + 0.05) is None
+        release_slot(first)
+        assert acquire_slot(4) == first
+        release_slot(first)
+        release_slot(second)
+
+
+def test_solve_puzzle_parallel_no_solution():
+    board = [[0, 1, 1, 0], [1, 0, 0, 1]]
+    assert not solve_puzzle_parallel(board, generate_dominos(1), split_depth=1)
+
+
+def test_canonicalize_symmetric_and_relabelled_boards():
+    board = [[0, 1, 2], [2, 3, 3]]
+    rotated = [[3, 2], [3, 1], [2, 0]]
+    mirrored = [[2, 1, 0], [3, 3, 2]]
+    relabelled = [[5, 4, 0], [0, 1, 1]]
+
+    key = canonicalize(board).key
+    assert canonicalize(rotated).key == key
+    assert canonicalize(mirrored).key == key
+    assert canonicalize(relabelled).key == key
+    assert canonicalize([[0, 1, 2], [3, 2, 3]]).key != key
+
+
+def test_solve_board_cached_reuses_solution_for_rotated_board():
+    board, _ = generate_board(4, 6)
+    rotated = [list(row) for row in zip(*board[::-1])]
+    solution_cache.clear()
+
+    assert solve_board_cached(board, generate_dominos(find_max_pips(board)), SolverEngine.bitmask,
+                              [[None] * 6 for _ in range(4)])
+    pairs = []
+    placement = [[None] * 4 for _ in range(6)]
+    assert solve_board_cached(rotated, generate_dominos(find_max_pips(rotated)), SolverEngine.bitmask,
+                              placement, pairs)
+    assert solution_cache.stats()["hits"] == 1
+
+    values = [value for row in rotated for value in row]
+    assert sorted(cell for pair in pairs for cell in pair) == list(range(24))
+    assert all(b - a in (1, 4) for a, b in pairs)
+    assert len({tuple(sorted((values[a], values[b]))) for a, b in pairs}) == 12
+    assert all(cell is not None for row in placement for cell in row)
+
+
+def test_solution_cache_lru_eviction_and_persistent_tier():
+    cache = SolutionCache(2, persistent=True)
+    keys = [f"test-{time.time()}-{i}" for i in range(3)]
+    for key in keys:
+        cache.put(key, CachedSolution(False, []))
+
+    assert cache.stats()["size"] == 2
+    assert cache.get(keys[2]) == CachedSolution(False, [])
+    assert cache.get(keys[0]) == CachedSolution(False, [])
+    assert cache.stats()["persistent_hits"] == 1
+    assert cache.get("test-missing") is None
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_solve_by_id_route_stores_solution():
+    token = "valid_token"
+    headers = {"Authorization": f"Bearer {token}"}
+    _, board_id = generate_board(4, 4)
+
+    with patch.dict("services.auth_service.active_tokens", {token: "test_user"}, clear=True):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            first = await ac.post(f"/solve_by_id/{board_id}", headers=headers)
+            with patch("routers.board_routes.solve_board_cached") as mock_solve:
+                second = await ac.post(f"/solve_by_id/{board_id}", headers=headers)
+                mock_solve.assert_not_called()
+            missing = await ac.post("/solve_by_id/0", headers=headers)
+
+    assert first.status_code == 200
+    assert "Solution:" in first.text
+    assert second.text == first.text
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_solve_job_route_queues_and_reports_result():
+    token = "valid_token"
+    headers = {"Authorization": f"Bearer {token}"}
+    board, _ = generate_board(4, 4)
+
+    with patch.dict("services.auth_service.active_tokens", {token: "test_user", "other": "other_user"}, clear=True):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            submitted = await ac.post("/jobs/solve", json={"board": board}, headers=headers)
+            job_id = submitted.json()["job_id"]
+            queued = await ac.get(f"/jobs/{job_id}", headers=headers)
+            assert await JobWorkerPool(1).run_next_job() == job_id
+            finished = await ac.get(f"/jobs/{job_id}", headers=headers)
+            other_user = await ac.get(f"/jobs/{job_id}", headers={"Authorization": "Bearer other"})
+
+    assert submitted.status_code == 202
+    assert queued.json()["status"] == "queued"
+    assert finished.json()["status"] == "finished"
+    assert finished.json()["result"] == "solved"
+    assert finished.json()["elapsed"] >= 0
+    assert len(finished.json()["placement"]) == 8
+    # The solution is stored next to the board.
+    assert get_board_with_solution(submitted.json()["board_id"])[1][0] is True
+    assert other_user.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_job_worker_keeps_beating_when_server_is_busy():
+    board_id = save_board_to_db(2, 2, [[0, 0], [1, 1]])
+    job_id = create_solve_job(board_id, "test_user", "bitmask", None, None)
+    heartbeats = []
+
+    def slow_solve(board, engine, budget):
+        time.sleep(0.2)
+        return SolveStatus.solved, [(0, 1), (2, 3)]
+
+    def flaky_progress(job, nodes):
+        heartbeats.append(job)
+        if len(heartbeats) == 1:
+            raise RuntimeError("database is locked")
+
+    workers = JobWorkerPool(1, heartbeat_interval=0.02)
+    # A saturated request executor must not reach the job workers.
+    with patch.object(io_executor, "pending", io_executor.max_pending), \
+            patch("services.job_queue.solve_job", slow_solve), \
+            patch("services.job_queue.update_solve_job_progress", flaky_progress):
+        await workers.run_job(get_solve_job(job_id))
+
+    assert len(heartbeats) > 1
+    assert get_solve_job(job_id).status == JobStatus.finished
+
+
+def test_claim_solve_job_reclaims_expired_lease():
+    board_id = save_board_to_db(2, 2, [[0, 0], [1, 1]])
+    job_id = create_solve_job(board_id, "test_user", "bitmask", None, None)
+
+    claimed = claim_solve_job(lease_seconds=30)
+    assert claimed.id == job_id
+    assert claimed.status == JobStatus.running
+    assert claimed.board == [[0, 0], [1, 1]]
+    assert claim_solve_job(lease_seconds=30) is None
+    # A worker that stopped sending heartbeats loses the job.
+    assert claim_solve_job(lease_seconds=-1).id == job_id
+
+    requeue_solve_job(job_id)
+    assert get_solve_job(job_id).status == JobStatus.queued
+    assert claim_solve_job(lease_seconds=30).id == job_id
+    finish_solve_job(job_id, board_id, JobStatus.finished, "solved", 0, [(0, 1), (2, 3)], True)
+    assert get_solve_job(job_id).pairs == [(0, 1), (2, 3)]
+
+
+@pytest.mark.asyncio
+async def test_metrics_route_reports_requests_solves_and_queries():
+    token = "valid_token"
+    headers = {"Authorization": f"Bearer {token}"}
+    solution_cache.clear()
+
+    with patch.dict("services.auth_service.active_tokens", {token: "test_user"}, clear=True):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            await ac.post("/solve/", params={"engine": "bitmask"}, json={"board": BRANCHING_BOARD}, headers=headers)
+            await ac.get("/get_board_by_id/1")
+            response = await ac.get("/metrics")
+            with patch("services.metrics.enabled", False):
+                disabled = await ac.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert any(line.startswith('http_request_duration_seconds_count{method="GET",route="/get_board_by_id/{board_id}"')
+               for line in lines)
+    assert any(line.startswith('solver_nodes_count{engine="bitmask"}') for line in lines)
+    assert any(line.startswith('solver_backtracks_bucket{engine="bitmask",le="+Inf"}') for line in lines)
+    assert any(line.startswith('sqlite_query_duration_seconds_count{function="get_encoded_board"}') for line in lines)
+    assert 'executor_pending{executor="cpu"} 0' in lines
+    assert disabled.status_code == 404
+
+
+def test_metrics_histogram_and_timed_generator():
+    histogram = metrics.Histogram("test_histogram", "Test.", ("kind",), buckets=(1, 10))
+    metrics.registry.remove(histogram)
+    for value in (0.5, 5, 50):
+        histogram.observe(value, "a")
+    assert list(histogram.samples()) == [
+        'test_histogram_bucket{kind="a",le="1.0"} 1',
+        'test_histogram_bucket{kind="a",le="10.0"} 2',
+        'test_histogram_bucket{kind="a",le="+Inf"} 3',
+        'test_histogram_sum{kind="a"} 55.5',
+        'test_histogram_count{kind="a"} 3',
+    ]
+
+    with patch.object(metrics.sqlite_seconds, "observe") as observe:
+        timed_range = metrics.timed(range_generator)
+        assert list(timed_range(3)) == [0, 1, 2]
+    # One observation for the whole generator, once it is exhausted.
+    assert [call.args[1] for call in observe.call_args_list] == ["range_generator"]
+
+
+def range_generator(n):
+    yield from range(n)
+
+
+@pytest.mark.asyncio
+async def test_bounded_executor_rejects_when_saturated():
+    executor = BoundedExecutor("test", lambda: ThreadPoolExecutor(1), max_pending=1)
+    release = threading.Event()
+    blocked = asyncio.ensure_future(executor.run(release.wait))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await executor.run(time.sleep, 0)
+    assert exc_info.value.status_code == 503
+
+    release.set()
+    assert await blocked
+    assert await executor.run(sum, [1, 2]) == 3
+    executor.shutdown()
+    # Shut down executors are built again on the next call.
+    assert await executor.run(sum, [3, 4]) == 7
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_app_restarts_in_same_process():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        for _ in range(2):
+            with patch("config.WARMUP_BOARD_SIZES", []):
+                async with lifespan(app):
+                    response = await ac.get("/generate_board/", params={"rows": 2, "cols": 2})
+                    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_solve_batch_route_streams_deduplicated_results():
+    token = "valid_token"
+    headers = {"Authorization": f"Bearer {token}"}
+    board, _ = generate_board(4, 4)
+    mirrored = [row[::-1] for row in board]
+    unsolvable = [[0, 0], [0, 0]]
+    solution_cache.clear()
+
+    with patch.dict("services.auth_service.active_tokens", {token: "test_user"}, clear=True):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            response = await ac.post("/solve/batch", headers=headers,
+                                     json=[{"board": board}, {"board": unsolvable}, {"board": board},
+                                           {"board": mirrored}])
+            single = await ac.post("/solve/", params={"format": "json"}, json={"board": board}, headers=headers)
+
+    assert response.status_code == 200
+    results = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda result: result["index"])
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert [result["solved"] for result in results] == [True, False, True, True]
+    assert [result["status"] for result in results] == ["solved", "no_solution", "solved", "solved"]
+    assert results[0]["placement"] == results[2]["placement"] == single.json()["placement"]
+    assert {tuple(entry) for entry in results[3]["placement"]} == {("domino", "cell", "orientation")}
+    assert len(results[3]["placement"]) == 8
+    assert results[1]["placement"] is None
+    # One solve per distinct canonical board.
+    assert solution_cache.stats()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_solve_batch_route_budgets_every_board():
+    token = "valid_token"
+    headers = {"Authorization": f"Bearer {token}"}
+    random.seed(1)
+    hard = build_board(16, 16).tolist()
+    solution_cache.clear()
+
+    with patch.dict("services.auth_service.active_tokens", {token: "test_user"}, clear=True):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            start = time.time()
+            response = await ac.post("/solve/batch", params={"timeout": 0.3}, headers=headers,
+                                     json=[{"board": hard}, {"board": [[0, 1], [0, 1]]}])
+            elapsed = time.time() - start
+            with patch.object(solver_executor, "pending", solver_executor.max_pending):
+                busy = await ac.post("/solve/batch", headers=headers, json=[{"board": hard}])
+
+    results = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda result: result["index"])
+    assert [result["status"] for result in results] == ["timed_out", "solved"]
+    # A timed-out board reports its deepest partial placement, as /solve/ does.
+    assert 0 < len(results[0]["placement"]) < 128
+    assert elapsed < 2.0
+    # Interrupted solves are not cached.
+    assert solution_cache.stats()["size"] == 1
+    assert busy.status_code == 503
+
+
+def test_benchmark_corpus_is_reproducible_and_summarized():
+    corpus = benchmark.build_corpus(7, [(4, 4)], 2)
+
+    assert corpus == benchmark.build_corpus(7, [(4, 4)], 2)
+    assert [board.solvable for board in corpus] == [True, True, False, False]
+    results = benchmark.run_benchmark(corpus, [SolverEngine.bitmask, SolverEngine.backtracking], repeat=1,
+                                      memory=False)
+    assert [(row["engine"], row["runs"], row["wrong_answers"]) for row in results] == [
+        ("bitmask", 4, 0), ("backtracking", 4, 0)]
+    assert results[0]["p50_ms"] <= results[0]["p95_ms"]
+    assert percentile([4, 1, 3, 2], 0.5) == 2
+    assert percentile([4, 1, 3, 2], 0.95) == 4
+
+
+@pytest.mark.asyncio
+async def test_load_test_reports_every_route():
+    with patch("services.auth_service.user_rate_limiter", TokenBucketLimiter(rate=100, burst=100)):
+        report = await loadtest.run_load({"generate_board": 1, "solve": 1, "get_board": 1, "login": 1}, rps=40,
+                                         duration=0.5, board_size=4, distinct_boards=3)
+
+    assert sum(row["requests"] for row in report["results"]) == 20
+    for row in report["results"]:
+        assert row["ok"] == row["requests"]
+        assert row["p50_ms"] <= row["p99_ms"] <= row["max_ms"]
+        assert sum(row["histogram"].values()) == row["requests"]
+
+
+@pytest.mark.asyncio
+async def test_ready_route_follows_lifespan():
+    warmed = threading.Event()
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        with patch("services.startup.warm_up", warmed.wait):
+            async with lifespan(app):
+                # The server answers while it warms up in the background.
+                warming = await ac.get("/ready")
+                board = await ac.get("/generate_board/", params={"rows": 2, "cols": 2})
+                warmed.set()
+                while (ready := await ac.get("/ready")).status_code != 200:
+                    await asyncio.sleep(0.01)
+                assert ready.json() == {"status": "ready"}
+        stopped = await ac.get("/ready")
+
+    assert warming.status_code == 503
+    assert warming.json()["detail"] == "warming_up"
+    assert board.status_code == 200
+    assert stopped.json()["detail"] == "shutting_down"
+
+
+def test_importing_app_does_not_create_tables():
+    path = os.path.join(tempfile.mkdtemp(), "import.db")
+    script = ("import os, main, config; from services.database.database import open_database; "
+              "assert not os.path.exists(config.DATABASE_PATH); "
+              "print(open_database().execute(\"SELECT COUNT(*) FROM BOARD;\").fetchone()[0])")
+    result = subprocess.run([sys.executable, "-c", script], env={**os.environ, "DATABASE_PATH": path},
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "0"
+
+
 def test_print_board_with_solution():
     board = [[1, 2], [3, 4]]
     placement = [[0, 0], [1, 1]]
@@ -153,6 +934,17 @@ def test_print_dominos():
     assert print_dominos(dominos, max_pips) == expected_output
 
 
+def test_solution_to_json():
+    board = [[0, 1, 2], [3, 1, 2]]
+    pairs = [(2, 5), (0, 3), (1, 4)]
+
+    assert solution_to_json(board, pairs) == [
+        {"domino": [0, 3], "cell": [0, 0], "orientation": "vertical"},
+        {"domino": [1, 1], "cell": [0, 1], "orientation": "vertical"},
+        {"domino": [2, 2], "cell": [0, 2], "orientation": "vertical"},
+    ]
+
+
 def test_print_dominos_empty_list():
     dominos = []
     max_pips = 2
@@ -170,6 +962,54 @@ def test_find_max_pips_normal_board():
     assert find_max_pips(board) == 9, "Should return the maximum pip value on a normal board"
 
 
+@pytest.mark.asyncio
+async def test_get_board_by_id_route_etag_and_not_modified():
+    board, board_id = generate_board(4, 4)
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get(f"/get_board_by_id/{board_id}")
+        etag = response.headers["ETag"]
+        not_modified = await ac.get(f"/get_board_by_id/{board_id}", headers={"If-None-Match": f'"other", {etag}'})
+        stale = await ac.get(f"/get_board_by_id/{board_id}", headers={"If-None-Match": '"other"'})
+
+    assert response.json() == {"board": board}
+    assert etag.startswith('"') and len(etag) == 34
+    assert "immutable" in response.headers["Cache-Control"]
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+    assert stale.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_solve_route_etag_skips_solving_when_not_modified():
+    token = "valid_token"
+    headers = {"Authorization": f"Bearer {token}"}
+    board_data = {"board": BRANCHING_BOARD}
+    solution_cache.clear()
+
+    with patch.dict("services.auth_service.active_tokens", {token: "test_user"}, clear=True):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            solved = await ac.post("/solve/", json=board_data, headers=headers)
+            as_json = await ac.post("/solve/", params={"format": "json"}, json=board_data, headers=headers)
+            with patch("routers.board_routes.run_solve") as run_solve:
+                not_modified = await ac.post("/solve/", json=board_data,
+                                             headers={**headers, "If-None-Match": solved.headers["ETag"]})
+            solution_cache.clear()
+            with patch("services.bitmask_solver.STOP_CHECK_INTERVAL", 1):
+                interrupted = await ac.post("/solve/", params={"engine": "bitmask", "max_nodes": 5},
+                                            json=board_data, headers=headers)
+
+    assert solved.headers["ETag"].startswith('W/"')
+    assert solved.headers["ETag"] != as_json.headers["ETag"]
+    assert "max-age" in solved.headers["Cache-Control"]
+    assert solved.headers["Vary"] == "Accept"
+    assert not_modified.status_code == 304
+    run_solve.assert_not_called()
+    assert "ETag" not in interrupted.headers
+    assert interrupted.headers["Cache-Control"] == "no-store"
+
+
 def test_get_board_by_id_existing():
     board_id = 1
     expected_board = [[1, 2], [3, 4]]
@@ -188,7 +1028,7 @@ def test_get_board_by_id_existing():
         mock_conn.cursor.assert_called_once()
         mock_cursor.execute.assert_called_once_with("SELECT BOARD FROM BOARD WHERE ID = ?;", (board_id,))
         mock_cursor.fetchone.assert_called_once()
-        mock_conn.close.assert_called_once()
+        mock_conn.close.assert_not_called()
 
         assert result == expected_board
 
@@ -209,11 +1049,137 @@ def test_get_board_by_id_non_existing():
         mock_conn.cursor.assert_called_once()
         mock_cursor.execute.assert_called_once_with("SELECT BOARD FROM BOARD WHERE ID = ?;", (board_id,))
         mock_cursor.fetchone.assert_called_once()
-        mock_conn.close.assert_called_once()
+        mock_conn.close.assert_not_called()
 
         assert result is None
 
 
+@pytest.mark.asyncio
+async def test_boards_route_pages_by_size_and_fetches_by_ids():
+    boards = [[[0, 1, 2, 3, 4, 5, 6, 7, 8, value]] * 2 for value in range(5)]
+    board_ids = list(save_boards_to_db(10, 2, boards))
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        first = await ac.get("/boards", params={"rows": 2, "cols": 10, "limit": 3})
+        first_lines = [json.loads(line) for line in first.text.splitlines()]
+        rest = await ac.get("/boards", params={"rows": 2, "cols": 10, "limit": 3,
+                                               "after_id": first_lines[-1]["next_after_id"]})
+        rest_lines = [json.loads(line) for line in rest.text.splitlines()]
+        fetched = await ac.post("/boards/get", json=[board_ids[3], board_ids[0], 10 ** 9])
+        fetched_lines = [json.loads(line) for line in fetched.text.splitlines()]
+        too_many = await ac.post("/boards/get", json=list(range(10 ** 4)))
+
+    assert first.headers["content-type"] == "application/x-ndjson"
+    assert [line["board_id"] for line in first_lines[:-1] + rest_lines[:-1]] == board_ids
+    assert first_lines[0] == {"board_id": board_ids[0], "rows": 2, "cols": 10, "board": boards[0]}
+    assert first_lines[-1]["next_after_id"] == board_ids[2]
+    assert rest_lines[-1] == {"next_after_id": None}
+    assert [line.get("board") for line in fetched_lines[:-1]] == [boards[0], boards[3]]
+    assert fetched_lines[-1] == {"missing": [10 ** 9]}
+    assert too_many.status_code == 413
+
+
+def test_boards_page_query_uses_size_index():
+    plan = open_database().execute(
+        "EXPLAIN QUERY PLAN SELECT ID, ROWS, COLS, BOARD FROM BOARD WHERE ID > ? AND ROWS = ? AND COLS = ? "
+        "ORDER BY ID LIMIT ?;", (0, 2, 10, 5)).fetchall()
+
+    assert any("USING INDEX BOARD_SIZE" in row[-1] for row in plan)
+    assert not any("TEMP B-TREE" in row[-1] for row in plan)
+
+
+def test_board_codec_round_trip():
+    nibble_board = [[0, 15, 3], [7, 1, 2], [4, 4, 9]]
+    byte_board = [[16, 0], [-1, 127]]
+
+    assert len(encode_board(nibble_board)) == 5 + 5
+    assert decode_board(encode_board(nibble_board)) == nibble_board
+    assert decode_board(encode_board(byte_board)) == byte_board
+    rows, cols, cells = decode_board_view(encode_board(byte_board))
+    assert (rows, cols, cells.tolist()) == (2, 2, [16, 0, -1, 127])
+    short_board, int_board = [[128, 0], [-129, 32767]], [[70000, 0], [1, -70000]]
+    assert encode_board(short_board)[0] == FORMAT_SHORTS and decode_board(encode_board(short_board)) == short_board
+    assert encode_board(int_board)[0] == FORMAT_INTS and decode_board(encode_board(int_board)) == int_board
+
+
+def test_board_grid_views_and_codec():
+    board = [[0, 1, 2], [3, 4, 5]]
+    grid = BoardGrid.from_rows(board)
+
+    assert len(grid) == 2 and len(grid[0]) == 3
+    assert grid[1][2] == 5 and grid[-1][0] == 3
+    assert grid == board and grid.tolist() == board
+    grid[0][0] = 6
+    assert grid.cells[0] == 6
+    assert find_max_pips(grid) == 6
+    assert encode_board(grid) == encode_board(grid.tolist())
+    assert decode_board_grid(encode_board(grid)) == grid
+    assert pickle.loads(pickle.dumps(grid)) == grid
+    with pytest.raises(ValueError):
+        BoardGrid.from_rows([[1, 2], [3]])
+
+
+def test_board_grid_widens_cells_for_large_pips():
+    wide = BoardGrid.from_rows([[0, 300], [70000, 5]])
+    assert wide.cells.format == 'i' and wide.tolist() == [[0, 300], [70000, 5]]
+    assert pickle.loads(pickle.dumps(wide)) == wide
+
+    board = build_board(130, 2)
+    assert board.cells.format == 'h'
+    assert 0 <= min(board.cells) and max(board.cells) <= 129
+
+
+def test_domino_is_immutable():
+    domino = Domino(2, 5)
+
+    assert not hasattr(domino, "__dict__")
+    with pytest.raises(AttributeError):
+        domino.side1 = 3
+
+
+def test_solvers_accept_board_grid_and_keep_dominos_unchanged():
+    board = build_board(6, 6)
+    dominos = generate_dominos(find_max_pips(board))
+
+    for solver in (solve_puzzle, solve_puzzle_bitmask):
+        placement = [[None for _ in range(6)] for _ in range(6)]
+        assert solver(board, dominos, 0, 0, placement)
+        assert all(value is not None for row in placement for value in row)
+    assert dominos == generate_dominos(find_max_pips(board))
+
+
+def test_migrate_text_boards():
+    connection = open_database()
+    with connection:
+        cursor = connection.execute("INSERT INTO BOARD (COLS, ROWS, BOARD) VALUES (?, ?, ?);",
+                                    (2, 2, str([[1, 2], [3, 4]])))
+    board_id = cursor.lastrowid
+
+    assert migrate_text_boards() >= 1
+    assert get_board_by_id(board_id) == [[1, 2], [3, 4]]
+    connection = open_database()
+    assert connection.execute("SELECT typeof(BOARD) FROM BOARD WHERE ID = ?;", (board_id,)).fetchone() == ("blob",)
+    # Once migrated, starting up does not scan the boards again.
+    assert connection.execute("PRAGMA user_version;").fetchone() == (BINARY_BOARDS_VERSION,)
+    with patch("services.database.database.migrate_text_boards") as migrate:
+        create_table()
+    migrate.assert_not_called()
+
+
+def test_connection_manager_per_thread_connections(tmp_path):
+    manager = ConnectionManager(str(tmp_path / "pool.db"))
+    connection = manager.connection()
+    other = []
+    thread = threading.Thread(target=lambda: other.append(manager.connection()))
+    thread.start()
+    thread.join()
+
+    assert manager.connection() is connection
+    assert other[0] is not connection
+    assert connection.execute("PRAGMA journal_mode;").fetchone() == ("wal",)
+    manager.close_all()
+
+
 @pytest.mark.asyncio
 async def test_create_dev_key_route_success():
     token = "valid_token"
@@ -273,6 +1239,31 @@ def test_get_current_user_invalid_token():
         assert exc_info.value.detail == "Invalid or expired token"
 
 
+def test_sqlite_session_store_shared_and_expiring():
+    store = SQLiteSessionStore()
+    other_worker = CachedSessionStore(SQLiteSessionStore(), ttl=60)
+    store.set("tokens", "shared_token", "test_user", ttl=60)
+    store.set("tokens", "expired_token", "test_user", ttl=-1)
+
+    assert other_worker.get("tokens", "shared_token") == "test_user"
+    assert other_worker.get("tokens", "expired_token") is None
+    assert store.sweep_expired() >= 1
+    store.delete("tokens", "shared_token")
+    assert store.get("tokens", "shared_token") is None
+    # Served from the other worker's read-through cache until its TTL runs out.
+    assert other_worker.get("tokens", "shared_token") == "test_user"
+
+
+def test_store_mapping_behaves_like_dict():
+    tokens = StoreMapping(InMemorySessionStore(), "tokens", ttl=60)
+    tokens["a"] = "alice"
+
+    assert "a" in tokens and tokens["a"] == "alice" and tokens.get("b") is None
+    assert tokens.copy() == {"a": "alice"}
+    del tokens["a"]
+    assert len(tokens) == 0
+
+
 @pytest.mark.asyncio
 async def test_solve_route_unauthorized():
     token = "invalid_token"
@@ -297,54 +1288,37 @@ async def test_generate_all_boards_invalid_size():
 
 def test_generate_all_boards_success():
     rows, cols = 2, 2
-    max_pips = max(rows, cols) - 1
-    dominos = [MagicMock(side1=i, side2=j) for i in range(max_pips + 1) for j in range(i, max_pips + 1)]
     board_id = 1
-    board_ids = [board_id]
 
-    with patch("services.domino_service.generate_dominos", return_value=dominos), \
-            patch("services.domino_service.place_dominos_on_board") as mock_place_dominos, \
-            patch("services.domino_service.save_board_to_db", return_value=board_id) as mock_save_board_to_db:
+    with patch("services.domino_service.save_boards_to_db",
+               side_effect=lambda cols, rows, boards, chunk_size: [board_id for _ in boards]) as mock_save_boards:
         result = generate_all_boards(rows, cols)
 
-        mock_place_dominos.assert_called()
-        mock_save_board_to_db.assert_called()
-        assert result == board_ids
+        mock_save_boards.assert_called()
+        # 3 dominos, 2 slots, 2 orientations for [0|1]: 10 ordered selections.
+        assert result == [board_id] * 10
 
 
-def test_generate_all_boards_handles_index_error():
-    rows, cols = 2, 2
-    max_pips = max(rows, cols) - 1
-    dominos = [MagicMock(side1=i, side2=j) for i in range(max_pips + 1) for j in range(i, max_pips + 1)]
+def test_enumerate_boards_pagination_and_cursor():
+    boards = list(BoardEnumerator(2, 4))
 
-    with patch("services.domino_service.generate_dominos", return_value=dominos), \
-            patch("services.domino_service.place_dominos_on_board", side_effect=IndexError), \
-            patch("services.domino_service.save_board_to_db") as mock_save_board_to_db:
-        result = generate_all_boards(rows, cols)
-
-        mock_save_board_to_db.assert_not_called()
-        assert result == []
+    first_page = BoardEnumerator(2, 4, limit=50)
+    assert list(first_page) == boards[:50]
+    assert not first_page.exhausted
+    rest = BoardEnumerator(2, 4, cursor=first_page.cursor)
+    assert list(rest) == boards[50:]
+    assert rest.exhausted
+    assert list(BoardEnumerator(2, 4, offset=20, limit=5)) == boards[20:25]
+    with pytest.raises(ValueError):
+        BoardEnumerator(2, 4, cursor="0.0.0.0")
 
 
 def test_generate_all_boards_no_duplicates():
-    rows, cols = 2, 2
-    max_pips = max(rows, cols) - 1
-    dominos = [MagicMock(side1=i, side2=j) for i in range(max_pips + 1) for j in range(i, max_pips + 1)]
-    board_id = 1
-    board_ids = [board_id]
+    boards = list(BoardEnumerator(2, 4))
 
-    with patch("services.domino_service.generate_dominos", return_value=dominos), \
-            patch("services.domino_service.place_dominos_on_board") as mock_place_dominos, \
-            patch("services.domino_service.save_board_to_db", return_value=board_id) as mock_save_board_to_db:
-        unique_board_str = "[[-1, -1], [-1, -1]]"
-        mock_place_dominos.side_effect = lambda board, dominos, index: board.__setitem__(0, [0, 0]) if board == eval(
-            unique_board_str) else None
-
-        result = generate_all_boards(rows, cols)
-
-        mock_place_dominos.assert_called()
-        mock_save_board_to_db.assert_called()
-        assert result == board_ids
+    assert len({encode_board(board) for board in boards}) == len(boards)
+    assert all(len({(min(row[j], row[j + 1]), max(row[j], row[j + 1]))
+                    for row in board for j in (0, 2)}) == 4 for board in boards)
 
 
 @pytest.mark.asyncio
@@ -354,3 +1328,59 @@ async def test_generate_all_boards_invalid_size():
 
     assert response.status_code == 400
     assert response.json() == {"detail": "Board size must be even."}
+
+
+def test_save_boards_to_db_chunks():
+    boards = [[[i, i], [i, i]] for i in range(7)]
+    board_ids = list(save_boards_to_db(2, 2, iter(boards), chunk_size=3))
+
+    assert len(board_ids) == 7
+    assert board_ids == list(range(board_ids[0], board_ids[0] + 7))
+    assert [get_board_by_id(board_id) for board_id in board_ids] == boards
+
+
+def test_save_boards_to_db_resumes_on_other_threads():
+    boards = [[[i, i], [i, i]] for i in range(6)]
+    saving = save_boards_to_db(2, 2, iter(boards), chunk_size=2)
+    board_ids, others = [], []
+    with ThreadPoolExecutor(3) as pool:
+        for _ in range(3):
+            # Each chunk is resumed on some thread, which also saves a board of its own in between.
+            board_ids += pool.submit(lambda: [next(saving), next(saving)]).result()
+            others.append(pool.submit(save_board_to_db, 2, 2, [[9, 9], [9, 9]]).result())
+    assert next(saving, None) is None
+
+    assert [get_board_by_id(board_id) for board_id in board_ids] == boards
+    assert not set(board_ids) & set(others)
+
+
+@pytest.mark.asyncio
+async def test_generate_all_boards_route_streams_ndjson():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/generate_all_boards/", params={"rows": 2, "cols": 2})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 11
+    assert all(get_board_by_id(line["board_id"]) is not None for line in lines[:-1])
+    assert lines[-1] == {"next_cursor": None}
+
+
+@pytest.mark.asyncio
+async def test_generate_all_boards_route_pages_with_cursor():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        first = await ac.get("/generate_all_boards/", params={"rows": 2, "cols": 2, "limit": 6})
+        cursor = json.loads(first.text.splitlines()[-1])["next_cursor"]
+        second = await ac.get("/generate_all_boards/", params={"rows": 2, "cols": 2, "cursor": cursor})
+        invalid = await ac.get("/generate_all_boards/", params={"rows": 2, "cols": 2, "cursor": "x"})
+        negative = await ac.get("/generate_all_boards/", params={"rows": -2, "cols": 2})
+
+    assert len(first.text.splitlines()) == 7
+    assert cursor is not None
+    assert second.text.splitlines()[-1] == '{"next_cursor": null}'
+    assert len(second.text.splitlines()) == 5
+    assert invalid.status_code == 400
+    assert negative.status_code == 422
+    with pytest.raises(ValueError):
+        BoardEnumerator(-2, 2)
@@ -0,0 +1,30 @@
+import hashlib
+
+from starlette.requests import Request
+
+# For resources that never change once created: cache for a year, and do not even revalidate.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def content_etag(*parts: bytes, weak: bool = False) -> str:
+    """
+    An entity tag derived from the content a representation is built from.
+
+    A strong tag promises byte-identical responses. A weak one (`W/"..."`) only promises equivalent ones, e.g.
+    a different but equally valid solution of the same board.
+    """
+    digest = hashlib.sha256(b"\0".join(parts)).hexdigest()[:32]
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Whether the request's `If-None-Match` header names `etag`, compared weakly as RFC 9110 requires for it.
+    """
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
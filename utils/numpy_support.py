@@ -0,0 +1,5 @@
+# NumPy is optional: code with a vectorized path checks `np is not None` and falls back to plain Python.
+try:
+    import numpy as np
+except ImportError:
+    np = None
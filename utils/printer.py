@@ -1,4 +1,4 @@
-from typing import List
+from typing import Any, Dict, List, Tuple
 
 from models.domino import Domino
 
@@ -7,44 +7,55 @@ def print_board_with_solution(board, placement, show_solution):
     rows = len(board)
     cols = len(board[0])  # Assuming all rows are of equal length
 
-    output_lines = []
-
-    # Top border
-    top_border = '+'.join(['---'] * cols)
-    output_lines.append(f"+{top_border}+")
+    # Every piece of output goes into one list and is joined once at the end.
+    parts = ["+", "+".join(["---"] * cols), "+"]
 
     for i in range(rows):
-        row_output = []
+        board_row = board[i]
+        placement_row = placement[i]
+        parts.append("\n")
         for j in range(cols):
             # Handle placement visibility for solution
-            if show_solution:
-                divider = "| " if j == 0 or placement[i][j] != placement[i][j - 1] else "  "
+            if j == 0 or (show_solution and placement_row[j] != placement_row[j - 1]):
+                parts.append(f"| {board_row[j]} ")
             else:
-                divider = "| " if j == 0 else "  "
-            row_output.append(f"{divider}{board[i][j]} ")
-        row_output.append("|")  # Right border
-        output_lines.append(''.join(row_output))
+                parts.append(f"  {board_row[j]} ")
+        parts.append("|\n")  # Right border
 
         # Inter-row separator or bottom border
-        bottom_border = []
-        for j in range(cols):
-            if i < rows - 1:
-                # If not the last row
-                separator = "+---" if show_solution and placement[i][j] != placement[i + 1][j] else "+   "
-            else:
-                # Last row, always draw bottom border
-                separator = "+---"
-            bottom_border.append(separator)
-        output_lines.append(''.join(bottom_border) + "+")
+        if i < rows - 1 and show_solution:
+            next_row = placement[i + 1]
+            parts.extend("+---" if placement_row[j] != next_row[j] else "+   " for j in range(cols))
+        elif i < rows - 1:
+            parts.append("+   " * cols)
+        else:
+            # Last row, always draw bottom border
+            parts.append("+---" * cols)
+        parts.append("+")
 
-    return '\n'.join(output_lines)
+    return "".join(parts)
 
 
 def print_dominos(dominos: List[Domino], max_pips: int) -> str:
-    output = ""
-    for i in range(max_pips + 1):
-        for domino in dominos:
-            if domino.side2 == i:
-                output += "[{}|{}] ".format(domino.side1, domino.side2)
-        output += "\n"
-    return output
+    # One pass over the dominos, bucketed by second side.
+    lines = [[] for _ in range(max_pips + 1)]
+    for domino in dominos:
+        if 0 <= domino.side2 <= max_pips:
+            lines[domino.side2].append(f"[{domino.side1}|{domino.side2}] ")
+    return "".join("".join(line) + "\n" for line in lines)
+
+
+def solution_to_json(board: List[List[int]], pairs: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+    """
+    Returns the solution as one `{"domino", "cell", "orientation"}` entry per domino, in row-major order of
+    the domino's top/left cell.
+    """
+    cols = len(board[0])
+    placement = []
+    for a, b in sorted(pairs):
+        row, col = divmod(a, cols)
+        other_row, other_col = divmod(b, cols)
+        sides = sorted((board[row][col], board[other_row][other_col]))
+        placement.append({"domino": sides, "cell": [row, col],
+                          "orientation": "horizontal" if other_row == row else "vertical"})
+    return placement
@@ -0,0 +1,10 @@
+import math
+from typing import Sequence
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of `values`, e.g. `percentile(latencies, 0.95)`.
+    """
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(fraction * len(ordered))) - 1]